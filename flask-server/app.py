@@ -3,13 +3,25 @@ Kala-Kaart AI Chatbot API
 Merged Flask backend combining CSV data handling and RAG model functionality.
 """
 
-from flask import Flask, jsonify, request, make_response
+from flask import Flask, jsonify, request, make_response, Response, stream_with_context
 from flask_cors import CORS
 import os
 import pandas as pd
 import logging
-import json
-import re
+from backend.bm25 import BM25Index
+from backend.categorical import CategoryCodes
+from backend.dataset import dataset_version, load_artisan_frame
+from backend.entity_matcher import EntityMatcher, normalize_text
+from backend.export import EXPORT_FORMATS, export_lines, iter_matches
+from backend.filters import filter_mask
+from backend.hot_reload import SnapshotPublisher, register_reload_routes
+from backend.llm_dispatch import get_dispatcher
+from backend.pagination import SortIndex, paginate
+from backend.rag_nlp_model import DEFAULT_MODEL_PATH
+from backend.sse import answer_events, sse_response
+from backend.stats_cube import StatsCube
+from backend.training import TrainingRunner
+from backend.training_data import iter_training_records
 
 # -------------------------
 # Logging Configuration
@@ -33,25 +45,63 @@ CORS(app,
 # -------------------------
 # Global Variables
 # -------------------------
-data = None
+CSV_PATH = os.getenv("CSV_PATH", r"C:\Users\hanis\OneDrive\Desktop\Team Tubelight\Local-Artisian_AI\Local-Artisian_AI\flask-server\frontend\src\Artisans.csv")
+# Replaced as a whole when training finishes; handlers read it once per request
 rag_model = None
+# Dataset version whose artisan rows rag_model was trained on (None: loaded from disk or untrained).
+# The artisan store is pinned to that data: a dataset reload does not re-embed it, /train does.
+rag_dataset_version = None
+trainer = TrainingRunner()
+
+MODEL_PATH = DEFAULT_MODEL_PATH
+# JSON Lines is preferred; the JSON array file is still read incrementally
+TRAINING_DATA_FILES = ("multilingual_training_data.jsonl", "multilingual_training_data.json")
 
 # -------------------------
 # Data Loading Functions
 # -------------------------
+def build_dataset():
+    """
+    Load the artisan CSV and build everything derived from it.
+
+    Returned as one dict so a reload can publish the frame and its indexes
+    together (see backend.hot_reload); raises if the CSV cannot be loaded.
+    """
+    data = load_artisan_frame(CSV_PATH)
+    # search_text only feeds index builds elsewhere; don't carry a copy of every row's text
+    data = data.drop(columns=['search_text']).dropna(subset=['name', 'craft_type', 'state', 'district'])
+    data['languages_spoken'] = data['languages_spoken'].fillna('')
+    data['contact_phone'] = data['contact_phone'].astype(str)
+    logger.info(f"Loaded {len(data)} artisan records")
+    return {
+        'data': data,
+        'record_columns': list(data.columns),
+        'category_codes': CategoryCodes(data),
+        'stats_cube': StatsCube.from_frame(data),
+        # Compiled from the loaded states/crafts, so it is rebuilt on every load
+        'entity_matcher': EntityMatcher(data['state'].unique().tolist(), data['craft_type'].unique().tolist()),
+        # Sort permutations for /search pagination, also rebuilt on every load; cursors
+        # carry the CSV version, so ones issued before a reload are rejected
+        'sort_index': SortIndex.from_frame(data, version=dataset_version(CSV_PATH)),
+        # BM25 term weights for free-text relevance ranking
+        'bm25_index': BM25Index.from_frame(data),
+    }
+
+# Handlers read one snapshot per request via dataset.view(); reloads build a new
+# snapshot in the background and swap it in
+dataset = SnapshotPublisher(build_dataset, CSV_PATH)
+dataset.bind(app)
+register_reload_routes(app, dataset)
+
 def load_data():
     """Load CSV data for artisan database"""
-    global data
-    csv_path = os.getenv("CSV_PATH", r"C:\Users\hanis\OneDrive\Desktop\Team Tubelight\Local-Artisian_AI\Local-Artisian_AI\flask-server\frontend\src\Artisans.csv")
     try:
-        data = pd.read_csv(csv_path)
-        data = data.dropna(subset=['name', 'craft_type', 'state', 'district'])
-        data['languages_spoken'] = data['languages_spoken'].fillna('')
-        data['contact_phone'] = data['contact_phone'].astype(str)
-        logger.info(f"Loaded {len(data)} artisan records")
+        dataset.load()
     except Exception as e:
         logger.error(f"Error loading data: {e}")
-        data = pd.DataFrame()
+        # Serve "no data" until a reload (POST /admin/reload or the CSV watcher) succeeds
+        dataset.publish({'data': pd.DataFrame(), 'record_columns': [], 'category_codes': None,
+                         'stats_cube': None, 'entity_matcher': None, 'sort_index': None, 'bm25_index': None})
 
 def initialize_rag_model():
     """Initialize RAG model if available"""
@@ -59,16 +109,17 @@ def initialize_rag_model():
     try:
         from backend.rag_nlp_model import MultilingualRAGModel
         
-        MODEL_PATH = "trained_rag_model"
         USE_GPU = False
         
         rag_model = MultilingualRAGModel(use_gpu=USE_GPU)
         
         if os.path.exists(MODEL_PATH):
+            # Vectors are memory-mapped, so loading does not read them into memory
             rag_model.load_model(MODEL_PATH)
             logger.info("Loaded trained RAG model.")
         else:
-            logger.warning("Trained RAG model not found. Please train the model first.")
+            # Embedding every artisan row here would run on every boot; /train builds and persists it
+            logger.warning("Trained RAG model not found. Run /train to index the artisan records and documents.")
             
     except ImportError:
         logger.warning("RAG model not available. Install required dependencies or check backend.rag_nlp_model")
@@ -77,70 +128,32 @@ def initialize_rag_model():
         logger.error(f"Error initializing RAG model: {e}")
         rag_model = None
 
-# -------------------------
-# Helper Functions for Chat
-# -------------------------
-def normalize_text(text):
-    """Normalize text for better matching"""
-    return re.sub(r'[^\w\s]', '', text.lower().strip())
-
-def find_state_match(message, available_states):
-    """Find state mentioned in message with fuzzy matching"""
-    message_normalized = normalize_text(message)
-    message_words = message_normalized.split()
-    
-    for state in available_states:
-        state_normalized = normalize_text(state)
-        state_words = state_normalized.split()
-        
-        # Exact match
-        if state_normalized in message_normalized:
-            return state
-        
-        # Word-by-word match for multi-word states
-        if all(word in message_words for word in state_words if len(word) > 2):
-            return state
-    
-    return None
+def generate_rag_answer(message):
+    """
+    Retrieve with the RAG model and generate through the shared dispatcher.
 
-def find_craft_match(message, available_crafts):
-    """Find craft mentioned in message with keyword matching"""
-    message_normalized = normalize_text(message)
-    
-    # Direct craft matching
-    for craft in available_crafts:
-        craft_normalized = normalize_text(craft)
-        if craft_normalized in message_normalized:
-            return craft
-    
-    # Keyword-based matching
-    craft_keywords = {
-        'pottery': ['pottery', 'potter', 'ceramic', 'clay', 'pot'],
-        'weaving': ['weaving', 'textile', 'fabric', 'cloth', 'weaver'],
-        'wood': ['wood', 'carving', 'wooden', 'carpenter'],
-        'metal': ['metal', 'iron', 'steel', 'brass', 'copper'],
-        'leather': ['leather', 'hide', 'skin'],
-        'embroidery': ['embroidery', 'stitch', 'needle'],
-        'painting': ['painting', 'paint', 'artist', 'canvas'],
-        'jewelry': ['jewelry', 'jewel', 'ornament', 'gold', 'silver'],
-        'basket': ['basket', 'bamboo', 'cane'],
-        'stone': ['stone', 'marble', 'sculpture']
-    }
-    
-    for craft_type, keywords in craft_keywords.items():
-        if any(keyword in message_normalized for keyword in keywords):
-            # Find matching crafts in database
-            matching_crafts = [c for c in available_crafts if craft_type in normalize_text(c)]
-            if matching_crafts:
-                return matching_crafts[0]
-    
-    return None
+    Identical concurrent questions share one generation, and the call is
+    bounded by the dispatcher deadline; returns (language, docs, result)
+    where result.source == 'fallback' means no generated text is available.
+    """
+    model = rag_model  # one model for the whole request, even if training swaps it meanwhile
+    lang = model.detect_language(message)
+    docs = model.semantic_search(message, lang)
+    result = get_dispatcher().call(
+        'rag_model', f"{lang}:{normalize_text(message)}",
+        model.generate_response, message, docs, lang,
+        fallback=lambda: None
+    )
+    if result.error:
+        logger.warning(f"RAG generation fell back: {result.error}")
+    return lang, docs, result
 
 # -------------------------
 # Initialize on startup
 # -------------------------
 load_data()
 initialize_rag_model()
+dataset.start_watcher()
 
 # -------------------------
 # Basic API Endpoints
@@ -162,14 +175,18 @@ def root():
 @app.route("/health", methods=["GET"])
 def health():
     """Health check endpoint"""
-    if data is None or data.empty:
+    ds = dataset.view()
+    if ds.data.empty:
         return jsonify({"status": "unhealthy", "message": "Data not loaded"}), 503
     
     return jsonify({
         "status": "healthy",
-        "total_artists": len(data),
+        "total_artists": len(ds.data),
+        "dataset_version": ds.version,
         "database_loaded": True,
-        "rag_model_loaded": rag_model is not None
+        "rag_model_loaded": rag_model is not None,
+        # Lags dataset_version after a reload until /train re-embeds the artisan rows
+        "rag_dataset_version": rag_dataset_version
     })
 
 # -------------------------
@@ -179,52 +196,85 @@ def health():
 @app.route("/stats", methods=["GET"])
 def stats():
     """Get database statistics"""
-    if data is None or data.empty:
+    ds = dataset.view()
+    if ds.data.empty:
         return jsonify({"message": "No data loaded"}), 503
 
+    summary = ds.stats_cube.summary()
     return jsonify({
-        'total_artists': len(data),
-        'unique_states': len(data['state'].unique()),
-        'unique_districts': len(data['district'].unique()),
-        'unique_crafts': len(data['craft_type'].unique()),
-        'states': sorted(data['state'].unique().tolist()),
-        'crafts': sorted(data['craft_type'].unique().tolist()),
+        'total_artists': summary.total,
+        'unique_states': summary.nunique('state'),
+        'unique_districts': summary.nunique('district'),
+        'unique_crafts': summary.nunique('craft_type'),
+        'states': sorted(summary.unique_values('state')),
+        'crafts': sorted(summary.unique_values('craft_type')),
         'age_distribution': {
-            'min': int(data['age'].min()),
-            'max': int(data['age'].max()),
-            'mean': float(data['age'].mean())
+            'min': summary.age_min(),
+            'max': summary.age_max(),
+            'mean': summary.age_mean()
         }
     })
 
 @app.route("/search", methods=["POST"])
 def search():
     """Search artisans with filters"""
-    if data is None or data.empty:
+    # One snapshot for the whole request (and the export stream), even if a reload lands meanwhile
+    ds = dataset.view()
+    data, category_codes, record_columns = ds.data, ds.category_codes, ds.record_columns
+    if data.empty:
         return jsonify({"message": "No data loaded"}), 503
         
     filters = request.json or {}
-    filtered_df = data.copy()
-
-    # Apply filters
-    if 'state' in filters and filters['state']:
-        filtered_df = filtered_df[filtered_df['state'].str.contains(filters['state'], case=False, na=False)]
-    if 'district' in filters and filters['district']:
-        filtered_df = filtered_df[filtered_df['district'].str.contains(filters['district'], case=False, na=False)]
-    if 'craft_type' in filters and filters['craft_type']:
-        filtered_df = filtered_df[filtered_df['craft_type'].str.contains(filters['craft_type'], case=False, na=False)]
-    if 'name' in filters and filters['name']:
-        filtered_df = filtered_df[filtered_df['name'].str.contains(filters['name'], case=False, na=False)]
-    if 'age_min' in filters and filters['age_min']:
-        filtered_df = filtered_df[filtered_df['age'] >= filters['age_min']]
-    if 'age_max' in filters and filters['age_max']:
-        filtered_df = filtered_df[filtered_df['age'] <= filters['age_max']]
-
-    limit = filters.get('limit', 20)
-    artists = filtered_df.head(limit).to_dict('records')
+    # Compose one row mask; categorical columns are matched once per category, not per row
+    contains = {column: filters[column] for column in ['state', 'district', 'craft_type', 'name']
+                if column in filters and filters[column]}
+    ranges = {'age': (filters.get('age_min') or None, filters.get('age_max') or None)}
+    mask = filter_mask(data, category_codes, contains=contains, ranges=ranges)
+
+    # A free-text "query" keeps only rows it matches and ranks them by BM25 (sort_by "relevance")
+    ranked = None
+    if filters.get('query'):
+        ranked = ds.bm25_index.ranked([str(filters['query'])], mask)
+        mask = ranked.mask
+
+    # ?format=ndjson|csv streams every match, filtered block by block in sort order
+    fmt = request.args.get('format')
+    if fmt:
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({"error": f"Unsupported export format: {fmt}"}), 400
+        try:
+            if ranked is not None and (filters.get('sort_by') or 'relevance') == 'relevance':
+                order = ranked.head(len(ranked))
+            else:
+                order = ds.sort_index.permutation(filters.get('sort_by') or None, (filters.get('sort_order') or 'asc').lower())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if ranked is not None:
+            # The query mask already includes the column filters
+            blocks = iter_matches(data, order=order[mask[order]])
+        else:
+            blocks = iter_matches(data, category_codes, order=order, contains=contains, ranges=ranges)
+        lines = export_lines(blocks, lambda block: block[record_columns].to_dict('records'), fmt, record_columns)
+        return Response(stream_with_context(dataset.hold(lines)), mimetype=EXPORT_FORMATS[fmt],
+                        headers={"Content-Disposition": f"attachment; filename=artisans.{fmt}"})
+
+    # Walk the precomputed sort permutation (or the ranked matches) from the offset/cursor position
+    try:
+        page = paginate(ds.sort_index, mask, filters, ranked=ranked)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    artists = data.iloc[page['rows']][record_columns].to_dict('records')
 
     return jsonify({
         "artists": artists,
-        "total_count": len(filtered_df),
+        "total_count": page['total'],
+        "total": page['total'],
+        "limit": page['limit'],
+        "offset": page['offset'],
+        "sort_by": page['sort_by'],
+        "sort_order": page['sort_order'],
+        "has_more": page['has_more'],
+        "next_cursor": page['next_cursor'],
         "filters_applied": {k: v for k, v in filters.items() if v is not None and v != ""}
     })
 
@@ -255,17 +305,23 @@ def query():
         })
 
     try:
-        # Detect language
-        lang = rag_model.detect_language(user_input)
-        # Semantic search
-        docs = rag_model.semantic_search(user_input, lang)
-        # Generate response
-        response_text = rag_model.generate_response(user_input, docs, lang)
+        # Detect language, semantic search, then generate (deadline-bounded)
+        lang, docs, result = generate_rag_answer(user_input)
+        if result.source == 'fallback':
+            reason = ("The language model did not answer in time." if result.timed_out
+                      else "The language model could not answer this query.")
+            return jsonify({
+                "query": user_input,
+                "language": lang,
+                "response": f"{reason} Here are the most relevant records from the database.",
+                "retrieved_docs": docs,
+                "fallback": True
+            })
 
         return jsonify({
             "query": user_input,
             "language": lang,
-            "response": response_text,
+            "response": result.value,
             "retrieved_docs": docs,
             "fallback": False
         })
@@ -273,6 +329,41 @@ def query():
         logger.error(f"Error processing query: {e}")
         return jsonify({"error": "Failed to process query"}), 500
 
+@app.route("/query/stream", methods=["POST"])
+def query_stream():
+    """
+    SSE variant of /query: the retrieved documents are sent first, then the
+    generated answer as it is produced.
+    JSON body: {"query": "Your question here"}
+    """
+    data_req = request.json or {}
+    user_input = data_req.get("query", "").strip()
+
+    if not user_input:
+        return jsonify({"error": "Query not provided"}), 400
+    model = rag_model
+    if model is None:
+        return sse_response(answer_events(
+            {"query": user_input, "language": "en", "retrieved_docs": [], "fallback": True},
+            ["RAG model not available. Please check the model configuration."]
+        ))
+
+    try:
+        lang = model.detect_language(user_input)
+        docs = model.semantic_search(user_input, lang)
+    except Exception as e:
+        logger.error(f"Error processing query: {e}")
+        return jsonify({"error": "Failed to process query"}), 500
+
+    # Models that cannot stream send their whole answer as one chunk
+    def whole_answer():
+        yield model.generate_response(user_input, docs, lang)
+
+    stream = getattr(model, "stream_response", None)
+    chunks = stream(user_input, docs, lang) if stream is not None else whole_answer()
+    meta = {"query": user_input, "language": lang, "retrieved_docs": docs, "fallback": False}
+    return sse_response(answer_events(meta, chunks))
+
 @app.route("/chat", methods=["POST"])
 def chat():
     """Enhanced chat endpoint with flexible state and craft search"""
@@ -283,7 +374,9 @@ def chat():
         return jsonify({"error": "Message not provided"}), 400
     
     # Check if data is available
-    if data is None or data.empty:
+    ds = dataset.view()
+    data, category_codes, record_columns, entity_matcher = ds.data, ds.category_codes, ds.record_columns, ds.entity_matcher
+    if data.empty:
         return jsonify({
             "intent": "error",
             "entities": {},
@@ -295,12 +388,13 @@ def chat():
     
     try:
         # Get available states and crafts
-        available_states = data['state'].unique().tolist()
-        available_crafts = data['craft_type'].unique().tolist()
+        available_states = entity_matcher.states
+        available_crafts = entity_matcher.crafts
         
-        # Find state and craft matches
-        mentioned_state = find_state_match(message, available_states)
-        mentioned_craft = find_craft_match(message, available_crafts)
+        # Find state and craft matches in a single pass over the message
+        entities = entity_matcher.extract(message)
+        mentioned_state = entities['states'][0] if entities['states'] else None
+        mentioned_craft = entities['crafts'][0] if entities['crafts'] else None
         
         # Handle statistics requests
         if any(word in message.lower() for word in ['stats', 'statistics', 'database stats', 'how many']):
@@ -324,24 +418,24 @@ def chat():
         
         # Handle state searches
         if mentioned_state:
-            state_artists = data[data['state'].str.contains(mentioned_state, case=False, na=False)].head(10)
+            state_artists = data[category_codes.contains_mask(data, 'state', mentioned_state)].head(10)
             return jsonify({
                 "intent": "search_location",
                 "entities": {"state": mentioned_state},
                 "message": f"Found {len(state_artists)} artists in {mentioned_state}. Here are some featured artisans from this region.",
-                "artists": state_artists.to_dict('records'),
+                "artists": state_artists[record_columns].to_dict('records'),
                 "suggestions": [f"Find specific crafts in {mentioned_state}", "Show contact details", "Browse other states"],
                 "mode": "database_search"
             })
         
         # Handle craft searches
         if mentioned_craft:
-            craft_artists = data[data['craft_type'].str.contains(mentioned_craft, case=False, na=False)].head(10)
+            craft_artists = data[category_codes.contains_mask(data, 'craft_type', mentioned_craft)].head(10)
             return jsonify({
                 "intent": "search_craft",
                 "entities": {"craft": mentioned_craft},
                 "message": f"Found {len(craft_artists)} {mentioned_craft} artists in our database.",
-                "artists": craft_artists.to_dict('records'),
+                "artists": craft_artists[record_columns].to_dict('records'),
                 "suggestions": [f"Find {mentioned_craft} in specific states", "Show contact details", "Browse other crafts"],
                 "mode": "database_search"
             })
@@ -394,14 +488,14 @@ def chat():
         # Try RAG model if available
         if rag_model is not None:
             try:
-                lang = rag_model.detect_language(message)
-                docs = rag_model.semantic_search(message, lang)
-                response_text = rag_model.generate_response(message, docs, lang)
+                lang, docs, result = generate_rag_answer(message)
+                if result.source == 'fallback':
+                    raise TimeoutError(result.error)
                 
                 return jsonify({
                     "intent": "rag_query",
                     "entities": {},
-                    "message": response_text,
+                    "message": result.value,
                     "language": lang,
                     "artists": [],
                     "suggestions": ["Try searching by state", "Try searching by craft", "Browse all artists"],
@@ -431,39 +525,57 @@ def chat():
             "mode": "error"
         })
 
+def training_data_file():
+    return next((path for path in TRAINING_DATA_FILES if os.path.exists(path)), None)
+
+def run_training(progress):
+    """
+    Build a new RAG model from the training data and swap it in.
+
+    Records are streamed from the training file straight into per-language
+    batch builders, and the new model is built and published next to the
+    serving one (unchanged documents reuse its vectors), so queries keep
+    using the old model until the new one is complete.  The artisan rows
+    come from the current dataset snapshot, so running /train after a
+    dataset reload is what brings them up to date.
+    """
+    global rag_model, rag_dataset_version
+    current = rag_model
+    records = iter_training_records(training_data_file(), progress=progress)
+    snapshot = dataset.current
+    artisans = snapshot.data if not snapshot.data.empty else None
+    model, stats = current.train(records, MODEL_PATH, artisans, progress=progress)
+    rag_model, rag_dataset_version = model, snapshot.version
+    return stats
+
 @app.route("/train", methods=["POST"])
 def train():
     """
-    Endpoint to retrain the RAG model from training data.
-    Expects 'multilingual_training_data.json' in current directory.
+    Start retraining the RAG model from training data in the background.
+    Expects 'multilingual_training_data.jsonl' (or the JSON array
+    'multilingual_training_data.json') in current directory; poll
+    /train/status/<job_id> for progress.
     """
     if rag_model is None:
         return jsonify({"error": "RAG model not available"}), 503
-        
-    training_data_file = "multilingual_training_data.json"
 
-    if not os.path.exists(training_data_file):
-        return jsonify({"error": f"Training data file {training_data_file} not found."}), 404
-
-    try:
-        # Load training data
-        with open(training_data_file, "r", encoding="utf-8") as f:
-            training_data = json.load(f)
-
-        # Build vector stores for each supported language
-        for lang in rag_model.supported_languages:
-            docs = [item for item in training_data if item.get("language") == lang]
-            if docs:
-                rag_model.build_vector_store(docs, lang)
-
-        # Save model
-        MODEL_PATH = "trained_rag_model"
-        rag_model.save_model(MODEL_PATH)
-
-        return jsonify({"message": "Training completed and model saved successfully."})
-    except Exception as e:
-        logger.error(f"Training failed: {e}")
-        return jsonify({"error": "Training failed"}), 500
+    if training_data_file() is None:
+        return jsonify({"error": f"Training data file {' or '.join(TRAINING_DATA_FILES)} not found."}), 404
+
+    job, started = trainer.start(run_training)
+    body = {**job.to_dict(), "status_url": f"/train/status/{job.id}"}
+    if not started:
+        return jsonify({**body, "error": "Training is already running"}), 409
+    return jsonify({**body, "message": "Training started"}), 202
+
+@app.route("/train/status", methods=["GET"])
+@app.route("/train/status/<job_id>", methods=["GET"])
+def train_status(job_id=None):
+    """Progress of a training job (the latest one without an id)."""
+    job = trainer.get(job_id) if job_id else trainer.latest()
+    if job is None:
+        return jsonify({"error": "No such training job"}), 404
+    return jsonify(job.to_dict())
 
 # -------------------------
 # Error Handlers
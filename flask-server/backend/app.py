@@ -1,15 +1,30 @@
 # Path: /Users/abhi/Desktop/Local-Artisian_AI/flask-server/app.py
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import google.generativeai as genai
 from dotenv import load_dotenv
 import os
 import pandas as pd
 import logging
 import traceback
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import numpy as np # Import numpy for integer conversion
+import sys
+
+# Run as `python app.py` from this directory: make the `backend` package importable
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.dataset import dataset_version, load_artisan_frame
+from backend.export import EXPORT_FORMATS, export_lines, iter_matches
+from backend.filters import filter_mask, take
+from backend.hot_reload import SnapshotPublisher, register_reload_routes
+from backend.model_clients import ModelClientManager
+from backend.rag_app import ArtisanRAG
+from backend.response_cache import ResponseCache
+from backend.serialization import Field, RecordSerializer
+from backend.similar_index import MATCH_LEVELS, ArtisanFeatures, NeighbourTable, SimilarIndex
+from backend.sse import answer_events, sse_response
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,57 +36,93 @@ CORS(app)
 # Load environment variables
 load_dotenv()
 
-# Initialize Gemini AI
+# Gemini clients are created lazily on first use (LLM_STUB_URL selects a local stub)
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
-if not GOOGLE_API_KEY:
+if not GOOGLE_API_KEY and not os.getenv('LLM_STUB_URL'):
     raise ValueError("GOOGLE_API_KEY not found in environment variables")
 
-genai.configure(api_key=GOOGLE_API_KEY)
-try:
-    model = genai.GenerativeModel("gemini-1.5-pro")
-except Exception as e:
-    logger.warning(f"Failed to initialize gemini-1.5-pro, trying gemini-pro: {e}")
-    model = genai.GenerativeModel("gemini-pro")
+model = ModelClientManager.from_env(GOOGLE_API_KEY, model_names=["gemini-1.5-pro", "gemini-pro"])
+# One answer cache for the process: keys carry the dataset version, so it outlives reloads
+response_cache = ResponseCache.from_env()
 
 # Load CSV data
-df = pd.DataFrame()
-try:
-    csv_paths = [
-        os.path.join(os.getcwd(), 'public', 'Artisans.csv'),
-        os.path.join(os.path.dirname(__file__), '..', 'public', 'Artisans.csv'),
-        os.path.join(os.path.dirname(__file__), 'Artisans.csv')
-    ]
-    
-    csv_loaded = False
-    for csv_path in csv_paths:
-        if os.path.exists(csv_path):
-            df = pd.read_csv(csv_path)
-            logger.info(f"✅ Successfully loaded {len(df)} records from {csv_path}")
-            csv_loaded = True
-            break
-    
-    if not csv_loaded:
-        logger.error("❌ Could not find Artisans.csv file in any of the expected locations.")
-        df = pd.DataFrame()
-    else:
-        if 'age' in df.columns:
-            df['age'] = pd.to_numeric(df['age'], errors='coerce')
-        phone_columns = [col for col in df.columns if 'phone' in col.lower()]
-        for col in phone_columns:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.replace(r'\.\d+', '', regex=True)
-                df[col] = df[col].apply(lambda x: f"{int(float(x))}" if pd.notna(x) and x.replace('.', '', 1).isdigit() else '')
-        
-        searchable_cols = [col for col in ['name', 'craft_type', 'state', 'district', 'village', 'languages_spoken', 'languages'] if col in df.columns]
-        if searchable_cols:
-            df['search_text'] = df[searchable_cols].fillna('').astype(str).agg(' '.join, axis=1).str.lower()
-        else:
-            df['search_text'] = ''
+CSV_PATHS = [
+    os.path.join(os.getcwd(), 'public', 'Artisans.csv'),
+    os.path.join(os.path.dirname(__file__), '..', 'public', 'Artisans.csv'),
+    os.path.join(os.path.dirname(__file__), 'Artisans.csv')
+]
+csv_path = next((path for path in CSV_PATHS if os.path.exists(path)), None)
+EMPTY_DATASET = {'df': pd.DataFrame(), 'rag': None, 'search_index': None, 'bm25_index': None,
+                 'category_codes': None, 'stats_cube': None, 'similar_index': None,
+                 'neighbours': None}
 
+def build_dataset() -> Dict[str, Any]:
+    """Load the CSV and build the RAG helper with its indexes, for one dataset snapshot."""
+    if csv_path is None:
+        raise FileNotFoundError("Could not find Artisans.csv file in any of the expected locations.")
+    df = load_artisan_frame(csv_path)
+    logger.info(f"✅ Successfully loaded {len(df)} records from {csv_path}")
+    # The RAG helper builds the search indexes, category codes and stats cube once for both
+    rag = ArtisanRAG(GOOGLE_API_KEY, artisan_df=df, data_version=dataset_version(csv_path),
+                     model_clients=model, response_cache=response_cache)
+    df = rag.artisan_df  # without the search_text column once the index is built
+    return {'df': df, 'rag': rag, 'search_index': rag.search_index, 'bm25_index': rag.bm25_index,
+            'category_codes': rag.category_codes, 'stats_cube': rag.stats_cube,
+            'similar_index': SimilarIndex.from_frame(df) if 'artisan_id' in df.columns else None,
+            'neighbours': NeighbourTable.from_env(ArtisanFeatures.from_frame(df))}
+
+# Every request reads one snapshot through dataset.view(); POST /api/admin/reload (or the
+# DATASET_WATCH_INTERVAL watcher) rebuilds it in the background and swaps it in
+dataset = SnapshotPublisher(build_dataset, csv_path)
+dataset.bind(app)
+register_reload_routes(app, dataset, prefix='/api/admin')
+try:
+    dataset.load()
 except Exception as e:
     logger.error(f"❌ Error loading and processing CSV: {e}")
     logger.error(traceback.format_exc())
-    df = pd.DataFrame()
+    dataset.publish(EMPTY_DATASET)
+dataset.start_watcher()
+
+# Response shapes: output field, source columns (first present wins), default, converter
+ARTISAN_ID_SOURCES = ('artisan_id', 'govt_artisan_id', 'id')
+search_serializer = RecordSerializer([
+    Field('artisan_id', ARTISAN_ID_SOURCES, 'N/A', 'str'),
+    Field('name', ('name',), 'Unknown'),
+    Field('gender', ('gender',), 'N/A'),
+    Field('age', ('age',), 'N/A', 'int_or_na'),
+    Field('craft_type', ('craft_type',), 'Traditional Craft'),
+    Field('state', ('state',), 'Unknown'),
+    Field('district', ('district',), 'Unknown'),
+    Field('village', ('village',), 'Unknown'),
+    Field('languages', ('languages_spoken', 'languages'), 'Hindi'),
+    Field('email', ('contact_email',), 'Not available'),
+    Field('phone', ('contact_phone',), 'Not available'),
+    Field('phone_available', ('contact_phone_boolean',), True),
+    Field('govt_id', ('govt_artisan_id',), 'N/A'),
+    Field('cluster_code', ('artisan_cluster_code',), 'N/A'),
+])
+filter_serializer = RecordSerializer([
+    Field('artisan_id', ARTISAN_ID_SOURCES, 'N/A', 'str'),
+    Field('name', ('name',), 'Unknown'),
+    Field('craft_type', ('craft_type',), 'Traditional Craft'),
+    Field('state', ('state',), 'Unknown'),
+    Field('district', ('district',), 'Unknown'),
+    Field('age', ('age',), 'N/A', 'int_or_na'),
+    Field('gender', ('gender',), 'N/A'),
+])
+similar_serializer = RecordSerializer([
+    Field('artisan_id', ('artisan_id',), 'N/A', 'str'),
+    Field('name', ('name',), 'Unknown'),
+    Field('craft_type', ('craft_type',), 'Traditional Craft'),
+    Field('state', ('state',), 'Unknown'),
+    Field('district', ('district',), 'Unknown'),
+])
+reference_serializer = RecordSerializer([
+    Field('artisan_id', ('artisan_id',), 'N/A', 'str'),
+    Field('name', ('name',), 'Unknown'),
+    Field('craft_type', ('craft_type',), 'Traditional Craft'),
+])
 
 # Helper Functions
 def classify_intent(query: str) -> str:
@@ -94,106 +145,82 @@ def extract_entities_from_query(query: str) -> Dict[str, Any]:
             break
     return entities
 
-def search_artisans(query: str, max_results: int = 10) -> List[Dict]:
+def query_terms(query: str) -> List[str]:
+    return [word for word in query.lower().split() if len(word) > 2]
+
+def search_row_ids(query: str, match: str = 'any'):
+    """Row positions matching ``query``, or ``None`` for a broad (empty) query."""
+    ds = dataset.view()
+    if ds.df.empty: return np.empty(0, dtype=np.int32)
+    search_terms = query_terms(query)
+    if not search_terms and not query:
+        return None
+    return ds.search_index.search(search_terms, mode='and' if match == 'all' else 'or')
+
+def search_artisans(query: str, max_results: int = 10, match: str = 'any') -> List[Dict]:
+    ds = dataset.view()
+    df = ds.df
     if df.empty: return []
-    query_lower = query.lower()
-    search_terms = [word for word in query_lower.split() if len(word) > 2]
+    row_ids = search_row_ids(query, match)
     
     # Handle broad search gracefully
-    if not search_terms and not query:
+    if row_ids is None:
         matching_rows = df.head(max_results)
     else:
-        combined_mask = pd.Series([False] * len(df))
-        if 'search_text' in df.columns:
-            for term in search_terms:
-                combined_mask |= df['search_text'].str.contains(term, na=False, regex=False)
-        
-        matching_rows = df[combined_mask].head(max_results)
+        # Same matches as before, best BM25 scores first
+        row_ids, _ = ds.bm25_index.top_k(query_terms(query), max_results, candidates=row_ids)
+        matching_rows = df.iloc[row_ids]
     
-    results = []
-    for _, row in matching_rows.iterrows():
-        artist_data = {
-            'artisan_id': str(row.get('artisan_id', row.get('govt_artisan_id', row.get('id', 'N/A')))),
-            'name': row.get('name', 'Unknown'),
-            'gender': row.get('gender', 'N/A'),
-            'age': int(row.get('age')) if pd.notna(row.get('age')) else 'N/A', # Convert age to int
-            'craft_type': row.get('craft_type', 'Traditional Craft'),
-            'state': row.get('state', 'Unknown'),
-            'district': row.get('district', 'Unknown'),
-            'village': row.get('village', 'Unknown'),
-            'languages': row.get('languages_spoken', row.get('languages', 'Hindi')),
-            'email': row.get('contact_email', 'Not available'),
-            'phone': row.get('contact_phone', 'Not available'),
-            'phone_available': row.get('contact_phone_boolean', True),
-            'govt_id': row.get('govt_artisan_id', 'N/A'),
-            'cluster_code': row.get('artisan_cluster_code', 'N/A')
-        }
-        results.append(artist_data)
-    return results
+    return search_serializer.serialize(matching_rows)
+
+def export_response(blocks, serializer: RecordSerializer, fmt: str) -> Response:
+    """Stream ``blocks`` of rows as NDJSON/CSV without building the full result."""
+    lines = export_lines(blocks, serializer.serialize, fmt, [field.name for field in serializer.fields])
+    return Response(stream_with_context(dataset.hold(lines)), mimetype=EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename=artisans.{fmt}'})
 
 def get_statistics_from_df() -> Dict:
+    ds = dataset.view()
+    df = ds.df
     if df.empty: return {"error": "No CSV data loaded"}
-    stats = {'total_artisans': len(df)}
+    summary = ds.stats_cube.summary()
+    stats = {'total_artisans': summary.total}
     for col in ['craft_type', 'state', 'district', 'gender']:
         if col in df.columns:
-            stats[col + 's'] = {str(k): int(v) for k, v in df[col].value_counts().head(10).items()}
-    if 'age' in df.columns and pd.api.types.is_numeric_dtype(df['age']):
-        stats['age_statistics'] = {
-            'average_age': round(float(df['age'].mean()), 1),
-            'median_age': float(df['age'].median()),
-            'min_age': int(df['age'].min()),
-            'max_age': int(df['age'].max())
-        }
+            stats[col + 's'] = {str(k): v for k, v in summary.value_counts(col, top=10).items()}
+    age_statistics = summary.age_statistics()
+    if age_statistics:
+        stats['age_statistics'] = age_statistics
+    if 'craft_type' in df.columns:
+        stats['unique_crafts'] = summary.nunique('craft_type')
+    if 'state' in df.columns:
+        stats['unique_states'] = summary.nunique('state')
     return stats
 
 def filter_artisans_from_df(filters: Dict) -> List[Dict]:
+    ds = dataset.view()
+    df = ds.df
     if df.empty: return []
-    filtered_df = df.copy()
-    for key, value in filters.items():
-        if key in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df[key].astype(str).str.lower() == str(value).lower()]
-    
-    results = []
-    for _, row in filtered_df.head(20).iterrows():
-        results.append({
-            'artisan_id': str(row.get('artisan_id', row.get('govt_artisan_id', row.get('id', 'N/A')))),
-            'name': row.get('name', 'Unknown'),
-            'craft_type': row.get('craft_type', 'Traditional Craft'),
-            'state': row.get('state', 'Unknown'),
-            'district': row.get('district', 'Unknown'),
-            'age': int(row.get('age')) if pd.notna(row.get('age')) else 'N/A',
-            'gender': row.get('gender', 'N/A')
-        })
-    return results
+    mask = filter_mask(df, ds.category_codes, equals={k: v for k, v in filters.items() if k in df.columns})
+    return filter_serializer.serialize(take(df, mask, 20))
 
 def get_similar_artisans_from_df(artisan_id: str, limit: int) -> Dict:
-    if df.empty: return {}
-    target = df[df['artisan_id'].astype(str) == artisan_id].iloc[0] if 'artisan_id' in df.columns else None
-    if target is None: return {}
-
-    similar_df = df[
-        (df['craft_type'] == target['craft_type']) &
-        (df['state'] == target['state']) &
-        (df['artisan_id'].astype(str) != artisan_id)
-    ].head(limit)
+    ds = dataset.view()
+    if ds.df.empty or ds.similar_index is None: return {}
+    row = ds.similar_index.row(artisan_id)
+    if row is None: return {}
+
+    # Precomputed feature-vector neighbours (or same district, then state, then craft)
+    similar = ds.similar_index.similar(row, limit, ds.neighbours)
+    artists = similar_serializer.serialize(ds.df.iloc[similar.rows])
+    for artist, level, score in zip(artists, similar.levels.tolist(), similar.scores.tolist()):
+        artist['match_level'] = MATCH_LEVELS[level][0]
+        artist['similarity_score'] = score
     
-    similar_artists = []
-    for _, row in similar_df.iterrows():
-        similar_artists.append({
-            'artisan_id': str(row.get('artisan_id', 'N/A')),
-            'name': row.get('name', 'Unknown'),
-            'craft_type': row.get('craft_type', 'Traditional Craft'),
-            'state': row.get('state', 'Unknown'),
-            'district': row.get('district', 'Unknown')
-        })
-        
     return {
-        'similar_artists': similar_artists,
-        'reference_artisan': {
-            'artisan_id': str(target.get('artisan_id', 'N/A')),
-            'name': target.get('name', 'Unknown'),
-            'craft_type': target.get('craft_type', 'Traditional Craft')
-        }
+        'similar_artists': artists,
+        'total_found': similar.total,
+        'reference_artisan': reference_serializer.serialize(ds.df.iloc[[row]])[0]
     }
 
 # --- API Routes ---
@@ -201,6 +228,7 @@ def get_similar_artisans_from_df(artisan_id: str, limit: int) -> Dict:
 @app.route('/', methods=['GET'])
 def health_check():
     try:
+        df = dataset.view().df
         data_status = "loaded" if not df.empty else "not loaded"
         return jsonify({
             'status': 'healthy',
@@ -212,48 +240,56 @@ def health_check():
         logger.error(f"Health check error: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def chat_payload(query: str, matches: Optional[List[Dict]] = None) -> Dict[str, Any]:
+    """Intent, entities, database matches and suggestions for a chat message
+
+    ``matches`` are artisans the caller already retrieved (e.g. the RAG
+    context); without them the message is searched here.
+    """
+    intent = classify_intent(query)
+    entities = extract_entities_from_query(query)
+    
+    artists = []
+    stats = {}
+    llm_message = ""
+    suggestions = []
+
+    if intent == 'statistics':
+        stats = get_statistics_from_df()
+        llm_message = "Here are the database statistics you requested."
+        suggestions = ["Show craft types", "Artists by state", "Gender distribution"]
+    elif intent == 'search' or intent == 'general':
+        artists = search_artisans(query, max_results=5) if matches is None else matches
+        if artists:
+            llm_message = f"Found {len(artists)} artisan(s) matching your query."
+            suggestions = ["Find similar artists", "Search by location", "Browse other crafts"]
+        else:
+            llm_message = "I couldn't find any artisans matching that query. Please try another one."
+            suggestions = ["Browse craft types", "Find artists in a specific state", "Get general statistics"]
+    else: # help or unknown intent
+        llm_message = "Hello! I am a RAG AI assistant. I can help you search for artisans by craft, location, or name. You can also ask for database statistics."
+        suggestions = ["Show me pottery artists", "Find artists in Rajasthan", "Get database statistics"]
+
+    return {
+        'intent': intent,
+        'entities': entities,
+        'message': llm_message,
+        'artists': artists,
+        'suggestions': suggestions,
+        'stats': stats,
+    }
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     try:
         data = request.get_json()
         query = data.get('message', '')
         
-        if df.empty:
+        if dataset.view().df.empty:
             raise ValueError("CSV data not loaded on the server.")
 
-        intent = classify_intent(query)
-        entities = extract_entities_from_query(query)
-        
-        artists = []
-        stats = {}
-        llm_message = ""
-        suggestions = []
-
-        if intent == 'statistics':
-            stats = get_statistics_from_df()
-            llm_message = "Here are the database statistics you requested."
-            suggestions = ["Show craft types", "Artists by state", "Gender distribution"]
-        elif intent == 'search' or intent == 'general':
-            artists = search_artisans(query, max_results=5)
-            if artists:
-                llm_message = f"Found {len(artists)} artisan(s) matching your query."
-                suggestions = ["Find similar artists", "Search by location", "Browse other crafts"]
-            else:
-                llm_message = "I couldn't find any artisans matching that query. Please try another one."
-                suggestions = ["Browse craft types", "Find artists in a specific state", "Get general statistics"]
-        else: # help or unknown intent
-            llm_message = "Hello! I am a RAG AI assistant. I can help you search for artisans by craft, location, or name. You can also ask for database statistics."
-            suggestions = ["Show me pottery artists", "Find artists in Rajasthan", "Get database statistics"]
-
-        response = {
-            'intent': intent,
-            'entities': entities,
-            'message': llm_message,
-            'artists': artists,
-            'suggestions': suggestions,
-            'stats': stats,
-            'status': 'success'
-        }
+        response = chat_payload(query)
+        response['status'] = 'success'
         
         return jsonify(response)
         
@@ -267,15 +303,45 @@ def chat():
             'artists': [], 'suggestions': [], 'stats': {}
         }), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """SSE variant of /api/chat: database matches first, then the generated answer as it streams"""
+    data = request.get_json() or {}
+    query = data.get('message', '')
+    ds = dataset.view()
+    if ds.df.empty:
+        return jsonify({'status': 'error', 'message': 'CSV data not loaded on the server.'}), 503
+    try:
+        if classify_intent(query) == 'help' or ds.rag is None:
+            payload = chat_payload(query)
+            chunks = [payload['message']]
+        else:
+            # Retrieve once: the artisans sent first are the context the answer is generated from
+            retrieved = ds.rag.retrieve_context(query)
+            payload = chat_payload(query, matches=retrieved['search_results'])
+            chunks = ds.rag.stream_response(query, retrieved=retrieved)
+    except Exception as e:
+        logger.error(f"Chat stream error: {e}")
+        return jsonify({'status': 'error', 'message': 'Failed to process your request. Please try again.'}), 500
+    return sse_response(dataset.hold(answer_events(payload, chunks)))
+
 @app.route('/api/search', methods=['POST'])
 def search_artisans_endpoint():
     try:
         data = request.get_json()
         query = data.get('query', '')
         max_results = data.get('max_results', 10)
+        match = data.get('match', 'any')
+        
+        # ?format=ndjson|csv streams every match instead of the first max_results
+        fmt = request.args.get('format')
+        if fmt:
+            if fmt not in EXPORT_FORMATS:
+                return jsonify({'error': f'Unsupported export format: {fmt}'}), 400
+            return export_response(iter_matches(dataset.view().df, order=search_row_ids(query, match)), search_serializer, fmt)
         
         # Pass a default query to handle empty post requests
-        artists = search_artisans(query, max_results)
+        artists = search_artisans(query, max_results, match)
         
         return jsonify({
             'artists': artists,
@@ -292,6 +358,7 @@ def get_statistics_endpoint():
         stats = get_statistics_from_df()
         return jsonify({
             'stats': stats,
+            'cache': response_cache.stats(),
             'message': 'Database statistics retrieved successfully'
         })
     except Exception as e:
@@ -303,6 +370,13 @@ def filter_artisans_endpoint():
     try:
         data = request.get_json()
         filters = data or {}
+        fmt = request.args.get('format')
+        if fmt:
+            if fmt not in EXPORT_FORMATS:
+                return jsonify({'error': f'Unsupported export format: {fmt}'}), 400
+            ds = dataset.view()
+            equals = {k: v for k, v in filters.items() if k in ds.df.columns}
+            return export_response(iter_matches(ds.df, ds.category_codes, equals=equals), filter_serializer, fmt)
         artists = filter_artisans_from_df(filters)
         return jsonify({
             'artists': artists,
@@ -313,30 +387,6 @@ def filter_artisans_endpoint():
         logger.error(f"Filter endpoint error: {e}")
         return jsonify({'error': 'Filter failed'}), 500
 
-def get_statistics_from_df() -> Dict:
-    if df.empty: return {"error": "No CSV data loaded"}
-    stats = {'total_artisans': len(df)}
-    for col in ['craft_type', 'state', 'district', 'gender']:
-        if col in df.columns:
-            stats[col + 's'] = {str(k): int(v) for k, v in df[col].value_counts().head(10).items()}
-    if 'age' in df.columns and pd.api.types.is_numeric_dtype(df['age']):
-        stats['age_statistics'] = {
-            'average_age': round(float(df['age'].mean()), 1),
-            'median_age': float(df['age'].median()),
-            'min_age': int(df['age'].min()),
-            'max_age': int(df['age'].max())
-        }
-    
-    # --- ADDED LINES TO FIX THE 0+ COUNTS ---
-    if 'craft_type' in df.columns:
-        stats['unique_crafts'] = int(df['craft_type'].nunique())
-
-    if 'state' in df.columns:
-        stats['unique_states'] = int(df['state'].nunique())
-    # --- END OF ADDED LINES ---
-    
-    return stats
-
 @app.route('/api/similar/<artisan_id>', methods=['GET'])
 def get_similar_artists_endpoint(artisan_id):
     try:
@@ -352,6 +402,7 @@ def get_similar_artists_endpoint(artisan_id):
 @app.route('/api/unique-values/<column>', methods=['GET'])
 def get_unique_values_endpoint(column):
     try:
+        df = dataset.view().df
         if df.empty or column not in df.columns:
             return jsonify({'column': column, 'values': [], 'count': 0}), 404
         
@@ -0,0 +1,154 @@
+"""
+BM25 relevance scoring over the artisan text fields.
+
+:class:`BM25Index` is built once at load time as a sparse documents x terms
+matrix (SciPy CSC) holding each term's precomputed BM25 weight per row.
+Field importance is folded in BM25F-style by counting a token found in the
+name (or craft, location, language) field that many times, using the
+weights of :data:`backend.search_index.FIELD_WEIGHTS`.  Scoring a query is
+then a single sparse matrix-vector product over the query's term columns,
+and :func:`top_k` selects the best rows with ``argpartition`` instead of
+sorting every match.
+"""
+
+import logging
+import re
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from backend.search_index import FIELD_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = r'\w+'
+_TOKEN_RE = re.compile(TOKEN_PATTERN)
+# Query tokens that are not in the vocabulary expand to at most this many
+# vocabulary tokens starting with them ("weav" -> "weaving", "weaver", ...).
+MAX_PREFIX_EXPANSIONS = 50
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the ``k`` highest ``scores``, best first, ties in position order."""
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if n > k:
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(n)
+    return candidates[np.lexsort((candidates, -scores[candidates]))][:k]
+
+
+class BM25Index:
+    """Precomputed BM25(F) term weights with sparse query scoring."""
+
+    def __init__(self, weights: sparse.csc_matrix, vocabulary: np.ndarray, k1: float, b: float):
+        self.weights = weights
+        self.vocabulary = vocabulary  # sorted, so prefixes are contiguous ranges
+        self.num_rows = weights.shape[0]
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def from_fields(cls, fields: Sequence[Tuple[Sequence[str], float]], num_rows: int,
+                    k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """Build from ``(texts, boost)`` pairs, one text per row in each field."""
+        rows, tokens, boosts = [], [], []
+        for texts, boost in fields:
+            exploded = pd.Series(texts, dtype=object).fillna('').astype(str).str.lower() \
+                .str.findall(TOKEN_PATTERN).explode().dropna()
+            rows.append(exploded.index.to_numpy(dtype=np.int64))
+            tokens.append(exploded.to_numpy(dtype=object))
+            boosts.append(np.full(len(exploded), boost, dtype=np.float64))
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        tokens = np.concatenate(tokens) if tokens else np.empty(0, dtype=object)
+        boosts = np.concatenate(boosts) if boosts else np.empty(0)
+
+        codes, vocabulary = pd.factorize(tokens, sort=True)
+        tf = sparse.coo_matrix((boosts, (rows, codes)), shape=(num_rows, len(vocabulary))).tocsr()
+        tf.sum_duplicates()
+
+        doc_len = np.asarray(tf.sum(axis=1)).ravel()
+        avg_len = doc_len.mean() if num_rows and doc_len.mean() > 0 else 1.0
+        doc_freq = np.bincount(tf.indices, minlength=len(vocabulary))
+        idf = np.log1p((num_rows - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        # w = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_len)), per stored entry
+        row_of_entry = np.repeat(np.arange(num_rows), np.diff(tf.indptr))
+        norm = k1 * (1 - b + b * doc_len[row_of_entry] / avg_len)
+        data = idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + norm)
+        weights = sparse.csr_matrix((data, tf.indices, tf.indptr), shape=tf.shape).tocsc()
+
+        index = cls(weights, np.asarray(vocabulary, dtype=object), k1, b)
+        logger.info(f"Built BM25 index: {len(vocabulary)} terms, {weights.nnz} entries over {num_rows} rows")
+        return index
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, field_weights=FIELD_WEIGHTS, **kwargs) -> "BM25Index":
+        fields = []
+        for _, columns, weight in field_weights:
+            for col in columns:
+                if col in frame.columns:
+                    fields.append((frame[col].astype(object).to_numpy(), weight))
+        return cls.from_fields(fields, len(frame), **kwargs)
+
+    def term_ids(self, terms: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Vocabulary columns for the query ``terms`` and how often each was asked for."""
+        counts: Dict[int, float] = {}
+        for term in terms:
+            for token in _TOKEN_RE.findall(str(term).lower()):
+                lo = int(np.searchsorted(self.vocabulary, token, side='left'))
+                if lo < len(self.vocabulary) and self.vocabulary[lo] == token:
+                    ids = [lo]
+                else:
+                    hi = int(np.searchsorted(self.vocabulary, token + '\uffff', side='left'))
+                    ids = range(lo, min(hi, lo + MAX_PREFIX_EXPANSIONS))
+                for i in ids:
+                    counts[i] = counts.get(i, 0.0) + 1.0
+        ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        return ids, np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+
+    def scores(self, terms: Sequence[str]) -> np.ndarray:
+        """BM25 score of every row for ``terms`` (0 where nothing matches)."""
+        ids, counts = self.term_ids(terms)
+        if not len(ids):
+            return np.zeros(self.num_rows)
+        return np.asarray(self.weights[:, ids] @ counts).ravel()
+
+    def top_k(self, terms: Sequence[str], k: int, candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The ``k`` best rows and their scores.
+
+        Without ``candidates`` only rows scoring above zero are eligible;
+        with them (row positions, e.g. from a filter or substring search)
+        exactly those rows are ranked.
+        """
+        scores = self.scores(terms)
+        if candidates is None:
+            candidates = np.flatnonzero(scores > 0)
+        best = top_k(scores[candidates], k)
+        return candidates[best], scores[candidates][best]
+
+    def ranked(self, terms: Sequence[str], mask: Optional[np.ndarray] = None) -> "RankedRows":
+        """Rows matching ``terms`` (and ``mask``), ranked lazily for paging."""
+        return RankedRows(self.scores(terms), mask)
+
+
+class RankedRows:
+    """Matching rows in score order, selected only as deep as a page needs."""
+
+    def __init__(self, scores: np.ndarray, mask: Optional[np.ndarray] = None):
+        self.mask = scores > 0 if mask is None else (scores > 0) & mask
+        self.rows = np.flatnonzero(self.mask)
+        self.scores = scores[self.rows]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def head(self, n: int) -> np.ndarray:
+        """The ``n`` best rows, best first."""
+        return self.rows[top_k(self.scores, n)]
@@ -0,0 +1,74 @@
+"""
+Code lookups for the dictionary-encoded (``category`` dtype) artisan columns.
+
+The low-cardinality columns are stored as pandas Categoricals by the loader.
+:class:`CategoryCodes` precomputes a normalised name -> category code map per
+column so equality filters become integer comparisons on the code array, and
+substring filters are evaluated once over the (small) category list instead
+of over every row.
+"""
+
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ['state', 'district', 'craft_type', 'gender', 'artisan_cluster_code']
+_NO_CODES = np.empty(0, dtype=np.int32)
+
+
+def normalize_category(value) -> str:
+    return str(value).strip().lower()
+
+
+def encode_categoricals(df: pd.DataFrame, columns: Iterable[str] = CATEGORICAL_COLUMNS) -> pd.DataFrame:
+    """Convert ``columns`` of ``df`` to the ``category`` dtype in place."""
+    for col in columns:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+class CategoryCodes:
+    """Normalised value -> category codes for every categorical column of a frame."""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.categories: Dict[str, pd.Index] = {}
+        self.lookup: Dict[str, Dict[str, np.ndarray]] = {}
+        for col in frame.columns:
+            if not isinstance(frame[col].dtype, pd.CategoricalDtype):
+                continue
+            categories = frame[col].cat.categories
+            grouped: Dict[str, list] = {}
+            for code, value in enumerate(categories):
+                grouped.setdefault(normalize_category(value), []).append(code)
+            self.categories[col] = categories
+            self.lookup[col] = {name: np.asarray(codes, dtype=np.int32) for name, codes in grouped.items()}
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.lookup
+
+    def codes_equal(self, column: str, value) -> np.ndarray:
+        """Codes whose category equals ``value`` ignoring case and surrounding spaces."""
+        return self.lookup[column].get(normalize_category(value), _NO_CODES)
+
+    def codes_containing(self, column: str, pattern: str, regex: bool = True) -> np.ndarray:
+        """Codes whose category contains ``pattern`` (case-insensitive, like ``str.contains``)."""
+        matches = pd.Series(self.categories[column]).astype(str).str.contains(
+            pattern, case=False, na=False, regex=regex
+        )
+        return np.flatnonzero(matches.to_numpy()).astype(np.int32)
+
+    @staticmethod
+    def mask(frame: pd.DataFrame, column: str, codes: np.ndarray) -> np.ndarray:
+        """Boolean row mask of ``frame`` for rows whose ``column`` code is in ``codes``."""
+        row_codes = frame[column].cat.codes.to_numpy()
+        if len(codes) == 1:
+            return row_codes == codes[0]
+        return np.isin(row_codes, codes)
+
+    def equals_mask(self, frame: pd.DataFrame, column: str, value) -> np.ndarray:
+        return self.mask(frame, column, self.codes_equal(column, value))
+
+    def contains_mask(self, frame: pd.DataFrame, column: str, pattern: str) -> np.ndarray:
+        return self.mask(frame, column, self.codes_containing(column, pattern))
@@ -0,0 +1,87 @@
+"""
+Shared loading and preprocessing of ``Artisans.csv``.
+
+Every backend goes through :func:`load_artisan_frame`, which memory-maps the
+columnar snapshot (see :mod:`backend.snapshot`) when it is fresh and only
+parses the CSV, cleans phone numbers and builds ``search_text`` when it is
+not.  Run ``python -m backend.dataset path/to/Artisans.csv`` as a deploy step
+to write the snapshot before workers start.
+"""
+
+import logging
+import sys
+import time
+
+import pandas as pd
+
+from backend.categorical import CATEGORICAL_COLUMNS, encode_categoricals
+from backend.snapshot import file_sha256, is_fresh, read_manifest, read_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever prepare_artisan_frame changes so older snapshots are rebuilt.
+SNAPSHOT_SCHEMA = "artisans-v1"
+SEARCHABLE_COLUMNS = ['name', 'craft_type', 'state', 'district', 'village', 'languages_spoken', 'languages']
+
+
+def clean_phone_numbers(series: pd.Series) -> pd.Series:
+    """Render phone numbers as plain digit strings ('' when unusable)."""
+    cleaned = series.astype(str).str.replace(r'\.\d+', '', regex=True)
+    return cleaned.apply(lambda x: f"{int(float(x))}" if pd.notna(x) and x.replace('.', '', 1).isdigit() else '')
+
+
+def prepare_artisan_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalise a raw artisan frame: numeric ages, clean phones, ``search_text``
+    and categorical storage for the low-cardinality filter columns."""
+    if 'age' in df.columns:
+        df['age'] = pd.to_numeric(df['age'], errors='coerce')
+    for col in [col for col in df.columns if 'phone' in col.lower()]:
+        if col.endswith('_boolean'):
+            continue
+        df[col] = clean_phone_numbers(df[col])
+
+    searchable_cols = [col for col in SEARCHABLE_COLUMNS if col in df.columns]
+    if searchable_cols:
+        df['search_text'] = df[searchable_cols].fillna('').astype(str).agg(' '.join, axis=1).str.lower()
+    else:
+        df['search_text'] = ''
+    return encode_categoricals(df)
+
+
+def load_artisan_frame(csv_path: str) -> pd.DataFrame:
+    """Load the preprocessed artisan frame, preferring a fresh columnar snapshot."""
+    started = time.perf_counter()
+    try:
+        frame = read_snapshot(csv_path, SNAPSHOT_SCHEMA, categorical=CATEGORICAL_COLUMNS)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable snapshot for {csv_path}: {e}")
+        frame = None
+
+    if frame is None:
+        frame = prepare_artisan_frame(pd.read_csv(csv_path))
+        try:
+            write_snapshot(frame, csv_path, SNAPSHOT_SCHEMA)
+        except OSError as e:
+            logger.warning(f"Could not write snapshot for {csv_path}: {e}")
+
+    logger.info(f"Artisan frame ready in {time.perf_counter() - started:.2f}s ({len(frame)} rows)")
+    return frame
+
+
+def dataset_version(csv_path: str) -> str:
+    """Short identifier of the CSV contents and preprocessing schema (e.g. for cache keys)."""
+    manifest = read_manifest(csv_path)
+    if is_fresh(manifest, csv_path, SNAPSHOT_SCHEMA) and manifest['source'].get('sha256'):
+        digest = manifest['source']['sha256']
+    else:
+        digest = file_sha256(csv_path)
+    return f"{SNAPSHOT_SCHEMA}:{digest[:16]}"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 2:
+        print("Usage: python -m backend.dataset path/to/Artisans.csv")
+        sys.exit(1)
+    path = sys.argv[1]
+    write_snapshot(prepare_artisan_frame(pd.read_csv(path)), path, SNAPSHOT_SCHEMA)
@@ -0,0 +1,218 @@
+"""
+Single-pass state and craft extraction for chat messages.
+
+:class:`EntityMatcher` compiles an Aho-Corasick automaton once from the
+loaded data: normalised state names (plus every word of multi-word names),
+the state aliases documented in ``public/Search_API__GUIDE.md``, craft names
+and the craft keyword synonyms.  Extracting entities from a message is then
+one walk over the message regardless of how many states or crafts exist.
+Build a new matcher whenever the dataset is (re)loaded.
+"""
+
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+CRAFT_KEYWORDS = {
+    'pottery': ['pottery', 'potter', 'ceramic', 'clay', 'pot'],
+    'weaving': ['weaving', 'textile', 'fabric', 'cloth', 'weaver'],
+    'wood': ['wood', 'carving', 'wooden', 'carpenter'],
+    'metal': ['metal', 'iron', 'steel', 'brass', 'copper'],
+    'leather': ['leather', 'hide', 'skin'],
+    'embroidery': ['embroidery', 'stitch', 'needle'],
+    'painting': ['painting', 'paint', 'artist', 'canvas'],
+    'jewelry': ['jewelry', 'jewel', 'ornament', 'gold', 'silver'],
+    'basket': ['basket', 'bamboo', 'cane'],
+    'stone': ['stone', 'marble', 'sculpture']
+}
+
+# State name variations supported by the search API (see Search_API__GUIDE.md).
+STATE_ALIASES = {
+    'Uttar Pradesh': ['UP', 'U.P.'],
+    'Maharashtra': ['MH'],
+    'West Bengal': ['Bengal', 'WB'],
+    'Andhra Pradesh': ['AP', 'Andhra'],
+    'Madhya Pradesh': ['MP', 'M.P.', 'Central Pradesh'],
+    'Tamil Nadu': ['Tamilnadu', 'TN', 'Tamil Naidu'],
+    'Rajasthan': ['RJ'],
+    'Karnataka': ['KN', 'Mysore'],
+    'Gujarat': ['GJ'],
+    'Odisha': ['Orissa', 'OR'],
+    'Kerala': ['KL', 'Kerela'],
+    'Jharkhand': ['JH'],
+    'Punjab': ['PB'],
+    'Haryana': ['HR'],
+    'Chhattisgarh': ['Chattisgarh', 'CG'],
+    'Himachal Pradesh': ['Himachal', 'HP', 'H.P.'],
+    'Jammu & Kashmir': ['Jammu and Kashmir', 'Kashmir', 'J&K', 'JK'],
+    'Uttarakhand': ['Uttaranchal', 'UK'],
+    'Tripura': ['TR'],
+    'Meghalaya': ['ML'],
+    'Manipur': ['MN'],
+    'Nagaland': ['NL'],
+    'Mizoram': ['MZ'],
+    'Arunachal Pradesh': ['Arunachal'],
+    'Sikkim': ['SK'],
+    'Telangana': ['TS'],
+    'Delhi': ['New Delhi', 'DL'],
+    'Chandigarh': ['CH'],
+    'Puducherry': ['Pondicherry', 'PY'],
+    'Lakshadweep': ['LD'],
+    'Andaman & Nicobar': ['Andaman', 'Nicobar', 'Andaman and Nicobar', 'AN'],
+    'Dadra & Nagar Haveli': ['Dadra', 'Nagar Haveli', 'DN'],
+    'Daman & Diu': ['Daman', 'Diu', 'DD'],
+}
+
+# Match kinds, in priority order
+STATE_NAME, STATE_WORD, STATE_ALIAS, CRAFT_NAME, CRAFT_KEYWORD = range(5)
+
+
+def normalize_text(text: str) -> str:
+    """Lower-case, strip punctuation and collapse whitespace."""
+    return ' '.join(re.sub(r'[^\w\s]', '', text.lower()).split())
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton mapping patterns to payloads."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, object]]] = [[]]
+
+    def add(self, pattern: str, payload) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(pattern), payload))
+
+    def build(self) -> "AhoCorasick":
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0) if node else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        return self
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, object]]:
+        """Yield ``(start, end, payload)`` for every pattern occurrence in ``text``."""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, payload in self._out[node]:
+                yield i - length + 1, i + 1, payload
+
+
+class EntityMatcher:
+    """Extracts every state and craft mentioned in a message in one pass."""
+
+    def __init__(self, states: Iterable[str], crafts: Iterable[str]):
+        self.states = [s for s in dict.fromkeys(states) if isinstance(s, str)]
+        self.crafts = [c for c in dict.fromkeys(crafts) if isinstance(c, str)]
+        self._automaton = AhoCorasick()
+        # State name -> number of distinct significant words it needs for a word match
+        self._state_words: Dict[int, int] = {}
+
+        by_normalized = {}
+        for rank, state in enumerate(self.states):
+            normalized = normalize_text(state)
+            if not normalized:
+                continue
+            by_normalized.setdefault(normalized, rank)
+            self._automaton.add(normalized, (STATE_NAME, rank, None))
+            words = {word for word in normalized.split() if len(word) > 2}
+            if len(words) > 1:
+                self._state_words[rank] = len(words)
+                for word in words:
+                    self._automaton.add(word, (STATE_WORD, rank, word))
+
+        for canonical, aliases in STATE_ALIASES.items():
+            names = [canonical] + aliases
+            rank = next((by_normalized[normalize_text(n)] for n in names if normalize_text(n) in by_normalized), None)
+            if rank is None:
+                continue
+            for alias in aliases:
+                stripped = re.sub(r'[^\w\s]', '', alias)
+                # Short upper-case abbreviations ("UP", "OR") only count when
+                # written in capitals, so ordinary words do not match.
+                abbreviation = stripped.isupper() and len(stripped) <= 3
+                self._automaton.add(normalize_text(alias), (STATE_ALIAS, rank, abbreviation))
+
+        for rank, craft in enumerate(self.crafts):
+            normalized = normalize_text(craft)
+            if normalized:
+                self._automaton.add(normalized, (CRAFT_NAME, rank, None))
+
+        # Keyword categories resolve to the first craft whose name contains the category.
+        for category_rank, (category, keywords) in enumerate(CRAFT_KEYWORDS.items()):
+            craft_rank = next((r for r, c in enumerate(self.crafts) if category in normalize_text(c)), None)
+            if craft_rank is None:
+                continue
+            for keyword in keywords:
+                self._automaton.add(keyword, (CRAFT_KEYWORD, category_rank, craft_rank))
+
+        self._automaton.build()
+
+    def extract(self, message: str) -> Dict[str, List[str]]:
+        """All states and crafts mentioned in ``message``, best match first."""
+        original = ' '.join(re.sub(r'[^\w\s]', '', message).split())
+        text = original.lower()
+        case_checked = len(text) == len(original)
+
+        state_hits: Dict[int, int] = {}
+        words_seen: Dict[int, set] = {}
+        craft_hits: Dict[int, Tuple[int, int]] = {}
+
+        for start, end, (kind, rank, extra) in self._automaton.iter_matches(text):
+            bounded = ((start == 0 or not _is_word_char(text[start - 1])) and
+                       (end == len(text) or not _is_word_char(text[end])))
+            if kind == STATE_NAME:
+                state_hits[rank] = min(state_hits.get(rank, STATE_NAME), STATE_NAME)
+            elif kind == STATE_WORD:
+                if bounded:
+                    words_seen.setdefault(rank, set()).add(extra)
+                    if len(words_seen[rank]) == self._state_words[rank]:
+                        state_hits[rank] = min(state_hits.get(rank, STATE_WORD), STATE_WORD)
+            elif kind == STATE_ALIAS:
+                if bounded and (not extra or (case_checked and original[start:end].isupper())):
+                    state_hits[rank] = min(state_hits.get(rank, STATE_ALIAS), STATE_ALIAS)
+            elif kind == CRAFT_NAME:
+                craft_hits[rank] = (CRAFT_NAME, -1)
+            elif kind == CRAFT_KEYWORD:
+                best = craft_hits.get(extra)
+                if best is None or best > (CRAFT_KEYWORD, rank):
+                    craft_hits[extra] = (CRAFT_KEYWORD, rank)
+
+        # Full-name and all-words matches rank by data order, then aliases
+        states = sorted(state_hits, key=lambda r: (state_hits[r] == STATE_ALIAS, r))
+        crafts = sorted(craft_hits, key=lambda r: (craft_hits[r], r))
+        return {
+            'states': [self.states[r] for r in states],
+            'crafts': [self.crafts[r] for r in crafts],
+        }
+
+    def find_state(self, message: str) -> Optional[str]:
+        states = self.extract(message)['states']
+        return states[0] if states else None
+
+    def find_craft(self, message: str) -> Optional[str]:
+        crafts = self.extract(message)['crafts']
+        return crafts[0] if crafts else None
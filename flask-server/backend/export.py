@@ -0,0 +1,82 @@
+"""
+Streaming NDJSON / CSV export of filtered artisan rows.
+
+:func:`iter_matches` evaluates the filters lazily, one block of rows at a
+time, and :func:`export_lines` turns each block into NDJSON or CSV text as it
+is produced.  Wrapped in a Flask streaming response, an export of any size
+keeps only one block of rows in memory.
+"""
+
+import csv
+import io
+import json
+import math
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backend.categorical import CategoryCodes
+from backend.filters import filter_mask
+
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_matches(frame: pd.DataFrame, codes: Optional[CategoryCodes] = None, order: Optional[np.ndarray] = None,
+                 chunk_rows: int = EXPORT_CHUNK_ROWS, **criteria) -> Iterator[pd.DataFrame]:
+    """
+    Yield the rows of ``frame`` matching ``criteria`` block by block.
+
+    ``criteria`` are the ``equals``/``contains``/``ranges`` arguments of
+    :func:`backend.filters.filter_mask`.  Rows are visited in frame order, or
+    in the order of the row positions in ``order`` (a sort permutation or a
+    search result) when given.
+    """
+    total = len(frame) if order is None else len(order)
+    for start in range(0, total, chunk_rows):
+        if order is None:
+            block = frame.iloc[start:start + chunk_rows]
+        else:
+            block = frame.iloc[order[start:start + chunk_rows]]
+        if criteria:
+            block = block[filter_mask(block, codes, **criteria)]
+        if len(block):
+            yield block
+
+
+def _json_safe(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def export_lines(blocks: Iterable[pd.DataFrame], to_records: Callable[[pd.DataFrame], List[Dict]],
+                 fmt: str, fieldnames: Sequence[str] = None) -> Iterator[str]:
+    """Render each block as NDJSON lines or CSV rows (CSV gets a header first)."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    buffer = io.StringIO()
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=list(fieldnames), extrasaction='ignore')
+        writer.writeheader()
+        yield buffer.getvalue()
+    for block in blocks:
+        records = to_records(block)
+        if writer is None:
+            yield ''.join(
+                json.dumps({k: _json_safe(v) for k, v in record.items()}, default=str) + '\n'
+                for record in records
+            )
+        else:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows({k: '' if _json_safe(v) is None else v for k, v in record.items()}
+                             for record in records)
+            yield buffer.getvalue()
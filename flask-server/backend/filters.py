@@ -0,0 +1,68 @@
+"""
+Copy-free filtering of the artisan frame.
+
+Filters are composed into a single boolean row mask (categorical columns via
+their integer codes, see :mod:`backend.categorical`), and only the rows of
+the requested page are materialised with :func:`take`.  No request copies
+the whole frame, so per-request memory depends on the page size rather than
+on the size of the dataset.
+"""
+
+from typing import Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.categorical import CategoryCodes
+
+# Rows of the mask inspected at a time when collecting a page
+TAKE_BLOCK = 65536
+
+
+def filter_mask(frame: pd.DataFrame, codes: Optional[CategoryCodes], equals: Mapping = None,
+                contains: Mapping = None, ranges: Mapping[str, Tuple] = None) -> np.ndarray:
+    """
+    Boolean mask of the rows of ``frame`` matching every filter.
+
+    ``equals`` maps columns to values compared case-insensitively,
+    ``contains`` maps columns to substrings (``str.contains`` semantics) and
+    ``ranges`` maps numeric columns to inclusive ``(low, high)`` bounds where
+    either bound may be ``None``.  Unknown columns match nothing.
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    for column, value in (equals or {}).items():
+        if codes is not None and column in codes:
+            mask &= codes.equals_mask(frame, column, value)
+        elif column in frame.columns:
+            mask &= (frame[column].astype(str).str.lower() == str(value).lower()).to_numpy()
+        else:
+            mask[:] = False
+    for column, pattern in (contains or {}).items():
+        if codes is not None and column in codes:
+            mask &= codes.contains_mask(frame, column, pattern)
+        elif column in frame.columns:
+            mask &= frame[column].str.contains(pattern, case=False, na=False).to_numpy(dtype=bool)
+        else:
+            mask[:] = False
+    for column, (low, high) in (ranges or {}).items():
+        values = frame[column].to_numpy()
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+    return mask
+
+
+def take(frame: pd.DataFrame, mask: np.ndarray, limit: Optional[int] = None) -> pd.DataFrame:
+    """The first ``limit`` matching rows, the only rows that get copied."""
+    if limit is None:
+        return frame.iloc[np.flatnonzero(mask)]
+    # Scan the mask in blocks and stop once the page is full
+    rows, remaining = [], limit
+    for start in range(0, len(mask), TAKE_BLOCK):
+        if remaining <= 0:
+            break
+        hits = np.flatnonzero(mask[start:start + TAKE_BLOCK])[:remaining] + start
+        rows.append(hits)
+        remaining -= len(hits)
+    return frame.iloc[np.concatenate(rows) if rows else np.empty(0, dtype=np.intp)]
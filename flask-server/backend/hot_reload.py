@@ -0,0 +1,365 @@
+"""
+Zero-downtime dataset reloads by snapshot swap.
+
+Everything a backend derives from the artisan CSV (the frame, its indexes,
+stats and matchers) is built into one immutable :class:`DatasetSnapshot`.
+:class:`SnapshotPublisher` serves the current snapshot, rebuilds a new one
+on a background thread when asked to (admin endpoint) or when the CSV
+changes (watcher), and publishes it with a single reference swap.
+
+Requests acquire the snapshot once (see :meth:`SnapshotPublisher.bind`) and
+keep that consistent view until they finish; streamed bodies hold it until
+they are sent (:meth:`SnapshotPublisher.hold`).
+A replaced snapshot is counted down as its readers release it and its
+contents are dropped when the last one does.
+
+Under a pre-forking server with a preloaded app, reloads happen in the
+master and reach the workers by re-forking them (see :mod:`backend.prefork`).
+"""
+
+import hmac
+import logging
+import os
+import threading
+import time
+import weakref
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional
+
+from flask import Flask, g, has_request_context, jsonify, request
+
+from backend import prefork
+from backend.snapshot import csv_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCH_INTERVAL = 0.0  # seconds between CSV checks; 0 disables the watcher
+
+# Every publisher in the process, for reload_all()
+_publishers: "weakref.WeakSet[SnapshotPublisher]" = weakref.WeakSet()
+
+
+class DatasetSnapshot:
+    """One immutable, versioned set of dataset objects, exposed as attributes."""
+
+    def __init__(self, version: int, parts: Mapping[str, Any], source: Optional[Dict] = None):
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'parts', MappingProxyType(dict(parts)))
+        object.__setattr__(self, 'source', source)
+        object.__setattr__(self, 'loaded_at', time.time())
+        object.__setattr__(self, 'readers', 0)
+        object.__setattr__(self, 'retired', False)
+        object.__setattr__(self, '_derived', {})
+
+    def __getattr__(self, name: str):
+        try:
+            return self.parts[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def derive(self, name: str, build: Callable[[], Any]):
+        """``build()`` once per snapshot, for indexes that are only built on first use."""
+        if name not in self._derived:
+            self._derived.setdefault(name, build())
+        return self._derived[name]
+
+    def __setattr__(self, name: str, value):
+        raise AttributeError("DatasetSnapshot is immutable")
+
+    def _set(self, name: str, value):
+        object.__setattr__(self, name, value)
+
+
+class SnapshotPublisher:
+    """
+    Publishes dataset snapshots built by ``build``.
+
+    ``build()`` returns the snapshot's parts as a dict and raises on
+    failure; a failed reload keeps serving the previous snapshot.
+    ``source_path`` is the file the watcher polls for changes.
+    ``describe(snapshot)`` adds entries about the current snapshot to
+    :meth:`stats`.
+    """
+
+    def __init__(self, build: Callable[[], Dict[str, Any]], source_path: Optional[str] = None,
+                 name: str = 'dataset', describe: Optional[Callable[[DatasetSnapshot], Dict]] = None):
+        self.build = build
+        self.source_path = source_path
+        self.name = name
+        self.describe = describe
+        self._current: Optional[DatasetSnapshot] = None
+        self._retired = []
+        self._version = 0
+        self._lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._watch_interval = DEFAULT_WATCH_INTERVAL
+        self._requested: Optional[Dict] = None
+        self._stop = threading.Event()
+        self.last_error: Optional[str] = None
+        self.last_reload_seconds: Optional[float] = None
+        _publishers.add(self)
+        prefork.after_fork(self, '_after_fork')
+
+    def _after_fork(self):
+        # Threads are not inherited and the lock may have been held mid-fork
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reload_thread = None
+        watching, self._watcher = self._watcher is not None, None
+        if watching and not prefork.is_worker():
+            self.start_watcher(self._watch_interval)
+
+    # -- publishing -------------------------------------------------------
+
+    def _fingerprint(self) -> Optional[Dict]:
+        if self.source_path and os.path.exists(self.source_path):
+            return csv_fingerprint(self.source_path, with_hash=False)
+        return None
+
+    def publish(self, parts: Mapping[str, Any], source: Optional[Dict] = None) -> DatasetSnapshot:
+        """Make ``parts`` the current snapshot; the previous one is retired."""
+        with self._lock:
+            self._version += 1
+            snapshot = DatasetSnapshot(self._version, parts, source)
+            previous, self._current = self._current, snapshot
+            if previous is not None:
+                previous._set('retired', True)
+                if previous.readers == 0:
+                    self._reclaim(previous)
+                else:
+                    self._retired.append(previous)
+        logger.info(f"Published {self.name} snapshot v{snapshot.version}")
+        return snapshot
+
+    def load(self) -> DatasetSnapshot:
+        """Build and publish synchronously (the initial load)."""
+        source = self._fingerprint()
+        started = time.perf_counter()
+        snapshot = self.publish(self.build(), source)
+        self.last_reload_seconds = round(time.perf_counter() - started, 3)
+        return snapshot
+
+    def reload(self) -> bool:
+        """
+        Rebuild on a background thread; False if a reload is already running.
+
+        In a pre-forked worker the master is asked to reload instead.
+        """
+        if prefork.is_worker():
+            prefork.request_reload()
+            return True
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self._reload_thread = threading.Thread(target=self._reload, name=f"{self.name}-reload", daemon=True)
+            self._reload_thread.start()
+        return True
+
+    def _reload(self):
+        try:
+            self.load()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.exception(f"Reloading {self.name} failed; still serving v{self._version}")
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until a running reload finishes."""
+        thread = self._reload_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    # -- readers ----------------------------------------------------------
+
+    @property
+    def current(self) -> DatasetSnapshot:
+        return self._current
+
+    def acquire(self) -> DatasetSnapshot:
+        with self._lock:
+            snapshot = self._current
+            snapshot._set('readers', snapshot.readers + 1)
+        return snapshot
+
+    def release(self, snapshot: DatasetSnapshot):
+        with self._lock:
+            snapshot._set('readers', snapshot.readers - 1)
+            if snapshot.retired and snapshot.readers == 0 and snapshot in self._retired:
+                self._retired.remove(snapshot)
+                self._reclaim(snapshot)
+
+    def _reclaim(self, snapshot: DatasetSnapshot):
+        # Drop the contents now rather than whenever the snapshot object itself goes away
+        snapshot._set('parts', MappingProxyType({}))
+        snapshot._set('_derived', {})
+        logger.info(f"Released {self.name} snapshot v{snapshot.version}")
+
+    def view(self) -> DatasetSnapshot:
+        """The snapshot of the current request, or the current one outside requests."""
+        if has_request_context():
+            snapshot = g.get(f'_{self.name}_snapshot')
+            if snapshot is not None:
+                return snapshot
+        return self._current
+
+    def hold(self, iterable: Iterable) -> Iterator:
+        """
+        Keep the request's snapshot acquired until ``iterable`` is exhausted or closed.
+
+        Flask tears the request down when the view returns, before a
+        streamed body is sent, so streaming responses wrap their body in this.
+        """
+        snapshot = self.view()
+        with self._lock:
+            snapshot._set('readers', snapshot.readers + 1)
+        return _HeldIterator(iterable, lambda: self.release(snapshot))
+
+    def bind(self, app: Flask):
+        """Acquire a snapshot for every request of ``app`` and release it on teardown."""
+        key = f'_{self.name}_snapshot'
+
+        @app.before_request
+        def _acquire_snapshot():
+            if self._current is not None:
+                setattr(g, key, self.acquire())
+
+        @app.teardown_request
+        def _release_snapshot(exc=None):
+            snapshot = g.pop(key, None)
+            if snapshot is not None:
+                self.release(snapshot)
+
+    # -- watching ---------------------------------------------------------
+
+    def start_watcher(self, interval: Optional[float] = None):
+        """Reload whenever ``source_path`` changes, checking every ``interval`` seconds."""
+        if interval is None:
+            interval = float(os.getenv('DATASET_WATCH_INTERVAL', DEFAULT_WATCH_INTERVAL))
+        if interval <= 0 or not self.source_path or self._watcher is not None:
+            return
+        self._watch_interval = interval
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name=f"{self.name}-watcher",
+                                         daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                fingerprint = self._fingerprint()
+                current = self._current
+                if fingerprint is None or current is None or fingerprint == current.source:
+                    continue
+                if prefork.is_master():
+                    # The master reloads on SIGHUP and re-forks the workers; ask once per change
+                    if fingerprint != self._requested:
+                        self._requested = fingerprint
+                        logger.info(f"{self.source_path} changed; asking the master to reload")
+                        prefork.request_reload()
+                    continue
+                logger.info(f"{self.source_path} changed; reloading {self.name}")
+                self.reload()
+                self.wait()
+            except Exception:
+                logger.exception(f"Watching {self.source_path} failed")
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        current = self._current
+        with self._lock:
+            retired = [{'version': s.version, 'readers': s.readers} for s in self._retired]
+        stats = {
+            'version': current.version if current else None,
+            'loaded_at': current.loaded_at if current else None,
+            'readers': current.readers if current else 0,
+            'retired': retired,
+            'reloading': self._reload_thread is not None and self._reload_thread.is_alive(),
+            'last_reload_seconds': self.last_reload_seconds,
+            'last_error': self.last_error,
+            'watching': self._watcher is not None,
+            'pid': os.getpid(),
+            'memory_mb': prefork.memory_usage(),
+        }
+        if current is not None and self.describe is not None:
+            stats.update(self.describe(current))
+        return stats
+
+
+def reload_all():
+    """Rebuild every publisher's snapshot synchronously (the pre-fork master's ``on_reload``)."""
+    for publisher in list(_publishers):
+        try:
+            publisher.load()
+            publisher.last_error = None
+        except Exception as e:
+            publisher.last_error = str(e)
+            logger.exception(f"Reloading {publisher.name} failed; still serving the previous snapshot")
+
+
+class _HeldIterator:
+    """Iterates ``iterable`` and calls ``release`` once, on exhaustion or ``close()``."""
+
+    def __init__(self, iterable: Iterable, release: Callable[[], None]):
+        self._iterator = iter(iterable)
+        self._release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        close = getattr(self._iterator, 'close', None)
+        if close is not None:
+            close()
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+
+def _admin_allowed() -> bool:
+    """``ADMIN_TOKEN`` in the ``X-Admin-Token`` header; without a configured token nobody is allowed.
+
+    The caller's address is not trusted: behind a local reverse proxy every
+    request would look like it came from localhost.
+    """
+    token = os.getenv('ADMIN_TOKEN')
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+
+
+def _forbidden():
+    message = "Forbidden" if os.getenv('ADMIN_TOKEN') else "Admin routes are disabled until ADMIN_TOKEN is set"
+    return jsonify({"error": message}), 403
+
+
+def register_reload_routes(app: Flask, publisher: SnapshotPublisher, prefix: str = '/admin'):
+    """``POST {prefix}/reload`` starts a background reload; ``GET {prefix}/dataset`` reports status."""
+    if not os.getenv('ADMIN_TOKEN'):
+        logger.warning(f"ADMIN_TOKEN is not set: {prefix}/reload and {prefix}/dataset will refuse every request")
+
+    @app.route(f"{prefix}/reload", methods=["POST"], endpoint=f"{publisher.name}_reload")
+    def _reload_dataset():
+        if not _admin_allowed():
+            return _forbidden()
+        started = publisher.reload()
+        if prefork.is_worker():
+            message = "Reload requested from the master process"
+        else:
+            message = "Reload started" if started else "Reload already running"
+        body = {**publisher.stats(), "message": message}
+        return jsonify(body), 202 if started else 409
+
+    @app.route(f"{prefix}/dataset", methods=["GET"], endpoint=f"{publisher.name}_status")
+    def _dataset_status():
+        if not _admin_allowed():
+            return _forbidden()
+        return jsonify(publisher.stats())
@@ -0,0 +1,153 @@
+"""
+Bounded, coalescing dispatch of slow upstream (LLM) calls.
+
+Request handlers hand their LLM call to :class:`LLMDispatcher` instead of
+making it inline.  The dispatcher runs calls on a bounded thread pool,
+limits how many calls run at once per upstream, and coalesces identical
+in-flight requests (single-flight), so a burst of the same popular question
+costs one upstream call.  Every call has a deadline: when it passes, the
+caller gets its database-only fallback immediately while the upstream call
+finishes in the background (and can still fill the response cache).
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from backend import prefork
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_UPSTREAM_LIMIT = 4
+DEFAULT_DEADLINE = 15.0
+
+
+class UpstreamBusy(RuntimeError):
+    """The upstream's concurrency limit stayed saturated past the deadline."""
+
+
+class DispatchResult(NamedTuple):
+    value: Any
+    source: str  # 'upstream', 'coalesced' or 'fallback'
+    error: Optional[str] = None
+    timed_out: bool = False  # fell back because of the deadline (or a saturated upstream), not an error
+
+
+class LLMDispatcher:
+    """Thread-pool dispatcher with single-flight, per-upstream limits and deadlines."""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, upstream_limit: int = DEFAULT_UPSTREAM_LIMIT,
+                 deadline: float = DEFAULT_DEADLINE, upstream_limits: Optional[Dict[str, int]] = None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-dispatch')
+        self.upstream_limit = upstream_limit
+        self.deadline = deadline
+        self._limits = dict(upstream_limits or {})
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._in_flight: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self._counters = {'calls': 0, 'coalesced': 0, 'fallbacks': 0, 'errors': 0}
+        self._max_workers = max_workers
+        prefork.after_fork(self, '_after_fork')
+
+    def _after_fork(self):
+        # A pool created before fork() has no threads in the child
+        self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='llm-dispatch')
+        self._semaphores = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LLMDispatcher":
+        """Configure from ``LLM_MAX_WORKERS``, ``LLM_UPSTREAM_LIMIT`` and ``LLM_DEADLINE``."""
+        return cls(
+            max_workers=int(os.getenv('LLM_MAX_WORKERS', DEFAULT_MAX_WORKERS)),
+            upstream_limit=int(os.getenv('LLM_UPSTREAM_LIMIT', DEFAULT_UPSTREAM_LIMIT)),
+            deadline=float(os.getenv('LLM_DEADLINE', DEFAULT_DEADLINE)),
+        )
+
+    def submit(self, upstream: str, key: str, fn: Callable, *args) -> Tuple[Future, bool]:
+        """
+        Start ``fn(*args)`` unless an identical ``(upstream, key)`` call is in flight.
+
+        Returns the future and whether it was shared with an earlier caller.
+        """
+        flight = (upstream, key)
+        with self._lock:
+            future = self._in_flight.get(flight)
+            if future is not None:
+                self._counters['coalesced'] += 1
+                return future, True
+            self._counters['calls'] += 1
+            semaphore = self._semaphore(upstream)
+
+            def run():
+                if not semaphore.acquire(timeout=self.deadline):
+                    raise UpstreamBusy(f"{upstream} concurrency limit reached")
+                try:
+                    return fn(*args)
+                finally:
+                    semaphore.release()
+
+            future = self._pool.submit(run)
+            self._in_flight[flight] = future
+        future.add_done_callback(lambda _: self._finish(flight, future))
+        return future, False
+
+    def _semaphore(self, upstream: str) -> threading.BoundedSemaphore:
+        # Caller holds self._lock
+        semaphore = self._semaphores.get(upstream)
+        if semaphore is None:
+            limit = self._limits.get(upstream, self.upstream_limit)
+            semaphore = self._semaphores[upstream] = threading.BoundedSemaphore(limit)
+        return semaphore
+
+    def _finish(self, flight: Tuple[str, str], future: Future) -> None:
+        failed = not future.cancelled() and future.exception() is not None
+        with self._lock:
+            if self._in_flight.get(flight) is future:
+                del self._in_flight[flight]
+            if failed:
+                self._counters['errors'] += 1
+        if failed:
+            logger.warning(f"{flight[0]} call failed: {future.exception()}")
+
+    def call(self, upstream: str, key: str, fn: Callable, *args, fallback: Callable[[], Any],
+             deadline: Optional[float] = None) -> DispatchResult:
+        """Run ``fn(*args)`` through the dispatcher; use ``fallback()`` on error or deadline."""
+        future, shared = self.submit(upstream, key, fn, *args)
+        try:
+            value = future.result(timeout=self.deadline if deadline is None else deadline)
+            return DispatchResult(value, 'coalesced' if shared else 'upstream')
+        except FutureTimeout:
+            error, timed_out = f"{upstream} did not answer within the deadline", True
+        except UpstreamBusy as e:
+            error, timed_out = f"{type(e).__name__}: {e}", True
+        except Exception as e:
+            error, timed_out = f"{type(e).__name__}: {e}", False
+        with self._lock:
+            self._counters['fallbacks'] += 1
+        return DispatchResult(fallback(), 'fallback', error, timed_out)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._counters, 'in_flight': len(self._in_flight)}
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+_default_dispatcher: Optional[LLMDispatcher] = None
+_default_lock = threading.Lock()
+
+
+def get_dispatcher() -> LLMDispatcher:
+    """Process-wide dispatcher shared by every backend in the process."""
+    global _default_dispatcher
+    with _default_lock:
+        if _default_dispatcher is None:
+            _default_dispatcher = LLMDispatcher.from_env()
+        return _default_dispatcher
@@ -0,0 +1,288 @@
+"""
+Lazy, pooled LLM clients with success/latency-based fallback.
+
+:class:`ModelClientManager` replaces the old "try every Gemini model with a
+test prompt at boot" loop.  Nothing talks to the LLM until the first real
+request: clients are created on demand by a factory, kept in a bounded pool
+per model and reused.  Every call records success and latency, and models
+are tried in order of that record (recently failing models go last).  An
+opt-in background probe (``LLM_PROBE_INTERVAL`` seconds, off by default)
+keeps the record fresh between requests; each probe is a real generation and
+costs quota, and it only runs in the process that started it, never in
+forked workers.
+
+The manager exposes ``generate_content(prompt)`` like a
+``genai.GenerativeModel``, so it can be used wherever a model was.  Set
+``LLM_STUB_URL`` to point every client at a local stub server (see
+:mod:`backend.stub_llm`) instead of Gemini.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from backend import prefork
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAMES = ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-1.0-pro']
+DEFAULT_POOL_SIZE = 4
+# Probing sends real prompts, so it is off unless asked for
+DEFAULT_PROBE_INTERVAL = 0.0
+FAILURE_COOLDOWN = 60.0
+LATENCY_SMOOTHING = 0.3
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubLLMClient:
+    """HTTP client for the local stub LLM server (``POST /generate``)."""
+
+    def __init__(self, base_url: str, model_name: str, timeout: float = 30.0):
+        self.url = base_url.rstrip('/') + '/generate'
+        self.model_name = model_name
+        self.timeout = timeout
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        body = json.dumps({'model': self.model_name, 'prompt': prompt, 'stream': stream}).encode('utf-8')
+        req = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        if stream:
+            return self._stream(req)
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return StubResponse(json.loads(resp.read().decode('utf-8'))['text'])
+
+    def _stream(self, req: urllib.request.Request) -> Iterator[StubResponse]:
+        # One JSON object per line, like the chunks of genai's stream=True
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            for line in resp:
+                if line.strip():
+                    yield StubResponse(json.loads(line.decode('utf-8'))['text'])
+
+
+def gemini_factory(api_key: str) -> Callable[[str], object]:
+    """Client factory for Gemini; ``genai`` is configured on the first client."""
+    configured = []
+
+    def create(model_name: str):
+        import google.generativeai as genai
+        if not configured:
+            genai.configure(api_key=api_key)
+            configured.append(True)
+        return genai.GenerativeModel(model_name)
+
+    return create
+
+
+def stub_factory(base_url: str) -> Callable[[str], StubLLMClient]:
+    return lambda model_name: StubLLMClient(base_url, model_name)
+
+
+class ModelStats:
+    """Outcome record for one model."""
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict:
+        return {
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'last_error': self.last_error,
+        }
+
+
+class ModelClientManager:
+    """Bounded per-model client pools, tried in order of recorded health."""
+
+    def __init__(self, model_names: Sequence[str], factory: Callable[[str], object],
+                 pool_size: int = DEFAULT_POOL_SIZE, probe_interval: float = DEFAULT_PROBE_INTERVAL,
+                 probe_prompt: str = "Hello", acquire_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if not model_names:
+            raise ValueError("At least one model name is required")
+        self.model_names = list(model_names)
+        self.factory = factory
+        self.pool_size = pool_size
+        self.probe_interval = probe_interval
+        self.probe_prompt = probe_prompt
+        self.acquire_timeout = acquire_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._idle = {name: queue.LifoQueue() for name in self.model_names}
+        self._slots = {name: threading.BoundedSemaphore(pool_size) for name in self.model_names}
+        self._stats = {name: ModelStats() for name in self.model_names}
+        self._stop = threading.Event()
+        self._probe_thread: Optional[threading.Thread] = None
+        self._probe_disabled = False
+        prefork.after_fork(self, '_after_fork')
+
+    def _after_fork(self):
+        # Clients created before fork() may share connections with the parent; start over
+        self._lock = threading.Lock()
+        self._idle = {name: queue.LifoQueue() for name in self.model_names}
+        self._slots = {name: threading.BoundedSemaphore(self.pool_size) for name in self.model_names}
+        self._stop = threading.Event()
+        # The probe thread is not inherited, and is not restarted: one process probing is enough
+        self._probe_thread = None
+        self._probe_disabled = True
+
+    @classmethod
+    def from_env(cls, api_key: Optional[str] = None, model_names: Sequence[str] = DEFAULT_MODEL_NAMES,
+                 **kwargs) -> "ModelClientManager":
+        """Gemini clients, or stub clients when ``LLM_STUB_URL`` is set."""
+        stub_url = os.getenv('LLM_STUB_URL')
+        factory = stub_factory(stub_url) if stub_url else gemini_factory(api_key)
+        kwargs.setdefault('pool_size', int(os.getenv('LLM_POOL_SIZE', DEFAULT_POOL_SIZE)))
+        kwargs.setdefault('probe_interval', float(os.getenv('LLM_PROBE_INTERVAL', DEFAULT_PROBE_INTERVAL)))
+        return cls(model_names, factory, **kwargs)
+
+    # -- pooling ---------------------------------------------------------------
+
+    @contextmanager
+    def lease(self, model_name: str) -> Iterator[object]:
+        """Borrow a client for ``model_name``, creating it on first use."""
+        if not self._slots[model_name].acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"No free {model_name} client within {self.acquire_timeout}s")
+        try:
+            try:
+                client = self._idle[model_name].get_nowait()
+            except queue.Empty:
+                client = self.factory(model_name)
+            try:
+                yield client
+            finally:
+                self._idle[model_name].put(client)
+        finally:
+            self._slots[model_name].release()
+
+    # -- health record ---------------------------------------------------------
+
+    def _record(self, model_name: str, latency: Optional[float], error: Optional[Exception] = None) -> None:
+        with self._lock:
+            stats = self._stats[model_name]
+            if error is None:
+                stats.successes += 1
+                stats.consecutive_failures = 0
+                stats.latency = latency if stats.latency is None else (
+                    LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * stats.latency
+                )
+            else:
+                stats.failures += 1
+                stats.consecutive_failures += 1
+                stats.last_failure_at = self._clock()
+                stats.last_error = f"{type(error).__name__}: {error}"
+
+    def ranked_models(self) -> List[str]:
+        """Model names best first: healthy before cooling down, then success rate and latency."""
+        now = self._clock()
+        with self._lock:
+            def key(item):
+                index, name = item
+                stats = self._stats[name]
+                cooling = bool(stats.consecutive_failures and stats.last_failure_at is not None
+                               and now - stats.last_failure_at < FAILURE_COOLDOWN * stats.consecutive_failures)
+                calls = stats.successes + stats.failures
+                failure_rate = round(stats.failures / calls, 1) if calls else 0.0
+                # Unmeasured models keep their configured order behind measured healthy ones
+                latency = stats.latency if stats.latency is not None else float('inf')
+                return cooling, failure_rate, latency, index
+            return [name for _, name in sorted(enumerate(self.model_names), key=key)]
+
+    def call(self, model_name: str, prompt: str):
+        started = self._clock()
+        try:
+            with self.lease(model_name) as client:
+                response = client.generate_content(prompt)
+        except Exception as e:
+            self._record(model_name, None, e)
+            raise
+        self._record(model_name, self._clock() - started)
+        return response
+
+    def generate_content(self, prompt: str):
+        """Generate with the best-ranked model, falling back through the rest."""
+        last_error: Optional[Exception] = None
+        for model_name in self.ranked_models():
+            try:
+                return self.call(model_name, prompt)
+            except Exception as e:
+                logger.warning(f"Model {model_name} failed: {e}")
+                last_error = e
+        raise RuntimeError(f"All models failed; last error: {last_error}")
+
+    def stream_text(self, prompt: str) -> Iterator[str]:
+        """
+        Yield generated text in chunks as the best-ranked model produces it.
+
+        Falls back to the next model only when a model fails before its first
+        chunk; a failure mid-stream is raised to the consumer.
+        """
+        last_error: Optional[Exception] = None
+        for model_name in self.ranked_models():
+            started = self._clock()
+            produced = False
+            try:
+                with self.lease(model_name) as client:
+                    for chunk in client.generate_content(prompt, stream=True):
+                        text = getattr(chunk, 'text', '')
+                        if text:
+                            produced = True
+                            yield text
+            except Exception as e:
+                self._record(model_name, None, e)
+                if produced:
+                    raise
+                logger.warning(f"Model {model_name} failed: {e}")
+                last_error = e
+                continue
+            self._record(model_name, self._clock() - started)
+            return
+        raise RuntimeError(f"All models failed; last error: {last_error}")
+
+    # -- background probing ----------------------------------------------------
+
+    def probe_once(self) -> None:
+        for model_name in self.model_names:
+            try:
+                self.call(model_name, self.probe_prompt)
+            except Exception:
+                pass  # recorded by call()
+
+    def start_health_probe(self) -> None:
+        """Probe every model in a daemon thread every ``probe_interval`` seconds (if positive)."""
+        if self.probe_interval <= 0 or self._probe_disabled or (
+                self._probe_thread and self._probe_thread.is_alive()):
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.is_set():
+                self.probe_once()
+                self._stop.wait(self.probe_interval)
+
+        self._probe_thread = threading.Thread(target=run, name='llm-health-probe', daemon=True)
+        self._probe_thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            models = {name: stats.as_dict() for name, stats in self._stats.items()}
+        return {'ranking': self.ranked_models(), 'pool_size': self.pool_size, 'models': models}
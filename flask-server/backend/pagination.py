@@ -0,0 +1,258 @@
+"""
+Sorted, cursor-based pagination over filtered artisan rows.
+
+:class:`SortIndex` precomputes a stable sort permutation per sortable key and
+direction when the data is loaded.  A page is produced by walking the
+permutation from the cursor position and keeping rows that pass the filter
+mask, so fetching page *k* costs roughly the page size rather than a full
+sort of the filtered rows.  Continuation cursors are opaque URL-safe tokens
+that pin the sort, the filters they were issued for and the version of the
+data the permutations were built from, so a cursor from before a reload is
+rejected rather than skipping or repeating rows.  ``limit`` is capped at
+:data:`MAX_LIMIT`.
+
+The positions of the matching rows within a permutation are cached per
+filter fingerprint and sort (:meth:`SortIndex.hits`), so after the first
+page of a filter, later pages -- including deep ``offset`` pages -- and the
+``total`` are looked up instead of recounted over every row.
+
+Free-text queries add a ``relevance`` sort: the caller passes the ranked
+matches (see :class:`backend.bm25.RankedRows`) and pages are cut from their
+top-k prefix instead of a precomputed permutation.
+"""
+
+import base64
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Public sort_by names -> data columns
+SORT_COLUMNS = {'name': 'name', 'age': 'age', 'state': 'state', 'craft': 'craft_type'}
+SORT_ALIASES = {'craft_type': 'craft'}
+SORT_ORDERS = ('asc', 'desc')
+RELEVANCE_SORT = 'relevance'
+CURSOR_VERSION = 2
+DEFAULT_LIMIT = 20
+# Largest page one request can ask for; larger limits are clamped
+MAX_LIMIT = 1000
+# (filter fingerprint, sort) hit arrays kept per SortIndex, least recently used dropped first
+HIT_CACHE_SIZE = 32
+
+# Request keys that control paging rather than which rows match
+PAGING_KEYS = {'limit', 'offset', 'cursor', 'sort_by', 'sort_order'}
+
+
+def _sort_key(values: Sequence) -> np.ndarray:
+    """Float keys that order ``values`` (strings case-insensitively), NaN for missing."""
+    series = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+        return pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+    present = series.notna().to_numpy()
+    lowered = series.astype(object).where(present, None).map(lambda v: None if v is None else str(v).lower())
+    codes, _ = pd.factorize(lowered, sort=True, use_na_sentinel=True)
+    keys = codes.astype(np.float64)
+    keys[codes < 0] = np.nan
+    return keys
+
+
+class SortIndex:
+    """Stable ascending/descending row permutations for every sortable key."""
+
+    def __init__(self, num_rows: int, permutations: Dict[Tuple[Optional[str], str], np.ndarray],
+                 version: str = ''):
+        self.num_rows = num_rows
+        self.permutations = permutations
+        # Identifies the data the permutations index (e.g. ``dataset_version``); cursors carry it
+        self.version = version
+        self._hits: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._hits_lock = threading.Lock()
+
+    @classmethod
+    def from_columns(cls, columns: Mapping[str, Sequence], num_rows: int, version: str = '') -> "SortIndex":
+        """Build from ``{sort_by: values}``; missing values sort last in both directions."""
+        natural = np.arange(num_rows, dtype=np.int32)
+        permutations = {(None, 'asc'): natural, (None, 'desc'): natural[::-1]}
+        for sort_by, values in columns.items():
+            keys = _sort_key(values)
+            permutations[(sort_by, 'asc')] = np.argsort(keys, kind='stable').astype(np.int32)
+            permutations[(sort_by, 'desc')] = np.argsort(-keys, kind='stable').astype(np.int32)
+        return cls(num_rows, permutations, version)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, version: str = '') -> "SortIndex":
+        return cls.from_columns(
+            {sort_by: frame[col] for sort_by, col in SORT_COLUMNS.items() if col in frame.columns},
+            len(frame), version,
+        )
+
+    def permutation(self, sort_by: Optional[str], order: str) -> np.ndarray:
+        sort_by = SORT_ALIASES.get(sort_by, sort_by)
+        if order not in SORT_ORDERS or (sort_by, order) not in self.permutations:
+            raise ValueError(f"Unsupported sort: {sort_by} {order}")
+        return self.permutations[(sort_by, order)]
+
+    def hits(self, mask: np.ndarray, sort_by: Optional[str], order: str,
+             fingerprint: Optional[str] = None) -> np.ndarray:
+        """
+        Permutation positions of the rows in ``mask``, ascending.
+
+        With a ``fingerprint`` identifying the filters that produced ``mask``
+        the result is cached, so later pages of the same filter and sort
+        skip the pass over every row.
+        """
+        perm = self.permutation(sort_by, order)
+        key = (fingerprint, SORT_ALIASES.get(sort_by, sort_by), order)
+        if fingerprint is not None:
+            with self._hits_lock:
+                hits = self._hits.get(key)
+                if hits is not None:
+                    self._hits.move_to_end(key)
+                    return hits
+        hits = np.flatnonzero(mask[perm]).astype(np.int32)
+        if fingerprint is not None:
+            with self._hits_lock:
+                self._hits[key] = hits
+                while len(self._hits) > HIT_CACHE_SIZE:
+                    self._hits.popitem(last=False)
+        return hits
+
+    def position_of_offset(self, mask: Optional[np.ndarray], sort_by: Optional[str], order: str,
+                           offset: int, fingerprint: Optional[str] = None) -> int:
+        """Permutation position of the ``offset``-th matching row (for offset-based paging)."""
+        if offset <= 0:
+            return 0
+        perm = self.permutation(sort_by, order)
+        if mask is None:
+            return min(offset, len(perm))
+        hits = self.hits(mask, sort_by, order, fingerprint)
+        return int(hits[offset]) if offset < len(hits) else len(perm)
+
+    def page_from_hits(self, hits: np.ndarray, sort_by: Optional[str], order: str,
+                       position: int, limit: int) -> Tuple[np.ndarray, int, bool]:
+        """:meth:`page` from cached :meth:`hits`; also returns whether more rows follow."""
+        perm = self.permutation(sort_by, order)
+        start = int(np.searchsorted(hits, position))
+        taken = hits[start:start + limit]
+        next_position = int(taken[-1]) + 1 if len(taken) else max(position, 0)
+        return perm[taken], next_position, start + len(taken) < len(hits)
+
+    def page(self, mask: Optional[np.ndarray], sort_by: Optional[str], order: str,
+             position: int, limit: int) -> Tuple[np.ndarray, int]:
+        """
+        Row ids of the next ``limit`` matching rows starting at ``position``.
+
+        Returns the rows and the permutation position just after the last one,
+        which is where the following page starts.
+        """
+        perm = self.permutation(sort_by, order)
+        taken = []
+        remaining = limit
+        chunk = max(4 * limit, 1024)
+        while remaining > 0 and position < len(perm):
+            block = perm[position:position + chunk]
+            hits = np.flatnonzero(mask[block]) if mask is not None else np.arange(len(block))
+            if len(hits) >= remaining:
+                hits = hits[:remaining]
+                taken.append(block[hits])
+                position += int(hits[-1]) + 1
+                remaining = 0
+                break
+            taken.append(block[hits])
+            remaining -= len(hits)
+            position += len(block)
+            chunk *= 2
+        rows = np.concatenate(taken) if taken else np.empty(0, dtype=np.int32)
+        return rows, position
+
+    def has_more(self, mask: Optional[np.ndarray], sort_by: Optional[str], order: str, position: int) -> bool:
+        rows, _ = self.page(mask, sort_by, order, position, 1)
+        return len(rows) > 0
+
+
+def filters_fingerprint(filters: Mapping) -> str:
+    """Stable hash of the row-selecting part of a request."""
+    selecting = {k: v for k, v in filters.items() if k not in PAGING_KEYS and v not in (None, "")}
+    return hashlib.sha1(json.dumps(selecting, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def encode_cursor(sort_by: Optional[str], order: str, position: int, fingerprint: str, data_version: str) -> str:
+    payload = {'v': CURSOR_VERSION, 's': sort_by, 'o': order, 'p': position, 'f': fingerprint, 'd': data_version}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str, fingerprint: str, data_version: str) -> Dict:
+    """Decode ``token``; raise ``ValueError`` if it is malformed or was issued for other filters/data."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError) as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(payload, dict) or payload.get('v') != CURSOR_VERSION:
+        raise ValueError("Malformed cursor")
+    if payload.get('f') != fingerprint or payload.get('d') != data_version:
+        raise ValueError("Cursor does not match these filters or the current data")
+    return {'sort_by': payload.get('s'), 'sort_order': payload.get('o'), 'position': int(payload.get('p', 0))}
+
+
+def paginate(sort_index: SortIndex, mask: Optional[np.ndarray], params: Mapping, ranked=None) -> Dict:
+    """
+    Resolve ``limit``/``offset``/``cursor``/``sort_by``/``sort_order`` in ``params``.
+
+    ``ranked`` holds the relevance-ordered matches of a free-text query
+    (anything with ``len()`` and ``head(n)``); with it the default sort is
+    ``relevance``.  Returns the page's row ids plus the response metadata
+    (``total``, ``limit``, ``offset``, ``has_more``, ``next_cursor``).
+    Raises ``ValueError`` for invalid sort options or cursors.
+    """
+    limit = min(max(int(params.get('limit') or DEFAULT_LIMIT), 0), MAX_LIMIT)
+    fingerprint = filters_fingerprint(params)
+
+    if params.get('cursor'):
+        cursor = decode_cursor(params['cursor'], fingerprint, sort_index.version)
+        sort_by, order, position = cursor['sort_by'], cursor['sort_order'], cursor['position']
+        offset = None
+    else:
+        sort_by = params.get('sort_by') or (RELEVANCE_SORT if ranked is not None else None)
+        order = (params.get('sort_order') or 'asc').lower()
+        offset = max(int(params.get('offset') or 0), 0)
+        position = offset if sort_by == RELEVANCE_SORT else None
+
+    if sort_by == RELEVANCE_SORT:
+        if ranked is None:
+            raise ValueError("Sorting by relevance needs a search query")
+        # Positions index the ranked matches; best first regardless of sort_order
+        order = 'desc'
+        head = ranked.head(position + limit + 1)
+        rows = head[position:position + limit]
+        next_position = position + len(rows)
+        has_more = len(head) > next_position
+        total = int(mask.sum()) if mask is not None else sort_index.num_rows
+    elif mask is not None:
+        # Matching positions are cached per filter and sort: the page and total are lookups
+        hits = sort_index.hits(mask, sort_by, order, fingerprint)
+        if position is None:
+            position = int(hits[offset]) if offset < len(hits) else sort_index.num_rows
+        rows, next_position, has_more = sort_index.page_from_hits(hits, sort_by, order, position, limit)
+        total = len(hits)
+    else:
+        if position is None:
+            position = sort_index.position_of_offset(mask, sort_by, order, offset)
+        rows, next_position = sort_index.page(mask, sort_by, order, position, limit)
+        has_more = sort_index.has_more(mask, sort_by, order, next_position)
+        total = sort_index.num_rows
+    return {
+        'rows': rows,
+        'total': total,
+        'limit': limit,
+        'offset': offset,
+        'sort_by': sort_by,
+        'sort_order': order,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(sort_by, order, next_position, fingerprint, sort_index.version)
+        if has_more else None,
+    }
@@ -0,0 +1,93 @@
+"""
+Sharing one preloaded dataset across pre-forked workers.
+
+With ``preload_app`` (see ``gunicorn.conf.py``) the gunicorn master imports
+the app, so the artisan frame, its indexes and stats are built once and
+forked workers share those pages copy-on-write.  Two things would make the
+workers copy them anyway, and this module handles both:
+
+* the cyclic garbage collector writes to every tracked object it visits, so
+  the master moves the loaded heap out of its reach (:func:`freeze_heap`)
+  right before forking;
+* threads do not survive ``fork()`` and locks may be inherited held, so
+  objects that own threads or locks reset them in the child
+  (:func:`after_fork`).
+
+Numeric columns are additionally memory-mapped from the columnar snapshot
+(:mod:`backend.snapshot`), so they are shared through the page cache.
+
+A reload in a worker would rebuild a private copy, so workers ask the
+master to reload instead (:func:`request_reload`): gunicorn's ``on_reload``
+hook rebuilds the snapshots in the master and replaces the workers with
+fresh forks.
+"""
+
+import gc
+import logging
+import os
+import signal
+import weakref
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_master_pid: Optional[int] = None
+
+
+def mark_master():
+    """Record the current process as the pre-fork master (gunicorn ``when_ready``)."""
+    global _master_pid
+    _master_pid = os.getpid()
+
+
+def is_master() -> bool:
+    return _master_pid is not None and os.getpid() == _master_pid
+
+
+def is_worker() -> bool:
+    """True in a worker forked from a preloaded master."""
+    return _master_pid is not None and os.getpid() != _master_pid
+
+
+def request_reload():
+    """Ask the master to rebuild the datasets and re-fork its workers (SIGHUP)."""
+    os.kill(_master_pid, signal.SIGHUP)
+
+
+def freeze_heap():
+    """Collect once, then keep the collector away from everything allocated so far."""
+    gc.collect()
+    gc.freeze()
+
+
+def unfreeze_heap():
+    """Let the collector see the frozen heap again (before the master rebuilds the data)."""
+    gc.unfreeze()
+
+
+def after_fork(obj, method: str):
+    """Call ``obj.<method>()`` in the child after every fork, for as long as ``obj`` lives."""
+    ref = weakref.WeakMethod(getattr(obj, method))
+
+    def reset():
+        bound = ref()
+        if bound is not None:
+            bound()
+
+    os.register_at_fork(after_in_child=reset)
+
+
+def memory_usage(pid: Optional[int] = None) -> Optional[Dict[str, float]]:
+    """RSS, PSS and private/shared memory of ``pid`` in MB (Linux only, else ``None``)."""
+    fields = {'Rss': 'rss', 'Pss': 'pss', 'Private_Clean': 'private', 'Private_Dirty': 'private',
+              'Shared_Clean': 'shared', 'Shared_Dirty': 'shared'}
+    usage = {'rss': 0.0, 'pss': 0.0, 'private': 0.0, 'shared': 0.0}
+    try:
+        with open(f"/proc/{pid or 'self'}/smaps_rollup", encoding='ascii') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in fields:
+                    usage[fields[name]] += int(value.split()[0]) / 1024
+    except OSError:
+        return None
+    return {name: round(value, 1) for name, value in usage.items()}
@@ -0,0 +1,130 @@
+"""
+Token-budgeted prompt construction for the RAG assistant.
+
+:class:`PromptBuilder` renders the retrieved data compactly -- statistics as
+short ``key: value`` lines and artisans as a deduplicated pipe table holding
+only the columns the question is about -- and adds context in priority
+order until the token budget is spent.  The result reports its token count
+and how many rows had to be dropped, so prompt size can be logged per
+request.
+"""
+
+import math
+import os
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+DEFAULT_TOKEN_BUDGET = 1200
+
+INSTRUCTIONS = (
+    "You are an assistant for an artisan information system. Use ONLY the data below to answer; "
+    "do not add external information about crafts or techniques. If the data does not answer "
+    "the question, say so clearly."
+)
+
+# Intent -> keywords that select it (first match wins) and the artisan columns it needs
+INTENT_KEYWORDS = [
+    ('contact', ['contact', 'phone', 'email', 'reach', 'call', 'number']),
+    ('language', ['language', 'speak', 'speaks', 'hindi', 'english', 'tamil', 'bengali']),
+    ('demographics', ['age', 'old', 'young', 'gender', 'male', 'female', 'women', 'men']),
+    ('location', ['where', 'village', 'district', 'located', 'near', 'from']),
+]
+INTENT_FIELDS = {
+    'contact': ['name', 'craft_type', 'district', 'state', 'phone', 'email'],
+    'language': ['name', 'craft_type', 'state', 'languages'],
+    'demographics': ['name', 'craft_type', 'state', 'age', 'gender'],
+    'location': ['name', 'craft_type', 'village', 'district', 'state'],
+    'general': ['name', 'craft_type', 'district', 'state'],
+}
+FIELD_LABELS = {'craft_type': 'craft'}
+
+
+def approx_token_count(text: str) -> int:
+    """Rough token estimate (about four characters per token for English/Latin text)."""
+    return math.ceil(len(text) / 4)
+
+
+def detect_intent(query: str) -> str:
+    words = set(query.lower().replace('?', ' ').replace(',', ' ').split())
+    for intent, keywords in INTENT_KEYWORDS:
+        if words.intersection(keywords):
+            return intent
+    return 'general'
+
+
+class BuiltPrompt(NamedTuple):
+    text: str
+    context: str
+    tokens: int
+    intent: str
+    rows_included: int
+    rows_dropped: int
+
+
+def _render_stats(stats: Dict) -> List[str]:
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            parts = [f"{k} {v}" for k, v in value.items() if v is not None]
+            if parts:
+                lines.append(f"{key}: {', '.join(parts)}")
+        elif value is not None:
+            lines.append(f"{key}: {value}")
+    return lines
+
+
+class PromptBuilder:
+    """Builds prompts that fit ``budget`` tokens as counted by ``counter``."""
+
+    def __init__(self, budget: int = DEFAULT_TOKEN_BUDGET, counter: Callable[[str], int] = approx_token_count):
+        self.budget = budget
+        self.counter = counter
+
+    @classmethod
+    def from_env(cls) -> "PromptBuilder":
+        return cls(budget=int(os.getenv('PROMPT_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET)))
+
+    def build(self, query: str, artisans: Sequence[Dict], stats: Optional[Dict] = None,
+              intent: Optional[str] = None) -> BuiltPrompt:
+        """
+        Prompt for ``query`` with as much of ``stats`` and ``artisans`` as fits.
+
+        Statistics lines come first, then artisan rows in the given (ranked)
+        order; anything past the budget is dropped.
+        """
+        intent = intent or detect_intent(query)
+        fields = INTENT_FIELDS[intent]
+        head = f"{INSTRUCTIONS}\n\nData:\n"
+        tail = f"\nQuestion: {query}\nAnswer:"
+        used = self.counter(head) + self.counter(tail)
+
+        context_lines: List[str] = []
+
+        def fits(line: str) -> bool:
+            nonlocal used
+            cost = self.counter(line + "\n")
+            if used + cost > self.budget:
+                return False
+            used += cost
+            context_lines.append(line)
+            return True
+
+        if stats:
+            stat_lines = _render_stats(stats)
+            if stat_lines and fits("[statistics]"):
+                for line in stat_lines:
+                    if not fits(line):
+                        break
+
+        rows_included = 0
+        rows = list(dict.fromkeys(
+            ' | '.join(str(artisan.get(field, '')) for field in fields) for artisan in artisans
+        ))
+        if rows and fits("[artisans] " + ' | '.join(FIELD_LABELS.get(f, f) for f in fields)):
+            for row in rows:
+                if not fits(row):
+                    break
+                rows_included += 1
+
+        context = "\n".join(context_lines)
+        text = f"{head}{context}\n{tail}"
+        return BuiltPrompt(text, context, self.counter(text), intent, rows_included, len(rows) - rows_included)
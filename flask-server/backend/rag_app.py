@@ -1,43 +1,87 @@
-import google.generativeai as genai
 import pandas as pd
 import os
 import logging
-from typing import List, Dict, Any, Optional
+import sys
+from typing import List, Dict, Any, Iterator, Optional
+
+# Run as `python rag_app.py` from this directory: make the `backend` package importable
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.bm25 import BM25Index, top_k
+from backend.categorical import CategoryCodes
+from backend.dataset import dataset_version, load_artisan_frame
+from backend.filters import filter_mask, take
+from backend.llm_dispatch import LLMDispatcher, get_dispatcher
+from backend.model_clients import ModelClientManager
+from backend.prompt_builder import PromptBuilder
+from backend.response_cache import ResponseCache
+from backend.search_index import FieldIndex, InvertedIndex
+from backend.serialization import Field, RecordSerializer
+from backend.stats_cube import StatsCube
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Artisans retrieved per question; the prompt builder trims them to its token budget
+PROMPT_MAX_ARTISANS = 20
+
+# Response field -> CSV column, resolved once per frame and converted column-wise
+SEARCH_SERIALIZER = RecordSerializer([
+    Field(name, (column,)) for name, column in [
+        ('artisan_id', 'artisan_id'), ('name', 'name'), ('gender', 'gender'), ('age', 'age'),
+        ('craft_type', 'craft_type'), ('state', 'state'), ('district', 'district'),
+        ('village', 'village'), ('languages', 'languages_spoken'), ('email', 'contact_email'),
+        ('phone', 'contact_phone'), ('phone_available', 'contact_phone_boolean'),
+        ('govt_id', 'govt_artisan_id'), ('cluster_code', 'artisan_cluster_code'),
+    ]
+])
+FILTER_SERIALIZER = RecordSerializer([
+    Field(name, (column,)) for name, column in [
+        ('artisan_id', 'artisan_id'), ('name', 'name'), ('craft_type', 'craft_type'),
+        ('state', 'state'), ('district', 'district'), ('village', 'village'), ('age', 'age'),
+        ('gender', 'gender'), ('phone', 'contact_phone'), ('email', 'contact_email'),
+    ]
+])
+
 class ArtisanRAG:
-    def __init__(self, api_key: str, csv_file_path: Optional[str] = None):
-        """Initialize the RAG system with Gemini API and CSV data"""
-        try:
-            genai.configure(api_key=api_key)
-            # Updated model names - try these in order
-            model_names = ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-1.0-pro']
-            
-            for model_name in model_names:
-                try:
-                    self.model = genai.GenerativeModel(model_name)
-                    # Test the model with a simple generation
-                    test_response = self.model.generate_content("Hello")
-                    logger.info(f"Successfully initialized Gemini model: {model_name}")
-                    break
-                except Exception as e:
-                    logger.warning(f"Failed to initialize {model_name}: {e}")
-                    continue
-            else:
-                raise Exception("All model initialization attempts failed")
-                
-        except Exception as e:
-            logger.error(f"Failed to initialize Gemini model: {e}")
-            raise
+    def __init__(self, api_key: str, csv_file_path: Optional[str] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 model_clients: Optional[ModelClientManager] = None,
+                 dispatcher: Optional[LLMDispatcher] = None,
+                 artisan_df: Optional[pd.DataFrame] = None, data_version: str = '',
+                 prompt_builder: Optional[PromptBuilder] = None):
+        """Initialize the RAG system with Gemini API and CSV data
+
+        A backend that has already loaded the artisan frame can pass it as
+        ``artisan_df`` (with its ``data_version``) instead of a CSV path.
+
+        Model clients are created lazily on the first request; fallback order
+        comes from the success/latency recorded for real requests (plus the
+        opt-in health probe, ``LLM_PROBE_INTERVAL``) rather than test prompts
+        sent at startup.
+        """
+        self.model = model_clients or ModelClientManager.from_env(api_key)
+        self.model.start_health_probe()
+        self.dispatcher = dispatcher or get_dispatcher()
+        self.prompt_builder = prompt_builder or PromptBuilder.from_env()
         
         # Load CSV data
         self.artisan_df = None
-        if csv_file_path and os.path.exists(csv_file_path):
+        self.search_index = None
+        self.field_index = None
+        self.bm25_index = None
+        self.category_codes = None
+        self.stats_cube = None
+        self.dataset_version = data_version
+        # Answers are reused only for the same question, context and data
+        self.response_cache = response_cache or ResponseCache.from_env()
+        if artisan_df is not None:
+            self.artisan_df = artisan_df
+            self.preprocess_data()
+        elif csv_file_path and os.path.exists(csv_file_path):
             try:
-                self.artisan_df = pd.read_csv(csv_file_path)
+                self.artisan_df = load_artisan_frame(csv_file_path)
+                self.dataset_version = dataset_version(csv_file_path)
                 logger.info(f"Successfully loaded CSV data: {len(self.artisan_df)} artisans")
                 self.preprocess_data()
             except Exception as e:
@@ -46,23 +90,20 @@ class ArtisanRAG:
             logger.warning("No CSV file provided or file doesn't exist")
 
     def preprocess_data(self):
-        """Preprocess the loaded CSV data for better searching"""
+        """Build search structures over the loaded data.
+
+        Phone clean-up and the ``search_text`` column come from the shared
+        loader (and its columnar snapshot), so only the lookup structures
+        are built here.
+        """
         if self.artisan_df is not None:
-            # Clean phone numbers (convert scientific notation to regular numbers)
-            if 'contact_phone' in self.artisan_df.columns:
-                self.artisan_df['contact_phone'] = self.artisan_df['contact_phone'].apply(
-                    lambda x: f"{int(x)}" if pd.notna(x) and str(x) != 'nan' else ""
-                )
-            
-            # Create searchable text columns
-            searchable_columns = ['name', 'craft_type', 'state', 'district', 'village', 'languages_spoken']
-            self.artisan_df['search_text'] = ''
-            
-            for col in searchable_columns:
-                if col in self.artisan_df.columns:
-                    self.artisan_df['search_text'] += ' ' + self.artisan_df[col].fillna('').astype(str)
-            
-            self.artisan_df['search_text'] = self.artisan_df['search_text'].str.lower().str.strip()
+            self.search_index = InvertedIndex.from_texts(self.artisan_df['search_text'])
+            # Only the index needs search_text; don't keep a second copy of every row's text
+            self.artisan_df = self.artisan_df.drop(columns=['search_text'])
+            self.field_index = FieldIndex.from_frame(self.artisan_df)
+            self.bm25_index = BM25Index.from_frame(self.artisan_df)
+            self.category_codes = CategoryCodes(self.artisan_df)
+            self.stats_cube = StatsCube.from_frame(self.artisan_df)
 
     def extract_search_terms(self, query: str) -> List[str]:
         """Extract meaningful search terms from user query"""
@@ -94,126 +135,47 @@ class ArtisanRAG:
         # Extract meaningful search terms
         search_terms = self.extract_search_terms(query)
         
-        matching_rows = pd.DataFrame()
-        
-        # Search for each term
-        for term in search_terms:
-            # Strategy 1: Search in combined search text
-            if 'search_text' in self.artisan_df.columns:
-                mask1 = self.artisan_df['search_text'].str.contains(term, na=False, regex=False)
-                term_matches1 = self.artisan_df[mask1]
-                
-                if len(term_matches1) > 0:
-                    matching_rows = pd.concat([matching_rows, term_matches1]).drop_duplicates()
-                    continue
-            
-            # Strategy 2: Search individual columns if strategy 1 fails
-            search_columns = ['name', 'craft_type', 'state', 'district', 'village', 'languages_spoken']
-            masks = []
-            
-            for col in search_columns:
-                if col in self.artisan_df.columns:
-                    mask = self.artisan_df[col].fillna('').astype(str).str.lower().str.contains(term, regex=False)
-                    masks.append(mask)
-            
-            if masks:
-                combined_mask = masks[0]
-                for mask in masks[1:]:
-                    combined_mask = combined_mask | mask
-                term_matches2 = self.artisan_df[combined_mask]
-                if len(term_matches2) > 0:
-                    matching_rows = pd.concat([matching_rows, term_matches2]).drop_duplicates()
-        
-        # Limit results
-        matching_rows = matching_rows.head(max_results)
-        
-        results = []
-        for _, row in matching_rows.iterrows():
-            results.append({
-                'artisan_id': row['artisan_id'],
-                'name': row['name'],
-                'gender': row['gender'],
-                'age': row['age'],
-                'craft_type': row['craft_type'],
-                'state': row['state'],
-                'district': row['district'],
-                'village': row['village'],
-                'languages': row['languages_spoken'],
-                'email': row['contact_email'],
-                'phone': row['contact_phone'],
-                'phone_available': row['contact_phone_boolean'],
-                'govt_id': row['govt_artisan_id'],
-                'cluster_code': row['artisan_cluster_code']
-            })
+        # One pass over the per-field postings finds the rows matching any term;
+        # rows matching more terms rank first, then by their BM25 score.
+        rows, matched, _ = self.field_index.score(search_terms)
+        relevance = self.bm25_index.scores(search_terms)[rows]
+        row_ids = rows[top_k(matched * (relevance.max(initial=0) + 1) + relevance, max_results)]
         
-        return results
+        return SEARCH_SERIALIZER.serialize(self.artisan_df.iloc[row_ids])
 
     def filter_artisans(self, filters: Dict) -> List[Dict]:
         """Filter artisans based on specific criteria"""
         if self.artisan_df is None:
             return []
         
-        df = self.artisan_df.copy()
+        # Compose one row mask (integer comparisons on the categorical codes)
+        equals = {column: filters[column] for column in ['state', 'district', 'craft_type', 'gender']
+                  if column in filters}
+        mask = filter_mask(self.artisan_df, self.category_codes, equals=equals,
+                           ranges={'age': (filters.get('age_min'), filters.get('age_max'))})
         
-        # Apply filters
-        if 'state' in filters:
-            df = df[df['state'].str.lower() == filters['state'].lower()]
-        if 'district' in filters:
-            df = df[df['district'].str.lower() == filters['district'].lower()]
-        if 'craft_type' in filters:
-            df = df[df['craft_type'].str.lower() == filters['craft_type'].lower()]
-        if 'gender' in filters:
-            df = df[df['gender'].str.lower() == filters['gender'].lower()]
-        if 'age_min' in filters:
-            df = df[df['age'] >= filters['age_min']]
-        if 'age_max' in filters:
-            df = df[df['age'] <= filters['age_max']]
-        
-        results = []
-        for _, row in df.head(20).iterrows():  # Limit to 20 results
-            results.append({
-                'artisan_id': row['artisan_id'],
-                'name': row['name'],
-                'craft_type': row['craft_type'],
-                'state': row['state'],
-                'district': row['district'],
-                'village': row['village'],
-                'age': row['age'],
-                'gender': row['gender'],
-                'phone': row['contact_phone'],
-                'email': row['contact_email']
-            })
-        
-        return results
+        return FILTER_SERIALIZER.serialize(take(self.artisan_df, mask, 20))  # Limit to 20 results
 
     def get_statistics(self, state: str = None, district: str = None) -> Dict:
-        """Get statistics about artisans"""
+        """Get statistics about artisans, aggregated from the precomputed cube"""
         if self.artisan_df is None:
             return {"error": "No CSV data loaded"}
         
-        df = self.artisan_df.copy()
-        
-        # Apply filters
-        if state:
-            df = df[df['state'].str.lower() == state.lower()]
-        if district:
-            df = df[df['district'].str.lower() == district.lower()]
+        summary = self.stats_cube.summary(state=state or None, district=district or None)
+        phone_counts = summary.value_counts('phone_available')
         
         stats = {
-            'total_artisans': len(df),
-            'craft_types': df['craft_type'].value_counts().head(10).to_dict(),
-            'states': df['state'].value_counts().head(10).to_dict(),
-            'districts': df['district'].value_counts().head(10).to_dict(),
-            'gender_distribution': df['gender'].value_counts().to_dict(),
-            'age_statistics': {
-                'average_age': round(df['age'].mean(), 1),
-                'median_age': df['age'].median(),
-                'min_age': df['age'].min(),
-                'max_age': df['age'].max()
-            },
+            'total_artisans': summary.total,
+            'craft_types': summary.value_counts('craft_type', top=10),
+            'states': summary.value_counts('state', top=10),
+            'districts': summary.value_counts('district', top=10),
+            'gender_distribution': summary.value_counts('gender'),
+            'age_statistics': summary.age_statistics() or dict.fromkeys(
+                ['average_age', 'median_age', 'min_age', 'max_age']
+            ),
             'contact_info': {
-                'with_phone': df['contact_phone_boolean'].value_counts().get('Yes', 0),
-                'without_phone': df['contact_phone_boolean'].value_counts().get('No', 0)
+                'with_phone': phone_counts.get('Yes', 0),
+                'without_phone': phone_counts.get('No', 0)
             }
         }
         
@@ -226,79 +188,138 @@ class ArtisanRAG:
         
         return sorted(self.artisan_df[column].dropna().unique().tolist())
 
+    def get_cache_statistics(self) -> Dict:
+        """Hit-rate and size of the generated-answer cache"""
+        return self.response_cache.stats()
+
+    def database_answer(self, query: str, search_results: List[Dict], stats: Optional[Dict] = None) -> str:
+        """Plain answer built from the retrieved data only (used when the LLM is unavailable)"""
+        lines = []
+        if stats:
+            lines.append(f"There are {stats['total_artisans']} matching artisans in the database.")
+        if search_results:
+            lines.append(f"Artisans matching \"{query}\":")
+            for artisan in search_results:
+                lines.append(f"- {artisan['name']} ({artisan['craft_type']}), "
+                             f"{artisan['district']}, {artisan['state']}")
+        if not lines:
+            lines.append("I couldn't find any artisans matching that question in the database.")
+        return "\n".join(lines)
+
+    def retrieve_context(self, query: str) -> Dict[str, Any]:
+        """Retrieve the data for ``query`` and build the prompt around it"""
+        stats = None
+        
+        # Check for statistics request
+        if any(word in query.lower() for word in ['statistics', 'stats', 'count', 'how many', 'total']):
+            state = None
+            district = None
+            
+            # Extract state/district from query
+            states = sorted(self.stats_cube.summary().unique_values('state'))
+            for state_name in states:
+                if state_name.lower() in query.lower():
+                    state = state_name
+                    break
+            
+            if state:
+                districts = self.stats_cube.summary(state=state).unique_values('district')
+                for district_name in districts:
+                    if district_name.lower() in query.lower():
+                        district = district_name
+                        break
+            
+            stats = self.get_statistics(state, district)
+        
+        # Search for specific artisans; the prompt builder keeps as many as the budget allows
+        search_results = self.search_artisans(query, max_results=PROMPT_MAX_ARTISANS)
+        
+        prompt = self.prompt_builder.build(query, search_results, stats)
+        logger.info(f"Prompt: {prompt.tokens} tokens ({prompt.intent} intent, "
+                    f"{prompt.rows_included} artisans, {prompt.rows_dropped} dropped)")
+        return {
+            'prompt': prompt.text,
+            'prompt_tokens': prompt.tokens,
+            'search_results': search_results[:5],
+            'stats': stats,
+            'cache_key': ResponseCache.make_key(query, prompt.context, self.dataset_version),
+        }
+
     def generate_response(self, query: str) -> str:
         """Generate response using Gemini with retrieved context from CSV data"""
         if self.artisan_df is None:
             return "Sorry, no artisan data is currently loaded. Please ensure the CSV file is available."
         
         try:
-            context_parts = []
-            
-            # Check for statistics request
-            if any(word in query.lower() for word in ['statistics', 'stats', 'count', 'how many', 'total']):
-                state = None
-                district = None
-                
-                # Extract state/district from query
-                states = self.get_unique_values('state')
-                for state_name in states:
-                    if state_name.lower() in query.lower():
-                        state = state_name
-                        break
-                
-                if state:
-                    districts = self.artisan_df[self.artisan_df['state'] == state]['district'].unique()
-                    for district_name in districts:
-                        if district_name.lower() in query.lower():
-                            district = district_name
-                            break
-                
-                stats = self.get_statistics(state, district)
-                context_parts.append(f"=== ARTISAN STATISTICS ===\n{stats}")
-            
-            # Search for specific artisans
-            search_results = self.search_artisans(query, max_results=5)
+            retrieved = self.retrieve_context(query)
+            cache_key = retrieved['cache_key']
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            if search_results:
-                context_parts.append("=== MATCHING ARTISANS ===")
-                for i, artisan in enumerate(search_results, 1):
-                    context_parts.append(f"""
-{i}. {artisan['name']} (ID: {artisan['artisan_id']})
-   - Craft: {artisan['craft_type']}
-   - Location: {artisan['village']}, {artisan['district']}, {artisan['state']}
-   - Age: {artisan['age']}, Gender: {artisan['gender']}
-   - Languages: {artisan['languages']}
-   - Email: {artisan['email']}
-   - Phone: {artisan['phone']} (Available: {artisan['phone_available']})
-   - Government ID: {artisan['govt_id']}
-   - Cluster Code: {artisan['cluster_code']}
-""")
+            def ask_model():
+                text = self.model.generate_content(retrieved['prompt']).text
+                # Cached even when the caller already fell back, so a retry is instant
+                self.response_cache.set(cache_key, text)
+                return text
             
-            context = "\n".join(context_parts)
-            
-            # Create the prompt
-            prompt = f"""
-You are an assistant for an artisan information system. Use ONLY the provided data to answer the user's question. Do not add any external information about crafts or techniques.
-
-Available Data:
-{context}
-
-User Question: {query}
-
-Please provide a helpful answer based solely on the data provided above. If the data doesn't contain information to answer the question, say so clearly.
-"""
-            
-            response = self.model.generate_content(prompt)
-            return response.text
+            # Identical in-flight questions share one call; past the deadline
+            # the caller gets the database-only answer instead of waiting.
+            result = self.dispatcher.call(
+                'gemini', cache_key, ask_model,
+                fallback=lambda: self.database_answer(query, retrieved['search_results'], retrieved['stats'])
+            )
+            if result.error:
+                logger.warning(f"Falling back to database answer: {result.error}")
+            return result.value
             
         except Exception as e:
             logger.error(f"Error generating response: {e}")
             return f"Sorry, I encountered an error: {e}"
 
+    def stream_response(self, query: str, retrieved: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Yield the answer in chunks as the model generates it
+
+        ``retrieved`` is the result of :meth:`retrieve_context` when the caller
+        already has it (e.g. to send the matched artisans first).  Cached
+        answers come back as a single chunk.  The first chunk is awaited
+        through the dispatcher, so its deadline applies; if the model fails
+        or stalls before producing anything, the database-only answer is
+        sent instead.
+        """
+        if self.artisan_df is None:
+            yield "Sorry, no artisan data is currently loaded. Please ensure the CSV file is available."
+            return
+        
+        retrieved = retrieved or self.retrieve_context(query)
+        cached = self.response_cache.get(retrieved['cache_key'])
+        if cached is not None:
+            yield cached
+            return
+        
+        stream = self.model.stream_text(retrieved['prompt'])
+        # A stream can't be shared between callers, so each gets its own single-flight key
+        first = self.dispatcher.call('gemini', f"stream:{id(stream)}", next, stream, None, fallback=lambda: None)
+        if first.value is None:
+            logger.warning(f"Falling back to database answer: {first.error or 'empty stream'}")
+            yield self.database_answer(query, retrieved['search_results'], retrieved['stats'])
+            return
+        
+        chunks = [first.value]
+        yield first.value
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            return
+        self.response_cache.set(retrieved['cache_key'], ''.join(chunks))
+
 def main():
     # Initialize the RAG system
     api_key = os.getenv('GOOGLE_API_KEY')
-    if not api_key:
+    if not api_key and not os.getenv('LLM_STUB_URL'):
         print("Please set your GOOGLE_API_KEY environment variable")
         print("Example: export GOOGLE_API_KEY='your_api_key_here'")
         return
@@ -344,4 +365,6 @@ def main():
             print(f"\nError: {e}")
 
 if __name__ == "__main__":
+    # Set up logging
+    logging.basicConfig(level=logging.INFO)
     main()
\ No newline at end of file
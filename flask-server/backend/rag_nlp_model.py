@@ -0,0 +1,606 @@
+"""
+CPU-only multilingual semantic search for the ``/query`` endpoints.
+
+:class:`MultilingualRAGModel` embeds training documents (per language) and
+artisan records, keeps one :class:`VectorStore` per language, and answers
+from the closest documents.  Embeddings come from a sentence-transformer
+stored on local disk (``RAG_EMBEDDING_MODEL``, never downloaded) or, when
+that is not available, from :class:`HashingEmbedder`: signed feature hashing
+of words and character trigrams, which needs no model files and works for
+any script.
+
+Vectors are L2-normalised float32, so inner product is cosine similarity.
+Search is exact (blocked matrix product plus ``argpartition``) unless FAISS
+is installed and the store is large enough for an HNSW graph.
+
+A saved model lives under ``trained_rag_model/`` by default, one
+subdirectory per published version with ``CURRENT`` naming the live one.
+A version holds a manifest and, per store, append-only files: raw float32
+``vectors.f32``, content hashes ``hashes.bin``, ``docs.jsonl`` with its
+``offsets.i64`` and optionally ``index.faiss``.  Loading memory-maps all of
+them, and documents are decoded only when a search returns them.
+
+Every document's text is hashed when it is embedded.  :meth:`train
+<MultilingualRAGModel.train>` streams training records into a new version
+next to the serving model, re-embedding only documents whose hash is new,
+and returns a fresh model that the caller swaps in with a single reference
+assignment.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import time
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # optional: exact search is used without it
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+MODEL_FORMAT_VERSION = 2
+DEFAULT_MODEL_PATH = "trained_rag_model"
+SUPPORTED_LANGUAGES = ['en', 'hi', 'bn', 'ta', 'te', 'mr', 'gu', 'kn', 'ml', 'pa', 'or']
+# Artisan records are one store shared by every language
+ARTISAN_STORE = 'artisans'
+DEFAULT_HASH_DIM = 512
+# Stores smaller than this are searched exactly even when FAISS is installed
+ANN_MIN_DOCS = 10_000
+HNSW_NEIGHBORS = 32
+HNSW_EF_SEARCH = 64
+SEARCH_BLOCK_ROWS = 65_536
+# Documents embedded per encoder call (and per progress report) while training
+EMBED_BATCH = 256
+
+# Training document fields that carry searchable text, in order
+DOC_TEXT_FIELDS = ('title', 'question', 'text', 'content', 'answer')
+# Artisan columns embedded and returned for each record
+ARTISAN_FIELDS = ('artisan_id', 'name', 'craft_type', 'village', 'district', 'state', 'languages_spoken')
+
+# First matching Unicode block decides the language; Latin script falls back to English
+SCRIPT_LANGUAGES = [
+    ('hi', 0x0900, 0x097F),  # Devanagari (Hindi, Marathi)
+    ('bn', 0x0980, 0x09FF),
+    ('pa', 0x0A00, 0x0A7F),  # Gurmukhi
+    ('gu', 0x0A80, 0x0AFF),
+    ('or', 0x0B00, 0x0B7F),
+    ('ta', 0x0B80, 0x0BFF),
+    ('te', 0x0C00, 0x0C7F),
+    ('kn', 0x0C80, 0x0CFF),
+    ('ml', 0x0D00, 0x0D7F),
+]
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def content_hashes(texts: Sequence[str]) -> np.ndarray:
+    """Fixed-width hex digests of ``texts``, used to skip re-embedding unchanged documents."""
+    return np.array([hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest() for text in texts],
+                    dtype='S32')
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class HashingEmbedder:
+    """Signed hashing of words and character trigrams into ``dim`` buckets."""
+
+    kind = 'hashing'
+
+    def __init__(self, dim: int = DEFAULT_HASH_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[int]:
+        features = []
+        for word in _WORD_RE.findall(text.lower()):
+            features.append(zlib.crc32(word.encode()))
+            padded = f"<{word}>"
+            features.extend(zlib.crc32(padded[i:i + 3].encode()) for i in range(len(padded) - 2))
+        return features
+
+    def encode(self, texts: Sequence[str], batch_size: int = 256) -> np.ndarray:
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            features = self._features(text or '')
+            rows.extend([row] * len(features))
+            hashes.extend(features)
+        hashes = np.asarray(hashes, dtype=np.int64)
+        cells = np.asarray(rows, dtype=np.int64) * self.dim + hashes % self.dim
+        # The top hash bit picks the sign so colliding features tend to cancel out
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        vectors = np.bincount(cells, weights=signs, minlength=len(texts) * self.dim)
+        return _normalize_rows(vectors.reshape(len(texts), self.dim))
+
+    def describe(self) -> Dict:
+        return {'kind': self.kind, 'dim': self.dim}
+
+
+class SentenceTransformerEmbedder:
+    """A sentence-transformer loaded from a local directory."""
+
+    kind = 'sentence-transformer'
+
+    def __init__(self, model_path: str, device: str = 'cpu'):
+        from sentence_transformers import SentenceTransformer
+        self.model_path = model_path
+        self.model = SentenceTransformer(model_path, device=device)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Sequence[str], batch_size: int = 64) -> np.ndarray:
+        vectors = self.model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True,
+                                    normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def describe(self) -> Dict:
+        return {'kind': self.kind, 'dim': self.dim, 'model': self.model_path}
+
+
+def make_embedder(model_path: Optional[str] = None, device: str = 'cpu', dim: int = DEFAULT_HASH_DIM):
+    """The local sentence-transformer at ``model_path`` if it loads, else a hashing embedder."""
+    model_path = model_path or os.getenv('RAG_EMBEDDING_MODEL')
+    if model_path and os.path.isdir(model_path):
+        try:
+            return SentenceTransformerEmbedder(model_path, device=device)
+        except Exception as e:
+            logger.warning(f"Could not load embedding model {model_path}, using hashing embeddings: {e}")
+    return HashingEmbedder(int(os.getenv('RAG_EMBEDDING_DIM', dim)))
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the ``k`` best scores in each row of ``scores``, best first."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(best, order, axis=1)
+
+
+class DocStore:
+    """Documents kept as JSON lines on disk and decoded on access through a memory map."""
+
+    def __init__(self, path: str, offsets: np.ndarray):
+        self.offsets = offsets
+        self._data = b''
+        if os.path.getsize(path):
+            with open(path, 'rb') as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> Dict:
+        return json.loads(self._data[self.offsets[i]:self.offsets[i + 1]])
+
+    def __iter__(self) -> Iterator[Dict]:
+        return (self[i] for i in range(len(self)))
+
+
+class VectorStore:
+    """Normalised document vectors with exact or HNSW inner-product search."""
+
+    def __init__(self, vectors: np.ndarray, docs: Sequence[Dict], hashes: Optional[np.ndarray] = None, ann=None):
+        self.vectors = vectors
+        self.docs = docs
+        self.hashes = hashes
+        self.ann = ann
+        self._hash_index = None
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, docs: Sequence[Dict], hashes: Optional[np.ndarray] = None,
+              ann_min_docs: int = ANN_MIN_DOCS) -> "VectorStore":
+        return cls(vectors, docs, hashes, _build_ann(vectors, ann_min_docs))
+
+    def known_vectors(self, hashes: np.ndarray) -> np.ndarray:
+        """Row of this store holding each of ``hashes``, or -1 where it has none."""
+        if self.hashes is None or not len(self.hashes):
+            return np.full(len(hashes), -1, dtype=np.int64)
+        if self._hash_index is None:
+            # Sorted copy of the (possibly memory-mapped) digests, built once per store
+            order = np.argsort(self.hashes, kind='stable')
+            self._hash_index = (np.asarray(self.hashes)[order], order)
+        sorted_hashes, order = self._hash_index
+        pos = np.minimum(np.searchsorted(sorted_hashes, hashes), len(sorted_hashes) - 1)
+        return np.where(sorted_hashes[pos] == hashes, order[pos], -1)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def search(self, queries: np.ndarray, k: int, exact: bool = False):
+        """``(scores, ids)`` arrays of shape ``(len(queries), k)``; ids of -1 are padding."""
+        k = min(k, len(self.docs))
+        if k <= 0:
+            empty = np.empty((len(queries), 0))
+            return empty, empty.astype(np.int64)
+        if self.ann is not None and not exact:
+            scores, ids = self.ann.search(np.ascontiguousarray(queries, dtype=np.float32), k)
+            return scores, ids
+
+        # Blocked scan so a memory-mapped store is streamed, not materialised;
+        # each block's top k is merged into the running top k
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self.vectors), SEARCH_BLOCK_ROWS):
+            scores = queries @ np.asarray(self.vectors[start:start + SEARCH_BLOCK_ROWS]).T
+            keep = top_k_rows(scores, k)
+            scores = np.concatenate([best_scores, np.take_along_axis(scores, keep, axis=1)], axis=1)
+            ids = np.concatenate([best_ids, keep + start], axis=1)
+            keep = top_k_rows(scores, k)
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+            best_ids = np.take_along_axis(ids, keep, axis=1)
+        return best_scores, best_ids
+
+    def save(self, directory: str):
+        writer = StoreWriter(directory, dim=self.vectors.shape[1])
+        for start in range(0, len(self), EMBED_BATCH):
+            stop = min(start + EMBED_BATCH, len(self))
+            hashes = self.hashes[start:stop] if self.hashes is not None else np.zeros(stop - start, dtype='S32')
+            writer.append([self.docs[i] for i in range(start, stop)], np.asarray(self.vectors[start:stop]), hashes)
+        writer.close(ann=self.ann)
+
+    @classmethod
+    def load(cls, directory: str, dim: int) -> "VectorStore":
+        offsets = np.memmap(os.path.join(directory, 'offsets.i64'), dtype=np.int64, mode='r')
+        count = len(offsets) - 1
+        if count:
+            vectors = np.memmap(os.path.join(directory, 'vectors.f32'), dtype=np.float32, mode='r', shape=(count, dim))
+            hashes = np.memmap(os.path.join(directory, 'hashes.bin'), dtype='S32', mode='r', shape=(count,))
+        else:
+            vectors, hashes = np.empty((0, dim), dtype=np.float32), np.empty(0, dtype='S32')
+        ann = None
+        index_path = os.path.join(directory, 'index.faiss')
+        if faiss is not None and os.path.exists(index_path):
+            try:
+                ann = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+            except RuntimeError:
+                ann = faiss.read_index(index_path)
+            ann.hnsw.efSearch = HNSW_EF_SEARCH
+        return cls(vectors, DocStore(os.path.join(directory, 'docs.jsonl'), offsets), hashes, ann)
+
+
+def _build_ann(vectors: np.ndarray, ann_min_docs: int):
+    """An HNSW graph over ``vectors`` when FAISS is installed and there are enough of them."""
+    if faiss is None or len(vectors) < ann_min_docs:
+        return None
+    ann = faiss.IndexHNSWFlat(vectors.shape[1], HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+    for start in range(0, len(vectors), SEARCH_BLOCK_ROWS):
+        ann.add(np.ascontiguousarray(vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32))
+    ann.hnsw.efSearch = HNSW_EF_SEARCH
+    return ann
+
+
+class StoreWriter:
+    """
+    Appends documents to a store directory in fixed-size batches.
+
+    With an ``embedder``, :meth:`add` buffers at most ``batch_size``
+    documents before embedding them (copying the vectors of documents whose
+    hash ``previous`` already holds) and appending everything to disk, so
+    memory does not grow with the number of documents written.
+    """
+
+    def __init__(self, directory: str, embedder=None, previous: Optional[VectorStore] = None,
+                 batch_size: int = EMBED_BATCH, dim: Optional[int] = None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.embedder = embedder
+        self.previous = previous
+        self.batch_size = batch_size
+        self.dim = dim or embedder.dim
+        self.documents = 0
+        self.embedded = 0
+        self._pending: List[Tuple[Dict, str]] = []
+        self._position = 0
+        self._vectors = open(os.path.join(directory, 'vectors.f32'), 'wb')
+        self._hashes = open(os.path.join(directory, 'hashes.bin'), 'wb')
+        self._docs = open(os.path.join(directory, 'docs.jsonl'), 'wb')
+        self._offsets = open(os.path.join(directory, 'offsets.i64'), 'wb')
+        np.zeros(1, dtype=np.int64).tofile(self._offsets)
+
+    def add(self, doc: Dict, text: str):
+        self._pending.append((doc, text))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        docs, texts = zip(*self._pending)
+        self._pending = []
+        hashes = content_hashes(texts)
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        todo = np.arange(len(texts))
+        if self.previous is not None:
+            source = self.previous.known_vectors(hashes)
+            known = source >= 0
+            vectors[known] = self.previous.vectors[source[known]]
+            todo = np.flatnonzero(~known)
+        if len(todo):
+            vectors[todo] = self.embedder.encode([texts[i] for i in todo])
+            self.embedded += len(todo)
+        self.append(docs, vectors, hashes)
+
+    def append(self, docs: Sequence[Dict], vectors: np.ndarray, hashes: np.ndarray):
+        """Write already embedded ``docs`` with their ``vectors`` and content ``hashes``."""
+        lines = [json.dumps(doc, ensure_ascii=False, default=str).encode('utf-8') + b'\n' for doc in docs]
+        ends = self._position + np.cumsum([len(line) for line in lines], dtype=np.int64)
+        np.ascontiguousarray(vectors, dtype=np.float32).tofile(self._vectors)
+        np.asarray(hashes, dtype='S32').tofile(self._hashes)
+        ends.tofile(self._offsets)
+        self._docs.writelines(lines)
+        self._position = int(ends[-1]) if len(ends) else self._position
+        self.documents += len(docs)
+
+    def close(self, ann_min_docs: int = ANN_MIN_DOCS, ann=None) -> Dict:
+        """Flush, close the files and write the HNSW graph if the store needs one."""
+        self.flush()
+        for f in (self._vectors, self._hashes, self._docs, self._offsets):
+            f.close()
+        if ann is None and self.documents >= ann_min_docs and faiss is not None:
+            vectors = np.memmap(os.path.join(self.directory, 'vectors.f32'), dtype=np.float32, mode='r',
+                                shape=(self.documents, self.dim))
+            ann = _build_ann(vectors, ann_min_docs)
+        if ann is not None:
+            faiss.write_index(ann, os.path.join(self.directory, 'index.faiss'))
+        stats = {'documents': self.documents, 'embedded': self.embedded, 'reused': self.documents - self.embedded}
+        logger.info(f"Wrote vector store {os.path.basename(self.directory)}: {stats}")
+        return stats
+
+    def discard(self):
+        for f in (self._vectors, self._hashes, self._docs, self._offsets):
+            f.close()
+
+
+def _model_dir(path: str) -> str:
+    """The directory of the model version currently published under ``path``."""
+    current = os.path.join(path, 'CURRENT')
+    if os.path.exists(current):
+        with open(current, encoding='utf-8') as f:
+            return os.path.join(path, f.read().strip())
+    return path
+
+
+def _staging_dir(path: str) -> str:
+    os.makedirs(path, exist_ok=True)
+    return tempfile.mkdtemp(prefix='.staging-', dir=path)
+
+
+def _publish(staging: str, path: str, manifest: Dict):
+    """
+    Make the complete model in ``staging`` the current version under ``path``.
+
+    Versions live in their own subdirectories and ``CURRENT`` names the live
+    one, so publishing is a rename plus an atomic pointer replace and never
+    moves files a running server has memory-mapped.  Versions older than the
+    previous one are removed.
+    """
+    with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    previous = os.path.basename(_model_dir(path))
+    version = f"v{time.strftime('%Y%m%d-%H%M%S')}-{os.path.basename(staging)[-6:]}"
+    os.replace(staging, os.path.join(path, version))
+    pointer = os.path.join(path, 'CURRENT.tmp')
+    with open(pointer, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(path, 'CURRENT'))
+    for name in os.listdir(path):
+        if name.startswith('v') and name not in (version, previous):
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def doc_text(doc: Dict) -> str:
+    """Searchable text of a training document."""
+    parts = [str(doc[field]) for field in DOC_TEXT_FIELDS if doc.get(field)]
+    if not parts:
+        parts = [str(value) for key, value in doc.items() if key != 'language' and isinstance(value, str)]
+    return ' '.join(parts)
+
+
+def artisan_docs(frame) -> List[Dict]:
+    """One document per artisan row, with the fields the answers quote."""
+    columns = [col for col in ARTISAN_FIELDS if col in frame.columns]
+    records = frame[columns].astype(object).where(frame[columns].notna(), '').astype(str).to_dict('records')
+    for record in records:
+        record['source'] = ARTISAN_STORE
+    return records
+
+
+def artisan_text(doc: Dict) -> str:
+    return ' '.join(doc.get(col, '') for col in ARTISAN_FIELDS[1:])
+
+
+class MultilingualRAGModel:
+    """Per-language semantic search over training documents and artisan records."""
+
+    def __init__(self, use_gpu: bool = False, embedder=None, ann_min_docs: int = ANN_MIN_DOCS):
+        self.supported_languages = list(SUPPORTED_LANGUAGES)
+        self.embedder = embedder or make_embedder(device='cuda' if use_gpu else 'cpu')
+        self.ann_min_docs = ann_min_docs
+        self.stores: Dict[str, VectorStore] = {}
+        logger.info(f"RAG embeddings: {self.embedder.describe()}")
+
+    def detect_language(self, text: str) -> str:
+        counts = dict.fromkeys([lang for lang, _, _ in SCRIPT_LANGUAGES], 0)
+        for char in text:
+            code = ord(char)
+            if code < 0x0900:
+                continue
+            for lang, low, high in SCRIPT_LANGUAGES:
+                if low <= code <= high:
+                    counts[lang] += 1
+                    break
+        lang, count = max(counts.items(), key=lambda item: item[1])
+        return lang if count else 'en'
+
+    def _build_store(self, name: str, docs: List[Dict], texts: List[str], previous: Optional[VectorStore],
+                     progress: Optional[Callable[[str, int, int], None]]) -> Dict:
+        """
+        Embed ``texts`` into a new store and publish it under ``name``.
+
+        Vectors of documents whose content hash is already in ``previous``
+        are copied instead of re-embedded.  ``self.stores`` is replaced, never
+        mutated, so readers holding the old dict are unaffected.
+        """
+        hashes = content_hashes(texts)
+        vectors = np.empty((len(texts), self.embedder.dim), dtype=np.float32)
+        todo = np.arange(len(texts))
+        if previous is not None:
+            source = previous.known_vectors(hashes)
+            known = source >= 0
+            vectors[known] = previous.vectors[source[known]]
+            todo = np.flatnonzero(~known)
+        for start in range(0, len(todo), EMBED_BATCH):
+            batch = todo[start:start + EMBED_BATCH]
+            vectors[batch] = self.embedder.encode([texts[i] for i in batch])
+            if progress is not None:
+                progress(name, start + len(batch), len(todo))
+        self.stores = {**self.stores, name: VectorStore.build(vectors, docs, hashes, self.ann_min_docs)}
+        stats = {'documents': len(docs), 'embedded': len(todo), 'reused': len(docs) - len(todo)}
+        logger.info(f"Built '{name}' vector store: {stats}")
+        return stats
+
+    def build_vector_store(self, docs: List[Dict], lang: str, previous: Optional[VectorStore] = None,
+                           progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
+        """Embed ``docs`` (training documents in ``lang``) and replace that language's store."""
+        docs = list(docs)
+        return self._build_store(lang, docs, [doc_text(doc) for doc in docs],
+                                 previous if previous is not None else self.stores.get(lang), progress)
+
+    def build_artisan_store(self, frame, previous: Optional[VectorStore] = None,
+                            progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
+        """Embed every artisan row of ``frame`` into the shared artisan store."""
+        docs = artisan_docs(frame)
+        return self._build_store(ARTISAN_STORE, docs, [artisan_text(doc) for doc in docs],
+                                 previous if previous is not None else self.stores.get(ARTISAN_STORE), progress)
+
+    def train(self, records: Iterable[Dict], path: str = DEFAULT_MODEL_PATH, artisan_frame=None,
+              progress: Optional[Callable[[str, int, int], None]] = None) -> Tuple["MultilingualRAGModel", Dict]:
+        """
+        Build, publish and load a new model from a stream of training ``records``.
+
+        Records are routed by their ``language`` to one :class:`StoreWriter`
+        per language in a single pass and written to disk in embedding-sized
+        batches, so memory stays bounded however large the corpus is.
+        Unchanged documents reuse this model's vectors, and this model is
+        left untouched for the caller to swap out.  Returns the new model and
+        per-store ``documents``/``embedded``/``reused`` counts.
+        """
+        staging = _staging_dir(path)
+        writers: Dict[str, StoreWriter] = {}
+        skipped = 0
+        try:
+            for record in records:
+                lang = record.get('language') if isinstance(record, dict) else None
+                if lang not in self.supported_languages:
+                    skipped += 1
+                    continue
+                writer = writers.get(lang)
+                if writer is None:
+                    writer = writers[lang] = StoreWriter(os.path.join(staging, lang), self.embedder,
+                                                         self.stores.get(lang))
+                writer.add(record, doc_text(record))
+            if artisan_frame is not None:
+                writer = writers[ARTISAN_STORE] = StoreWriter(os.path.join(staging, ARTISAN_STORE), self.embedder,
+                                                              self.stores.get(ARTISAN_STORE))
+                for start in range(0, len(artisan_frame), EMBED_BATCH):
+                    for doc in artisan_docs(artisan_frame.iloc[start:start + EMBED_BATCH]):
+                        writer.add(doc, artisan_text(doc))
+                    if progress is not None:
+                        progress(ARTISAN_STORE, min(start + EMBED_BATCH, len(artisan_frame)), len(artisan_frame))
+            stats = {name: writer.close(self.ann_min_docs) for name, writer in writers.items()}
+            _publish(staging, path, self._manifest(stats))
+        except Exception:
+            for writer in writers.values():
+                writer.discard()
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        if skipped:
+            logger.warning(f"Skipped {skipped} training records without a supported language")
+        model = MultilingualRAGModel(embedder=self.embedder, ann_min_docs=self.ann_min_docs)
+        model.load_model(path)
+        return model, {'stores': stats, 'skipped': skipped}
+
+    def semantic_search_batch(self, queries: Sequence[str], lang: str, k: int = 5) -> List[List[Dict]]:
+        """The ``k`` closest documents for each query, from ``lang``'s store and the artisan store."""
+        stores = [store for store in (self.stores.get(lang) or self.stores.get('en'), self.stores.get(ARTISAN_STORE))
+                  if store is not None and len(store)]
+        if not stores or not queries:
+            return [[] for _ in queries]
+        vectors = self.embedder.encode(queries)
+        hits = [[] for _ in queries]
+        for store in stores:
+            scores, ids = store.search(vectors, k)
+            for row in range(len(queries)):
+                hits[row].extend((float(score), store.docs[i]) for score, i in zip(scores[row], ids[row]) if i >= 0)
+        return [
+            [{**doc, 'score': round(score, 4)} for score, doc in sorted(row, key=lambda hit: -hit[0])[:k]]
+            for row in hits
+        ]
+
+    def semantic_search(self, query: str, lang: str, k: int = 5) -> List[Dict]:
+        return self.semantic_search_batch([query], lang, k)[0]
+
+    def generate_response(self, query: str, docs: List[Dict], lang: str) -> str:
+        """An extractive answer from the retrieved documents (no generative model involved)."""
+        if not docs:
+            return "I could not find information related to your question in the trained data."
+        best = docs[0]
+        if best.get('source') != ARTISAN_STORE:
+            return str(best.get('answer') or doc_text(best))
+        artisans = [doc for doc in docs if doc.get('source') == ARTISAN_STORE]
+        lines = [
+            f"- {doc.get('name', 'Unknown')}: {doc.get('craft_type', '')}, "
+            f"{', '.join(part for part in (doc.get('district'), doc.get('state')) if part)}"
+            for doc in artisans
+        ]
+        return "Artisans most relevant to your question:\n" + "\n".join(lines)
+
+    def _manifest(self, stats: Dict) -> Dict:
+        return {'version': MODEL_FORMAT_VERSION, 'embedder': self.embedder.describe(), 'stores': stats}
+
+    def save_model(self, path: str = DEFAULT_MODEL_PATH):
+        """Write every store under ``path`` as a new version, published only once complete."""
+        staging = _staging_dir(path)
+        try:
+            for name, store in self.stores.items():
+                store.save(os.path.join(staging, name))
+            stats = {name: {'documents': len(store)} for name, store in self.stores.items()}
+            _publish(staging, path, self._manifest(stats))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        logger.info(f"Saved RAG model to {path}: {stats}")
+
+    def load_model(self, path: str = DEFAULT_MODEL_PATH):
+        """Memory-map the stores of the model published under ``path``."""
+        directory = _model_dir(path)
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MODEL_FORMAT_VERSION:
+            logger.warning(f"Saved RAG model has format {manifest.get('version')}, expected "
+                           f"{MODEL_FORMAT_VERSION}; retrain to use it")
+            return
+        saved = manifest.get('embedder', {})
+        if saved.get('kind') == HashingEmbedder.kind and self.embedder.kind == HashingEmbedder.kind:
+            # Hashing vectors only depend on the dimension, so adopt the saved one
+            self.embedder = HashingEmbedder(saved['dim'])
+        elif saved != self.embedder.describe():
+            logger.warning(f"Saved RAG model was embedded with {saved}, not {self.embedder.describe()}; "
+                           "retrain to use it")
+            return
+        self.stores = {name: VectorStore.load(os.path.join(directory, name), self.embedder.dim)
+                       for name in manifest.get('stores', {})}
+        logger.info(f"Loaded RAG model from {directory}: {manifest.get('stores')}")
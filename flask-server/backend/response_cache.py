@@ -0,0 +1,152 @@
+"""
+Cache for LLM-generated answers.
+
+Answers are keyed on the normalised question, a hash of the retrieved
+context that went into the prompt and the dataset version, so a cached
+answer is only reused when the model would have seen exactly the same input.
+:class:`ResponseCache` keeps an in-process LRU with a TTL and can add a
+SQLite file as a second tier that every worker process on the host shares.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from backend.entity_matcher import normalize_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL answer cache with an optional shared SQLite tier."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 sqlite_path: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_path = sqlite_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._local = threading.local()
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'stores': 0}
+        if sqlite_path:
+            self._connection().execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Configure from ``RESPONSE_CACHE_SIZE``, ``RESPONSE_CACHE_TTL`` and ``RESPONSE_CACHE_DB``."""
+        return cls(
+            max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL', DEFAULT_TTL_SECONDS)),
+            sqlite_path=os.getenv('RESPONSE_CACHE_DB') or None,
+        )
+
+    @staticmethod
+    def make_key(query: str, context: str, dataset_version: str = '') -> str:
+        return _sha256('\x1f'.join([normalize_text(query), _sha256(context), dataset_version]))
+
+    # -- SQLite tier -----------------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; WAL lets several workers read while one writes
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.sqlite_path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple]:
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[1] <= now:
+                self._connection().execute("DELETE FROM responses WHERE key = ? AND expires_at <= ?", (key, now))
+                return None
+            return row
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+
+    def _disk_set(self, key: str, value: str, expires_at: float) -> None:
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    # -- public API ------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[str]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return entry[1]
+                del self._entries[key]
+        row = self._disk_get(key, now) if self.sqlite_path else None
+        with self._lock:
+            if row is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['disk_hits'] += 1
+            self._remember(key, row[0], row[1])
+        return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        expires_at = self._clock() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._counters['stores'] += 1
+        if self.sqlite_path:
+            self._disk_set(key, value, expires_at)
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.sqlite_path:
+            self._connection().execute("DELETE FROM responses")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._entries)
+        lookups = counters['memory_hits'] + counters['disk_hits'] + counters['misses']
+        hits = counters['memory_hits'] + counters['disk_hits']
+        return {
+            **counters,
+            'hits': hits,
+            'lookups': lookups,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'sqlite_path': self.sqlite_path,
+        }
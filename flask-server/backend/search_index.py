@@ -0,0 +1,194 @@
+"""
+In-memory inverted index over the artisan ``search_text`` column.
+
+The index maps every whitespace token to the sorted row positions that
+contain it, and keeps a character trigram side index over the token
+vocabulary so that substring lookups (the ``str.contains`` semantics the
+search endpoints have always had) never need to scan the rows.
+
+:class:`FieldIndex` keeps one such index per field group and scores rows
+by how many query terms they match and in which fields (name > craft >
+location > language); callers rank with those scores.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 3
+_EMPTY = np.empty(0, dtype=np.int32)
+
+# Field groups for ranked retrieval: (name, source columns, weight)
+FIELD_WEIGHTS = [
+    ('name', ['name'], 4),
+    ('craft', ['craft_type'], 3),
+    ('location', ['village', 'district', 'state'], 2),
+    ('language', ['languages_spoken', 'languages'], 1),
+]
+
+
+def _ngrams(token: str) -> set:
+    return {token[i:i + NGRAM_SIZE] for i in range(len(token) - NGRAM_SIZE + 1)}
+
+
+class InvertedIndex:
+    """Token -> sorted row-id postings with a trigram index for substrings."""
+
+    def __init__(self, texts: np.ndarray, vocabulary: np.ndarray,
+                 postings: np.ndarray, offsets: np.ndarray):
+        self.texts = texts
+        self.vocabulary = vocabulary
+        self.postings = postings
+        self.offsets = offsets
+        self.num_rows = len(texts)
+        self.token_ids = {token: i for i, token in enumerate(vocabulary)}
+        self.ngrams = self._build_ngrams(vocabulary)
+
+    @classmethod
+    def from_texts(cls, texts: pd.Series) -> "InvertedIndex":
+        """Build the index from a series of already lower-cased texts."""
+        texts = texts.fillna('').astype(str).to_numpy(dtype=object)
+        tokens = pd.Series(texts).str.split().explode().dropna()
+
+        codes, vocabulary = pd.factorize(tokens.to_numpy())
+        rows = tokens.index.to_numpy(dtype=np.int64)
+
+        # Sort by (token, row) and drop repeated tokens within a row so each
+        # posting list is strictly increasing.
+        order = np.lexsort((rows, codes))
+        codes, rows = codes[order], rows[order]
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+        codes, rows = codes[keep], rows[keep]
+
+        counts = np.bincount(codes, minlength=len(vocabulary))
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        index = cls(texts, np.asarray(vocabulary, dtype=object),
+                    rows.astype(np.int32), offsets)
+        logger.info(f"Built search index: {len(vocabulary)} tokens over {index.num_rows} rows")
+        return index
+
+    @staticmethod
+    def _build_ngrams(vocabulary: np.ndarray) -> Dict[str, np.ndarray]:
+        grams: Dict[str, List[int]] = {}
+        for token_id, token in enumerate(vocabulary):
+            for gram in _ngrams(token):
+                grams.setdefault(gram, []).append(token_id)
+        return {gram: np.asarray(ids, dtype=np.int32) for gram, ids in grams.items()}
+
+    def postings_for(self, token_id: int) -> np.ndarray:
+        return self.postings[self.offsets[token_id]:self.offsets[token_id + 1]]
+
+    def expand(self, term: str) -> np.ndarray:
+        """Return the ids of every vocabulary token containing ``term``."""
+        if len(term) < NGRAM_SIZE:
+            return np.fromiter(
+                (i for i, token in enumerate(self.vocabulary) if term in token),
+                dtype=np.int32
+            )
+
+        candidates = None
+        for gram in _ngrams(term):
+            ids = self.ngrams.get(gram)
+            if ids is None:
+                return _EMPTY
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+            if len(candidates) == 0:
+                return _EMPTY
+
+        if len(term) == NGRAM_SIZE:
+            return candidates
+        return np.fromiter(
+            (i for i in candidates if term in self.vocabulary[i]), dtype=np.int32
+        )
+
+    def lookup(self, term: str) -> np.ndarray:
+        """Sorted row ids whose text contains ``term`` as a substring."""
+        term = term.lower()
+        words = term.split()
+        if not words:
+            return _EMPTY
+
+        if len(words) == 1 and words[0] == term:
+            token_ids = self.expand(term)
+            if len(token_ids) == 0:
+                return _EMPTY
+            if len(token_ids) == 1:
+                return self.postings_for(token_ids[0])
+            return np.unique(np.concatenate([self.postings_for(i) for i in token_ids]))
+
+        # A phrase can span token boundaries: narrow down to rows containing
+        # every word, then verify the exact substring on those rows only.
+        candidates = self.search(words, mode='and')
+        return np.fromiter(
+            (row for row in candidates if term in self.texts[row]), dtype=np.int32
+        )
+
+    def search(self, terms: Iterable[str], mode: str = 'or') -> np.ndarray:
+        """Combine the postings of ``terms`` by union (``or``) or intersection (``and``)."""
+        result = None
+        for term in terms:
+            rows = self.lookup(term)
+            if result is None:
+                result = rows
+            elif mode == 'and':
+                result = np.intersect1d(result, rows, assume_unique=True)
+            else:
+                result = np.union1d(result, rows)
+            if mode == 'and' and len(result) == 0:
+                break
+        return _EMPTY if result is None else result
+
+
+class FieldIndex:
+    """Per-field-group inverted indexes for relevance-ranked retrieval."""
+
+    def __init__(self, fields: Sequence[Tuple[str, int, InvertedIndex]], num_rows: int):
+        self.fields = list(fields)
+        self.num_rows = num_rows
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, field_weights=FIELD_WEIGHTS) -> "FieldIndex":
+        fields = []
+        for name, columns, weight in field_weights:
+            present = [col for col in columns if col in frame.columns]
+            if not present:
+                continue
+            texts = frame[present].astype(object).fillna('').astype(str).agg(' '.join, axis=1).str.lower()
+            fields.append((name, weight, InvertedIndex.from_texts(texts)))
+        return cls(fields, len(frame))
+
+    def score(self, terms: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score every row matching at least one term, in one pass over the postings.
+
+        Returns ``(rows, matched, weight)``: the sorted candidate rows, how many
+        terms each matched and the sum over matched terms of the best field
+        weight the term was found in.
+        """
+        term_rows, term_weights = [], []
+        for term in terms if self.fields else ():
+            rows = [index.lookup(term) for _, _, index in self.fields]
+            weights = [np.full(len(r), weight, dtype=np.int64) for r, (_, weight, _) in zip(rows, self.fields)]
+            rows, weights = np.concatenate(rows), np.concatenate(weights)
+            if not len(rows):
+                continue
+            # Keep the best field per row for this term
+            order = np.lexsort((-weights, rows))
+            rows, weights = rows[order], weights[order]
+            first = np.ones(len(rows), dtype=bool)
+            first[1:] = rows[1:] != rows[:-1]
+            term_rows.append(rows[first])
+            term_weights.append(weights[first])
+        if not term_rows:
+            return _EMPTY, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        rows, inverse = np.unique(np.concatenate(term_rows), return_inverse=True)
+        matched = np.bincount(inverse, minlength=len(rows))
+        weight = np.bincount(inverse, weights=np.concatenate(term_weights), minlength=len(rows)).astype(np.int64)
+        return rows.astype(np.int32), matched, weight
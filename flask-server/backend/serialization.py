@@ -0,0 +1,72 @@
+"""
+Bulk serialization of artisan rows into API response dicts.
+
+Each endpoint describes its response shape once as a list of :class:`Field`
+specs (output name, candidate source columns, default and converter).
+:class:`RecordSerializer` resolves those specs against the frame's columns a
+single time and then converts whole columns at once, instead of building a
+``Series`` per row with ``iterrows()`` and calling ``row.get`` per field.
+"""
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import pandas as pd
+
+
+class Field(NamedTuple):
+    name: str
+    sources: Tuple[str, ...]
+    default: Any = None
+    convert: Optional[str] = None
+
+
+def _as_str(series: pd.Series) -> List:
+    return [str(v) for v in series.tolist()]
+
+
+def _int_or_na(series: pd.Series) -> List:
+    values = pd.to_numeric(series, errors='coerce')
+    present = values.notna().to_numpy()
+    return [int(v) if ok else 'N/A' for v, ok in zip(values.tolist(), present)]
+
+
+CONVERTERS: Dict[str, Callable[[pd.Series], List]] = {
+    'str': _as_str,
+    'int_or_na': _int_or_na,
+}
+
+
+class RecordSerializer:
+    """Turns a frame slice into a list of response dicts, column by column."""
+
+    def __init__(self, fields: Sequence[Field]):
+        self.fields = list(fields)
+        self._resolved: Dict[Tuple[str, ...], List[Tuple[Field, Optional[str]]]] = {}
+
+    def _resolve(self, columns: pd.Index) -> List[Tuple[Field, Optional[str]]]:
+        key = tuple(columns)
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            available = set(key)
+            resolved = [
+                (field, next((col for col in field.sources if col in available), None))
+                for field in self.fields
+            ]
+            self._resolved[key] = resolved
+        return resolved
+
+    def serialize(self, frame: pd.DataFrame) -> List[Dict]:
+        n = len(frame)
+        if n == 0:
+            return []
+        names, columns = [], []
+        for field, source in self._resolve(frame.columns):
+            names.append(field.name)
+            if source is None:
+                values = [field.default] * n
+            elif field.convert:
+                values = CONVERTERS[field.convert](frame[source])
+            else:
+                values = frame[source].tolist()
+            columns.append(values)
+        return [dict(zip(names, row)) for row in zip(*columns)]
@@ -0,0 +1,323 @@
+"""
+Primary-key, locality and neighbour indexes for "similar artisans" lookups.
+
+:class:`SimilarIndex` is built once per dataset load.  It maps every
+artisan id to its row (the first row for duplicated ids) and sorts the rows
+by (craft, state, district), so an artisan's same-district, same-state and
+same-craft peers are nested contiguous ranges of that order.  A lookup is a
+dict probe plus slicing the ranges around the artisan, O(1) + O(k): peers
+from the same district come first, then the rest of the state, then the
+rest of the craft, until ``limit`` rows are found.
+
+:class:`NeighbourTable` ranks peers by a feature-vector score instead.
+Each artisan is encoded as :class:`ArtisanFeatures` (craft, state, district
+and cluster codes, an age bucket and a hashed bitmask of the languages it
+speaks), the weighted matches of those features are scored for every pair
+in a blocked NumPy batch job at load time, and the best ``k`` neighbours
+of every artisan are kept in an ``int32`` table that is served by slicing.
+A ``limit`` past ``k`` continues with the locality ranges above.
+The craft weight outweighs all other features together, so only artisans
+of the same craft are compared, and they always rank above any other.
+"""
+
+import logging
+import os
+import zlib
+from typing import Dict, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Match levels from closest to widest, with the similarity score of each
+MATCH_LEVELS = (
+    ('district', 1.0),  # same craft, state and district
+    ('state', 0.67),    # same craft and state
+    ('craft', 0.33),    # same craft
+)
+
+
+class SimilarRows(NamedTuple):
+    rows: np.ndarray     # row positions, most similar first
+    levels: np.ndarray   # index into MATCH_LEVELS per row
+    scores: np.ndarray   # similarity in [0, 1] per row
+    total: int           # every row sharing the craft (excluding the artisan)
+
+
+def _codes(values: Sequence) -> np.ndarray:
+    codes, _ = pd.factorize(pd.Series(values, dtype=object).map(
+        lambda v: v.strip().lower() if isinstance(v, str) else v))
+    return codes.astype(np.int32)
+
+
+def _group_bounds(sorted_keys: Sequence[np.ndarray], n: int):
+    """Start and end (in sorted order) of each position's group of equal keys."""
+    change = np.ones(n, dtype=bool)
+    if n:
+        change[1:] = np.any([keys[1:] != keys[:-1] for keys in sorted_keys], axis=0)
+    starts = np.flatnonzero(change).astype(np.int32)
+    ends = np.append(starts[1:], n).astype(np.int32)
+    group = np.cumsum(change) - 1
+    return starts[group], ends[group]
+
+
+class SimilarIndex:
+    """Artisan id -> row, and (craft, state, district) peer ranges per row."""
+
+    def __init__(self, ids: Sequence, crafts: Sequence, states: Sequence, districts: Sequence):
+        n = len(ids)
+        # Earlier rows win for duplicated ids
+        self.row_by_id: Dict[str, int] = {str(key): row for row, key in reversed(list(enumerate(ids)))}
+        self.crafts, self.states, self.districts = _codes(crafts), _codes(states), _codes(districts)
+        self.order = np.lexsort((np.arange(n), self.districts, self.states, self.crafts)).astype(np.int32)
+        self.position = np.empty(n, dtype=np.int32)
+        self.position[self.order] = np.arange(n, dtype=np.int32)
+        keys = (self.crafts[self.order], self.states[self.order], self.districts[self.order])
+        # One (start, end) pair per level, indexed by sorted position: widest (craft) first
+        self.bounds = [_group_bounds(keys[:depth], n) for depth in (1, 2, 3)]
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, id_column: str = 'artisan_id') -> "SimilarIndex":
+        return cls(frame[id_column].tolist(), frame['craft_type'].tolist(),
+                   frame['state'].tolist(), frame['district'].tolist())
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def row(self, artisan_id) -> Optional[int]:
+        return self.row_by_id.get(str(artisan_id))
+
+    def match_levels(self, row: int, rows: np.ndarray) -> np.ndarray:
+        """Index into MATCH_LEVELS of each of ``rows`` relative to ``row``."""
+        same_state = (self.states[rows] == self.states[row]) & (self.states[row] >= 0)
+        same_district = same_state & (self.districts[rows] == self.districts[row]) & (self.districts[row] >= 0)
+        return np.where(same_district, 0, np.where(same_state, 1, 2)).astype(np.int8)
+
+    def similar(self, row: int, limit: int, neighbours: Optional["NeighbourTable"] = None) -> SimilarRows:
+        """
+        Up to ``limit`` rows sharing ``row``'s craft.
+
+        With a :class:`NeighbourTable` these are its precomputed neighbours,
+        ranked by feature score, and past its ``k`` the remaining rows of the
+        locality ranges; without one, the closest match level comes first.
+        """
+        position = self.position[row]
+        (craft_lo, craft_hi), (state_lo, state_hi), (district_lo, district_hi) = (
+            (lo[position], hi[position]) for lo, hi in self.bounds)
+        total = int(craft_hi - craft_lo - 1) if self.crafts[row] >= 0 else 0
+        # Rows without a state or district share no place with anyone
+        if self.states[row] < 0:
+            state_hi = district_lo = district_hi = state_lo
+        elif self.districts[row] < 0:
+            district_hi = district_lo
+        if total == 0 or limit <= 0:
+            return SimilarRows(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int8), np.empty(0), total)
+        # Each level adds the ranges of the next wider group around the previous one
+        ranges = [
+            [(district_lo, district_hi)],
+            [(state_lo, district_lo), (district_hi, state_hi)],
+            [(craft_lo, state_lo), (state_hi, craft_hi)],
+        ]
+        if neighbours is None:
+            rows, levels = self._walk(ranges, limit, np.array([row]))
+            return SimilarRows(rows, levels, np.array([score for _, score in MATCH_LEVELS])[levels], total)
+
+        rows, scores = neighbours.similar(row, limit)
+        levels = self.match_levels(row, rows)
+        if len(rows) < min(limit, total):
+            # The table keeps k neighbours; the rest come from the ranges, closest place first
+            extra, extra_levels = self._walk(ranges, limit - len(rows), np.append(rows, row))
+            rows = np.concatenate([rows, extra])
+            levels = np.concatenate([levels, extra_levels])
+            scores = np.concatenate([scores, _PLACE_SCORES[extra_levels]])
+        return SimilarRows(rows, levels, scores, total)
+
+    def _walk(self, ranges, limit: int, exclude: np.ndarray):
+        """Up to ``limit`` rows of ``ranges`` (in order) that are not in ``exclude``, with their levels."""
+        rows, levels, wanted = [], [], limit
+        for level, spans in enumerate(ranges):
+            for lo, hi in spans:
+                # Extra rows in case excluded ones are in this span
+                picked = self.order[lo:min(hi, lo + wanted + len(exclude))]
+                picked = picked[~np.isin(picked, exclude)][:wanted]
+                rows.append(picked)
+                levels.append(np.full(len(picked), level, dtype=np.int8))
+                wanted -= len(picked)
+                if wanted == 0:
+                    break
+            if wanted == 0:
+                break
+        return np.concatenate(rows).astype(np.int32, copy=False), np.concatenate(levels)
+
+
+# Integer score units per matching feature; CRAFT_WEIGHT > the sum of the others
+CRAFT_WEIGHT = 32
+FEATURE_WEIGHTS = {'state': 8, 'district': 8, 'cluster': 6, 'age': 4, 'languages': 4}
+MAX_SCORE = CRAFT_WEIGHT + sum(FEATURE_WEIGHTS.values())
+AGE_BUCKET_YEARS = 10
+LANGUAGE_BITS = 8
+DEFAULT_NEIGHBOURS = 20
+BLOCK_ELEMENTS = 1 << 18  # pairs scored at once; ~1 MB of keys stays in cache
+# Score of a row past the table's k per match level: the place features alone, which
+# never exceed the full score of the k neighbours the table ranked above it
+_PLACE_SCORES = np.round(np.array([
+    CRAFT_WEIGHT + FEATURE_WEIGHTS['state'] + FEATURE_WEIGHTS['district'],
+    CRAFT_WEIGHT + FEATURE_WEIGHTS['state'],
+    CRAFT_WEIGHT,
+]) / MAX_SCORE, 3)
+
+# Same age bucket scores the full weight, the adjacent one half
+_AGE_CREDIT = np.array([FEATURE_WEIGHTS['age'], FEATURE_WEIGHTS['age'] // 2, 0], dtype=np.int16)
+
+
+def _language_table() -> np.ndarray:
+    """Jaccard score of every pair of language bitmasks, in score units."""
+    masks = np.arange(1 << LANGUAGE_BITS, dtype=np.uint16)
+    bits = ((masks[:, None] >> np.arange(LANGUAGE_BITS)) & 1).astype(np.int16)
+    shared = bits @ bits.T
+    union = bits.sum(axis=1)[:, None] + bits.sum(axis=1)[None, :] - shared
+    with np.errstate(invalid='ignore', divide='ignore'):
+        jaccard = np.where(union > 0, shared / union, 0.0)
+    return np.rint(jaccard * FEATURE_WEIGHTS['languages']).astype(np.int16)
+
+
+_LANGUAGE_TABLE = _language_table()
+
+
+def _language_mask(languages) -> int:
+    """Bitmask of the hashed language tokens of ``'Hindi, English'`` or ``['Hindi', 'English']``."""
+    if isinstance(languages, str):
+        languages = languages.split(',')
+    elif not isinstance(languages, (list, tuple)):
+        return 0
+    mask = 0
+    for token in languages:
+        token = token.strip().lower()
+        if token:
+            mask |= 1 << (zlib.crc32(token.encode()) % LANGUAGE_BITS)
+    return mask
+
+
+class ArtisanFeatures(NamedTuple):
+    """Compact per-artisan feature vectors: one column per feature, -1 when unknown."""
+    crafts: np.ndarray     # int32 codes
+    states: np.ndarray     # int32 codes
+    districts: np.ndarray  # int32 codes of (state, district), so same-named districts differ
+    clusters: np.ndarray   # int32 codes
+    ages: np.ndarray       # int16 age buckets
+    languages: np.ndarray  # uint8 bitmask of hashed language tokens
+
+    @classmethod
+    def from_columns(cls, crafts: Sequence, states: Sequence, districts: Sequence, ages: Sequence,
+                     languages: Sequence, clusters: Sequence) -> "ArtisanFeatures":
+        places = [f"{state}\x1f{district}" if isinstance(district, str) and district else None
+                  for state, district in zip(states, districts)]
+        ages = pd.to_numeric(pd.Series(ages, dtype=object), errors='coerce').to_numpy(dtype=float)
+        buckets = np.where(ages > 0, np.floor(ages / AGE_BUCKET_YEARS), -1).astype(np.int16)
+        return cls(_codes(crafts), _codes(states), _codes(places), _codes(clusters), buckets,
+                   np.fromiter((_language_mask(value) for value in languages), dtype=np.uint8, count=len(ages)))
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "ArtisanFeatures":
+        def column(name):
+            return frame[name].tolist() if name in frame.columns else [None] * len(frame)
+        return cls.from_columns(column('craft_type'), column('state'), column('district'), column('age'),
+                                column('languages_spoken'), column('artisan_cluster_code'))
+
+    def profiles(self, rows: np.ndarray) -> np.ndarray:
+        """One integer per distinct combination of the scored (non-craft) features."""
+        key = np.zeros(len(rows), dtype=np.int64)
+        for codes in (self.districts, self.states, self.clusters, self.ages, self.languages):
+            values = codes[rows].astype(np.int64) + 1
+            key = key * (int(codes.max(initial=0)) + 2) + values
+        return key
+
+
+class PairScorer:
+    """Score units (without the craft weight) of artisan pairs, a block of rows at a time."""
+
+    def __init__(self, features: ArtisanFeatures):
+        self.weights = [np.int16(FEATURE_WEIGHTS[name]) for name in ('state', 'district', 'cluster')]
+        self.left = [features.states, features.districts, features.clusters]
+        # Unknown (-1) on the left never equals -2 on the right
+        self.right = [np.where(codes < 0, -2, codes) for codes in self.left]
+        # Age and languages are scored from one table over their (few) distinct combinations
+        combos, self.soft = np.unique((features.ages.astype(np.int32) + 1) * 256 + features.languages,
+                                      return_inverse=True)
+        ages, languages = combos // 256 - 1, combos % 256
+        credit = _AGE_CREDIT[np.minimum(np.abs(ages[:, None] - ages[None, :]), len(_AGE_CREDIT) - 1)]
+        credit[(ages[:, None] < 0) | (ages[None, :] < 0)] = 0
+        self.table = (credit + _LANGUAGE_TABLE[languages[:, None], languages[None, :]]).astype(np.int16)
+
+    def __call__(self, rows: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        scores = self.table[self.soft[rows]][:, self.soft[candidates]]
+        for left, right, weight in zip(self.left, self.right, self.weights):
+            scores += (left[rows][:, None] == right[candidates][None, :]) * weight
+        return scores
+
+
+class NeighbourTable:
+    """The ``k`` best-scoring same-craft neighbours of every artisan (``-1`` padded)."""
+
+    def __init__(self, neighbours: np.ndarray, scores: np.ndarray):
+        self.neighbours = neighbours  # int32, (rows, k), best first
+        self.scores = scores          # uint8 score units, same shape
+
+    @property
+    def k(self) -> int:
+        return self.neighbours.shape[1]
+
+    @classmethod
+    def build(cls, features: ArtisanFeatures, k: int = DEFAULT_NEIGHBOURS,
+              block_elements: int = BLOCK_ELEMENTS) -> "NeighbourTable":
+        """Score every same-craft pair block by block and keep each row's top ``k``."""
+        n = len(features.crafts)
+        pair_scores = PairScorer(features)
+        neighbours = np.full((n, k), -1, dtype=np.int32)
+        scores = np.zeros((n, k), dtype=np.uint8)
+        order = np.argsort(features.crafts, kind='stable')
+        starts = np.flatnonzero(np.diff(features.crafts[order], prepend=-2)) if n else np.empty(0, dtype=np.int64)
+        for group in np.split(order, starts[1:]):
+            m = len(group)
+            if m < 2 or features.crafts[group[0]] < 0:
+                continue
+            keep = min(k, m - 1)
+            # Rows with the same features rank every candidate the same way, so each
+            # distinct profile is scored once and ranks keep + 1 (itself may be among them)
+            profiles, inverse = np.unique(features.profiles(group), return_inverse=True)
+            first = np.zeros(len(profiles), dtype=np.int64)
+            first[inverse[::-1]] = np.arange(m - 1, -1, -1)
+            ranked = min(keep + 1, m)
+            # Ties go to the lower row: the key is score * m + (m - 1 - position)
+            tie_break = np.arange(m - 1, -1, -1, dtype=np.int32)
+            best = np.empty((len(profiles), ranked), dtype=np.int64)
+            best_scores = np.empty((len(profiles), ranked), dtype=np.int16)
+            block = max(1, block_elements // m)
+            for start in range(0, len(profiles), block):
+                rows = first[start:start + block]
+                pair = pair_scores(group[rows], group)
+                key = pair.astype(np.int32) * m + tie_break
+                top = np.argpartition(key, m - ranked, axis=1)[:, m - ranked:]
+                top = np.take_along_axis(top, np.argsort(-np.take_along_axis(key, top, axis=1), axis=1), axis=1)
+                best[start:start + block] = top
+                best_scores[start:start + block] = np.take_along_axis(pair, top, axis=1)
+            # Per row: its profile's ranking without the row itself
+            top, top_scores = best[inverse], best_scores[inverse]
+            not_self = np.argsort(top == np.arange(m)[:, None], axis=1, kind='stable')[:, :keep]
+            neighbours[group, :keep] = group[np.take_along_axis(top, not_self, axis=1)]
+            scores[group, :keep] = CRAFT_WEIGHT + np.take_along_axis(top_scores, not_self, axis=1)
+        logger.info(f"Precomputed {k} similar artisans for {n} rows")
+        return cls(neighbours, scores)
+
+    @classmethod
+    def from_env(cls, features: ArtisanFeatures) -> Optional["NeighbourTable"]:
+        """Built with ``SIMILAR_NEIGHBOURS`` neighbours per artisan; ``0`` skips the batch job."""
+        k = int(os.getenv('SIMILAR_NEIGHBOURS', DEFAULT_NEIGHBOURS))
+        return cls.build(features, k) if k > 0 else None
+
+    def similar(self, row: int, limit: int):
+        """Up to ``limit`` (at most ``k``) neighbour rows of ``row`` and their scores in [0, 1]."""
+        rows = self.neighbours[row, :max(0, limit)]
+        found = rows >= 0
+        return rows[found], np.round(self.scores[row, :len(rows)][found] / MAX_SCORE, 3)
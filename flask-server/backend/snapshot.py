@@ -0,0 +1,206 @@
+"""
+Versioned columnar snapshot of the preprocessed artisan table.
+
+The snapshot is a directory written next to the CSV.  Numeric columns are
+stored as plain ``.npy`` files and string columns are dictionary encoded as
+an ``int32`` code array plus their distinct values, kept as one UTF-8 byte
+array with ``int64`` offsets (so long, unique text such as ``search_text``
+costs its encoded length rather than the longest value times four bytes per
+row).  Nothing is unpickled on load.  ``manifest.json`` records the CSV
+fingerprint (size, mtime and SHA-256) and a schema tag; a snapshot whose
+fingerprint or schema no longer matches is treated as stale.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+
+
+def snapshot_path(csv_path: str) -> str:
+    """Directory holding the snapshot for ``csv_path``."""
+    root, _ = os.path.splitext(csv_path)
+    return f"{root}.snapshot"
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def csv_fingerprint(csv_path: str, with_hash: bool = True) -> Dict:
+    stat = os.stat(csv_path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        fingerprint["sha256"] = file_sha256(csv_path)
+    return fingerprint
+
+
+def read_manifest(csv_path: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(snapshot_path(csv_path), MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(manifest: Optional[Dict], csv_path: str, schema: str) -> bool:
+    """True when ``manifest`` was written for the current CSV contents and schema."""
+    if not manifest or manifest.get("version") != SNAPSHOT_VERSION or manifest.get("schema") != schema:
+        return False
+    recorded = manifest.get("source", {})
+    current = csv_fingerprint(csv_path, with_hash=False)
+    if recorded.get("size") != current["size"]:
+        return False
+    if recorded.get("mtime_ns") == current["mtime_ns"]:
+        return True
+    # Touched but possibly unchanged (e.g. a fresh checkout): fall back to the hash.
+    return recorded.get("sha256") == file_sha256(csv_path)
+
+
+def _save_strings(stem: str, values) -> None:
+    """Store ``values`` as concatenated UTF-8 bytes plus ``len(values) + 1`` offsets."""
+    encoded = [str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(f"{stem}.strings.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(f"{stem}.offsets.npy", offsets)
+
+
+def _load_strings(stem: str) -> np.ndarray:
+    """Decode the strings stored by :func:`_save_strings` into an object array."""
+    data = np.load(f"{stem}.strings.npy", mmap_mode="r").tobytes()
+    offsets = np.load(f"{stem}.offsets.npy").tolist()
+    values = np.empty(len(offsets) - 1, dtype=object)
+    values[:] = [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+    return values
+
+
+def write_snapshot(frame: pd.DataFrame, csv_path: str, schema: str) -> str:
+    """Write ``frame`` as a columnar snapshot next to ``csv_path`` and return its directory."""
+    target = snapshot_path(csv_path)
+    parent = os.path.dirname(os.path.abspath(target))
+    staging = tempfile.mkdtemp(prefix=".snapshot-", dir=parent)
+    columns = []
+    try:
+        for i, name in enumerate(frame.columns):
+            series = frame[name]
+            stem = os.path.join(staging, f"c{i}")
+            if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                np.save(f"{stem}.npy", series.to_numpy())
+                columns.append({"name": name, "kind": "numeric", "file": f"c{i}"})
+            else:
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    codes, categories = series.cat.codes.to_numpy(), series.cat.categories
+                else:
+                    codes, categories = pd.factorize(series.astype(object), use_na_sentinel=True)
+                np.save(f"{stem}.codes.npy", codes.astype(np.int32))
+                _save_strings(f"{stem}.categories", categories)
+                columns.append({"name": name, "kind": "dictionary", "file": f"c{i}"})
+
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "schema": schema,
+            "rows": len(frame),
+            "columns": columns,
+            "source": csv_fingerprint(csv_path),
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap the finished directory into place so readers never see a partial snapshot.
+        retired = None
+        if os.path.exists(target):
+            retired = tempfile.mkdtemp(prefix=".snapshot-old-", dir=parent)
+            os.replace(target, os.path.join(retired, "snapshot"))
+        os.replace(staging, target)
+        if retired:
+            shutil.rmtree(retired, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    logger.info(f"Wrote columnar snapshot of {len(frame)} rows to {target}")
+    return target
+
+
+def load_columns(csv_path: str, schema: str) -> Optional[Dict]:
+    """
+    Memory-map the snapshot columns for ``csv_path``.
+
+    Returns ``None`` when the snapshot is missing or stale.  Numeric columns
+    map to arrays and dictionary columns to ``(codes, categories)`` pairs.
+    """
+    manifest = read_manifest(csv_path)
+    if not is_fresh(manifest, csv_path, schema):
+        return None
+
+    directory = snapshot_path(csv_path)
+    columns = {}
+    for column in manifest["columns"]:
+        stem = os.path.join(directory, column["file"])
+        if column["kind"] == "numeric":
+            columns[column["name"]] = np.load(f"{stem}.npy", mmap_mode="r")
+        else:
+            columns[column["name"]] = (
+                np.load(f"{stem}.codes.npy", mmap_mode="r"),
+                _load_strings(f"{stem}.categories"),
+            )
+    return columns
+
+
+def decode_strings(codes: np.ndarray, categories: np.ndarray) -> np.ndarray:
+    """Expand a dictionary-encoded column to an object array (``NaN`` for missing)."""
+    values = np.empty(len(codes), dtype=object)
+    if len(categories):
+        lookup = np.asarray(categories, dtype=object)
+        present = codes >= 0
+        values[present] = lookup[codes[present]]
+        values[~present] = np.nan
+    else:
+        values[:] = np.nan
+    return values
+
+
+def _column_values(name: str, value, categorical: Iterable[str]):
+    if not isinstance(value, tuple):
+        return np.asarray(value)
+    codes, categories = value
+    if name in categorical:
+        # The stored dictionary *is* the category list, so rows are not expanded to strings.
+        return pd.Categorical.from_codes(np.asarray(codes), categories=pd.Index(categories, dtype=object))
+    return decode_strings(codes, categories)
+
+
+def read_snapshot(csv_path: str, schema: str, categorical: Iterable[str] = ()) -> Optional[pd.DataFrame]:
+    """
+    Rebuild the preprocessed frame from a fresh snapshot, or ``None`` if stale.
+
+    Dictionary columns listed in ``categorical`` become pandas Categoricals
+    straight from their stored codes; the rest are decoded to strings.
+    """
+    columns = load_columns(csv_path, schema)
+    if columns is None:
+        return None
+    categorical = set(categorical)
+    # copy=False keeps numeric columns on the memory-mapped files, shared with every process
+    frame = pd.DataFrame({
+        name: _column_values(name, value, categorical)
+        for name, value in columns.items()
+    }, copy=False)
+    logger.info(f"Loaded {len(frame)} records from columnar snapshot {snapshot_path(csv_path)}")
+    return frame
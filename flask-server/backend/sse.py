@@ -0,0 +1,36 @@
+"""
+Server-Sent Events helpers for the streaming chat endpoints.
+
+A streamed answer is a sequence of events: ``meta`` first (the database
+matches, suggestions and anything else known before generation starts),
+then one ``token`` event per generated chunk, then ``done`` with the full
+text.  Clients can render the artisans as soon as ``meta`` arrives.
+"""
+
+import json
+from typing import Dict, Iterable, Iterator
+
+from flask import Response, stream_with_context
+
+
+def format_event(event: str, data) -> str:
+    """One SSE frame; ``data`` is sent as JSON."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def answer_events(meta: Dict, chunks: Iterable[str]) -> Iterator[str]:
+    """``meta`` immediately, then a ``token`` per chunk and a final ``done``."""
+    yield format_event('meta', meta)
+    parts = []
+    try:
+        for chunk in chunks:
+            parts.append(chunk)
+            yield format_event('token', {'text': chunk})
+    except Exception as e:
+        yield format_event('error', {'message': str(e)})
+    yield format_event('done', {'text': ''.join(parts)})
+
+
+def sse_response(events: Iterable[str]) -> Response:
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -0,0 +1,257 @@
+"""
+Precomputed statistics cube over the artisan table.
+
+Rows are grouped once, at load time, into cells keyed by
+(state, district, craft_type, gender, phone availability).  Each cell keeps
+its artisan count, the sum of known ages and a one-year age histogram, which
+is enough to answer every statistics endpoint -- including state/district
+scoped queries -- by aggregating cells instead of scanning rows.  Records can
+be added to or removed from the cube incrementally.
+"""
+
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Ages are histogrammed per whole year; anything outside [0, MAX_AGE] is clipped.
+MAX_AGE = 150
+# Cell arrays grow by this factor, so adding cells one batch at a time stays amortized O(1)
+GROWTH = 2
+
+DIMENSIONS = ('state', 'district', 'craft_type', 'gender', 'phone_available')
+FRAME_COLUMNS = {
+    'state': 'state',
+    'district': 'district',
+    'craft_type': 'craft_type',
+    'gender': 'gender',
+    'phone_available': 'contact_phone_boolean',
+}
+
+
+def _normalize(value) -> Optional[str]:
+    return None if value is None else str(value).strip().lower()
+
+
+class StatsCube:
+    """Counts and age histograms per (state, district, craft, gender, phone) cell."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values: Dict[str, List] = {dim: [] for dim in DIMENSIONS}
+        self._codes: Dict[str, Dict] = {dim: {} for dim in DIMENSIONS}
+        self._by_name: Dict[str, Dict[str, List[int]]] = {dim: {} for dim in DIMENSIONS}
+        self._cells: Dict[tuple, int] = {}
+        # Arrays are allocated with spare capacity; the first len(self._cells) rows are live
+        self._keys = np.empty((0, len(DIMENSIONS)), dtype=np.int32)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._age_sums = np.empty(0, dtype=np.float64)
+        # int32 halves the largest array; one cell never holds 2**31 artisans of one age
+        self._age_hist = np.empty((0, MAX_AGE + 1), dtype=np.int32)
+
+    @property
+    def keys(self) -> np.ndarray:
+        return self._keys[:len(self._cells)]
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts[:len(self._cells)]
+
+    @property
+    def age_sums(self) -> np.ndarray:
+        return self._age_sums[:len(self._cells)]
+
+    @property
+    def age_hist(self) -> np.ndarray:
+        return self._age_hist[:len(self._cells)]
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "StatsCube":
+        cube = cls()
+        cube.add(frame)
+        return cube
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Sequence], ages: Sequence) -> "StatsCube":
+        """Build a cube from plain sequences keyed by dimension name."""
+        cube = cls()
+        cube.add_columns(columns, ages)
+        return cube
+
+    # -- incremental maintenance -------------------------------------------
+
+    def add(self, frame: pd.DataFrame) -> None:
+        """Add the rows of ``frame`` to the cube."""
+        self.add_columns(*self._frame_columns(frame))
+
+    def remove(self, frame: pd.DataFrame) -> None:
+        """Remove rows previously added with :meth:`add`."""
+        self.add_columns(*self._frame_columns(frame), sign=-1)
+
+    @staticmethod
+    def _frame_columns(frame: pd.DataFrame):
+        columns = {
+            dim: frame[col].to_numpy(dtype=object) if col in frame.columns else np.full(len(frame), None, dtype=object)
+            for dim, col in FRAME_COLUMNS.items()
+        }
+        ages = frame['age'].to_numpy(dtype=np.float64) if 'age' in frame.columns else np.full(len(frame), np.nan)
+        return columns, ages
+
+    def add_columns(self, columns: Dict[str, Sequence], ages: Sequence, sign: int = 1) -> None:
+        ages = pd.to_numeric(pd.Series(ages, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+        with self._lock:
+            row_keys = np.stack([
+                self._encode(dim, columns.get(dim, [None] * len(ages))) for dim in DIMENSIONS
+            ], axis=1) if len(ages) else np.empty((0, len(DIMENSIONS)), dtype=np.int32)
+            unique_keys, inverse = np.unique(row_keys, axis=0, return_inverse=True)
+            rows = self._cell_ids(unique_keys, create=sign > 0)[inverse.reshape(-1)]
+
+            known = ~np.isnan(ages)
+            cell_counts = self.counts  # views onto the live rows, updated in place
+            counts = np.bincount(rows, minlength=len(cell_counts))
+            if sign < 0 and np.any(counts > cell_counts):
+                raise ValueError("Cannot remove records that were never added to the cube")
+            cell_counts += sign * counts
+            self.age_sums[:] += sign * np.bincount(rows[known], weights=ages[known], minlength=len(cell_counts))
+            buckets = np.clip(np.rint(ages[known]), 0, MAX_AGE).astype(np.int64)
+            np.add.at(self.age_hist, (rows[known], buckets), sign)
+
+    def _encode(self, dim: str, values: Sequence) -> np.ndarray:
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        mapping = np.asarray([self._intern(dim, value) for value in uniques] + [self._intern(dim, None)],
+                             dtype=np.int32)
+        return mapping[codes]
+
+    def _intern(self, dim: str, value) -> int:
+        codes = self._codes[dim]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.values[dim])
+            self.values[dim].append(value)
+            self._by_name[dim].setdefault(_normalize(value), []).append(code)
+        return code
+
+    def _cell_ids(self, unique_keys: np.ndarray, create: bool) -> np.ndarray:
+        cell_ids = np.empty(len(unique_keys), dtype=np.int64)
+        new_keys = []
+        for i, key in enumerate(map(tuple, unique_keys.tolist())):
+            cell = self._cells.get(key)
+            if cell is None:
+                if not create:
+                    raise ValueError("Cannot remove records that were never added to the cube")
+                cell = len(self._cells) + len(new_keys)
+                new_keys.append(key)
+            cell_ids[i] = cell
+        if new_keys:
+            size = len(self._cells)
+            self._reserve(size + len(new_keys))
+            self._keys[size:size + len(new_keys)] = np.asarray(new_keys, dtype=np.int32)
+            self._cells.update((key, size + i) for i, key in enumerate(new_keys))
+        return cell_ids
+
+    def _reserve(self, cells: int) -> None:
+        """Make room for ``cells`` cells, growing geometrically; new rows start at zero."""
+        capacity = len(self._counts)
+        if cells <= capacity:
+            return
+        capacity = max(cells, capacity * GROWTH)
+
+        def grown(array):
+            bigger = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            bigger[:len(array)] = array
+            return bigger
+
+        self._keys, self._counts = grown(self._keys), grown(self._counts)
+        self._age_sums, self._age_hist = grown(self._age_sums), grown(self._age_hist)
+
+    # -- queries -------------------------------------------------------------
+
+    def summary(self, **filters) -> "CubeSummary":
+        """
+        Aggregate the cells matching ``filters``.
+
+        Each filter is a dimension name mapped to a value (or list of values),
+        compared case-insensitively; ``None`` filters are ignored.
+        """
+        with self._lock:
+            mask = self.counts > 0
+            for dim, value in filters.items():
+                if value is None:
+                    continue
+                wanted = value if isinstance(value, (list, tuple, set)) else [value]
+                codes = [code for v in wanted for code in self._by_name[dim].get(_normalize(v), [])]
+                mask &= np.isin(self.keys[:, DIMENSIONS.index(dim)], codes)
+            # A vector-matrix product sums the matching histogram rows without copying them
+            age_hist = (mask.astype(np.int32) @ self.age_hist).astype(np.int64)
+            return CubeSummary(
+                {dim: list(self.values[dim]) for dim in DIMENSIONS},
+                self.keys[mask], self.counts[mask], self.age_sums[mask], age_hist,
+            )
+
+
+class CubeSummary:
+    """Aggregates over a set of cube cells."""
+
+    def __init__(self, values: Dict[str, List], keys: np.ndarray, counts: np.ndarray,
+                 age_sums: np.ndarray, age_hist: np.ndarray):
+        self._values = values
+        self._keys = keys
+        self._counts = counts
+        self.total = int(counts.sum())
+        self._age_sum = float(age_sums.sum())
+        self._age_hist = age_hist
+        self._ages_known = int(age_hist.sum())
+
+    def counts_by(self, dim: str) -> np.ndarray:
+        return np.bincount(self._keys[:, DIMENSIONS.index(dim)], weights=self._counts,
+                           minlength=len(self._values[dim])).astype(np.int64)
+
+    def value_counts(self, dim: str, top: Optional[int] = None) -> Dict:
+        """Counts per value of ``dim`` in descending order, like ``Series.value_counts``."""
+        counts = self.counts_by(dim)
+        values = self._values[dim]
+        order = np.argsort(-counts, kind='stable')
+        result = {}
+        for code in order:
+            if counts[code] == 0 or top is not None and len(result) >= top:
+                break
+            if values[code] is not None:
+                result[values[code]] = int(counts[code])
+        return result
+
+    def unique_values(self, dim: str) -> List:
+        counts = self.counts_by(dim)
+        return [value for value, count in zip(self._values[dim], counts) if count and value is not None]
+
+    def nunique(self, dim: str) -> int:
+        return len(self.unique_values(dim))
+
+    def age_mean(self) -> Optional[float]:
+        return self._age_sum / self._ages_known if self._ages_known else None
+
+    def age_median(self) -> Optional[float]:
+        if not self._ages_known:
+            return None
+        cumulative = np.cumsum(self._age_hist)
+        lower = int(np.searchsorted(cumulative, (self._ages_known - 1) // 2 + 1))
+        upper = int(np.searchsorted(cumulative, self._ages_known // 2 + 1))
+        return (lower + upper) / 2
+
+    def age_min(self) -> Optional[int]:
+        present = np.flatnonzero(self._age_hist)
+        return int(present[0]) if len(present) else None
+
+    def age_max(self) -> Optional[int]:
+        present = np.flatnonzero(self._age_hist)
+        return int(present[-1]) if len(present) else None
+
+    def age_statistics(self) -> Optional[Dict]:
+        if not self._ages_known:
+            return None
+        return {
+            'average_age': round(self.age_mean(), 1),
+            'median_age': self.age_median(),
+            'min_age': self.age_min(),
+            'max_age': self.age_max(),
+        }
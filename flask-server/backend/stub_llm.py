@@ -0,0 +1,89 @@
+"""
+Local stub LLM server for development and tests.
+
+Answers ``POST /generate`` with ``{"model": ..., "prompt": ...}`` by returning
+``{"text": ...}`` (or newline-delimited chunks when ``"stream": true``) after
+an optional delay, and can be told to fail for some model names, which is
+enough to exercise pooling, fallback, streaming and timeouts without Gemini.  Point the backends at it with ``LLM_STUB_URL``::
+
+    python -m backend.stub_llm --port 8808 --latency 0.2 --fail gemini-1.5-flash
+    LLM_STUB_URL=http://127.0.0.1:8808 python app.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable
+
+
+def make_server(host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                failing: Iterable[str] = (), chunk_delay: float = 0.0) -> ThreadingHTTPServer:
+    """Build (but do not start) a stub server; ``port=0`` picks a free port.
+
+    ``latency`` delays the first byte; with ``"stream": true`` the answer is
+    sent word by word, ``chunk_delay`` seconds apart.
+    """
+    failing = set(failing)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != '/generate':
+                self.send_error(404)
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            model, prompt = body.get('model', ''), body.get('prompt', '')
+            self.server.calls += 1
+            if latency:
+                time.sleep(latency)
+            if model in failing:
+                self.send_error(503, f"{model} unavailable")
+                return
+            text = f"[{model}] answer to a {len(prompt)}-character prompt"
+            if body.get('stream'):
+                # Newline-delimited chunks, one word at a time, flushed as they are "generated"
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.end_headers()
+                for word in text.split(' '):
+                    self.wfile.write((json.dumps({'text': word + ' '}) + '\n').encode())
+                    self.wfile.flush()
+                    if chunk_delay:
+                        time.sleep(chunk_delay)
+                return
+            payload = json.dumps({'text': text}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.calls = 0
+    return server
+
+
+def serve_in_background(**kwargs) -> ThreadingHTTPServer:
+    """Start a stub server in a daemon thread; its URL is ``http://host:server.server_port``."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub LLM server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8808)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument('--fail', action='append', default=[], help="model name that always fails")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.latency, args.fail, args.chunk_delay)
+    print(f"Stub LLM listening on http://{args.host}:{server.server_port}")
+    server.serve_forever()
@@ -0,0 +1,104 @@
+"""
+Background training jobs for the RAG model.
+
+:class:`TrainingRunner` runs one training function at a time on a daemon
+thread and keeps the recent jobs for the status endpoints.  The function
+receives a ``progress(stage, done, total)`` callback and returns a summary
+that becomes the job's result; whatever it swaps into the serving path is
+up to the caller.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for GET /train/status/<job_id>
+JOB_HISTORY = 20
+
+
+class TrainingJob:
+    """State and progress of one training run."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.state = 'queued'
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.stage: Optional[str] = None
+        self.done = 0
+        self.total = 0
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self.state in ('queued', 'running')
+
+    def progress(self, stage: str, done: int, total: int):
+        self.stage, self.done, self.total = stage, done, total
+
+    def to_dict(self) -> Dict:
+        finished = self.finished_at or time.time()
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'stage': self.stage,
+            'done': self.done,
+            'total': self.total,
+            'elapsed_seconds': round(finished - self.started_at, 3) if self.started_at else 0.0,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class TrainingRunner:
+    """Runs training functions one at a time in the background."""
+
+    def __init__(self, history: int = JOB_HISTORY):
+        self.history = history
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, train: Callable[[Callable[[str, int, int], None]], Any]) -> Tuple[TrainingJob, bool]:
+        """
+        Start ``train`` on a background thread.
+
+        Returns ``(job, started)``; while a job is still running no new one
+        is started and that job is returned with ``started=False``.
+        """
+        with self._lock:
+            current = self.latest()
+            if current is not None and current.running:
+                return current, False
+            job = TrainingJob()
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+        threading.Thread(target=self._run, args=(job, train), name=f"training-{job.id}", daemon=True).start()
+        return job, True
+
+    def _run(self, job: TrainingJob, train):
+        job.state = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = train(job.progress)
+            job.state = 'succeeded'
+            logger.info(f"Training job {job.id} finished: {job.result}")
+        except Exception as e:
+            job.state = 'failed'
+            job.error = str(e)
+            logger.exception(f"Training job {job.id} failed")
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self._jobs.get(job_id)
+
+    def latest(self) -> Optional[TrainingJob]:
+        return next(reversed(self._jobs.values()), None) if self._jobs else None
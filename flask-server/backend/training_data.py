@@ -0,0 +1,120 @@
+"""
+Streaming readers for RAG training data.
+
+:func:`iter_training_records` yields the records of a training file one at
+a time, whether it is JSON Lines (one object per line) or the original
+single JSON array, which is decoded incrementally from fixed-size chunks.
+Only the current chunk and record are held in memory, so corpora larger
+than RAM can be ingested.
+"""
+
+import codecs
+import json
+import logging
+import os
+from typing import Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_BYTES = 1 << 20
+JSON_LINES_SUFFIXES = ('.jsonl', '.ndjson')
+_WHITESPACE = ' \t\r\n'
+# Characters that can continue a JSON number after a prefix that already decodes
+_NUMBER_CHARS = frozenset('0123456789+-.eE')
+
+
+def _is_json_lines(path: str) -> bool:
+    """JSON Lines by extension, otherwise unless the file starts with a JSON array."""
+    if path.endswith(JSON_LINES_SUFFIXES):
+        return True
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(4096)
+            if not chunk:
+                return True
+            stripped = chunk.lstrip(b' \t\r\n\xef\xbb\xbf')
+            if stripped:
+                return not stripped.startswith(b'[')
+
+
+def _iter_json_lines(f, report: Callable[[int], None]) -> Iterator[Dict]:
+    read = 0
+    for number, line in enumerate(f, 1):
+        read += len(line)
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Invalid JSON on line {number}: {e}") from e
+        if number % 1000 == 0:
+            report(read)
+    report(read)
+
+
+def _iter_json_array(f, report: Callable[[int], None], chunk_bytes: int) -> Iterator[Dict]:
+    """Decode the elements of a top-level JSON array without loading the whole array."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer, pos, read, eof, started = '', 0, 0, False, False
+
+    def fill():
+        nonlocal buffer, pos, read, eof
+        chunk = f.read(chunk_bytes)
+        read += len(chunk)
+        eof = not chunk
+        buffer = buffer[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+        report(read)
+
+    while True:
+        while pos < len(buffer) and (buffer[pos] in _WHITESPACE or (started and buffer[pos] == ',')):
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError("Training data ends inside the JSON array")
+            fill()
+            continue
+        if not started:
+            if buffer[pos] != '[':
+                raise ValueError("Training data is neither JSON Lines nor a JSON array")
+            started = True
+            pos += 1
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The element continues in the next chunk
+            if eof:
+                raise
+            fill()
+            continue
+        if not eof and (end == len(buffer) or (
+                isinstance(value, (int, float)) and buffer[end] in _NUMBER_CHARS)):
+            # A number or literal cut at the chunk boundary may decode short ("-0.5" of "-0.5e-3")
+            fill()
+            continue
+        pos = end
+        yield value
+
+
+def iter_training_records(path: str, progress: Optional[Callable[[str, int, int], None]] = None,
+                          chunk_bytes: int = READ_CHUNK_BYTES) -> Iterator[Dict]:
+    """
+    Yield the training records in ``path`` (JSON Lines or a JSON array) one by one.
+
+    ``progress('reading', bytes_read, file_size)`` is called as the file is consumed.
+    """
+    size = os.path.getsize(path)
+
+    def report(read: int):
+        if progress is not None:
+            progress('reading', read, size)
+
+    with open(path, 'rb') as f:
+        if _is_json_lines(path):
+            yield from _iter_json_lines(f, report)
+        else:
+            yield from _iter_json_array(f, report, chunk_bytes)
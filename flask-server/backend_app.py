@@ -1,11 +1,23 @@
+import logging
+
 from flask import Flask, request
+from backend.hot_reload import register_reload_routes
 from helpers.chat_utils import handle_chat
+from helpers.data_loader import artists_dataset, artists_snapshot
 from helpers.search_utils import apply_filters
 from helpers.stats_utils import get_stats
 from helpers.similar_utils import find_similar
 
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
 app = Flask(__name__)
 
+# Requests hold one artists snapshot; POST /admin/reload or DATASET_WATCH_INTERVAL swaps in a new one
+artists_snapshot()
+artists_dataset.bind(app)
+register_reload_routes(app, artists_dataset)
+artists_dataset.start_watcher()
+
 @app.route("/chat", methods=["POST"])
 def chat_route():
     body = request.json or {}
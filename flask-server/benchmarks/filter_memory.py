@@ -0,0 +1,89 @@
+"""
+Per-request memory of the artisan filter pipeline as the dataset grows.
+
+Builds synthetic artisan frames of increasing size and measures, with
+``tracemalloc``, the peak allocation of one filter request done the old way
+(``df.copy()`` then successive boolean indexing) and with the composed mask
+from :mod:`backend.filters`.  The copy-based peak grows with the whole
+frame; the mask-based peak only grows by the few bytes per row of the mask
+and its comparison temporaries.
+
+Run from the ``flask-server`` directory::
+
+    python -m benchmarks.filter_memory [rows ...]
+"""
+
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from backend.categorical import CategoryCodes, encode_categoricals
+from backend.filters import filter_mask, take
+
+DEFAULT_SIZES = [25_000, 100_000, 400_000]
+STATES = ['Uttar Pradesh', 'Rajasthan', 'West Bengal', 'Tamil Nadu', 'Odisha', 'Bihar', 'Gujarat', 'Kerala']
+CRAFTS = ['Pottery', 'Handloom Weaving', 'Wood Carving', 'Brass Work', 'Madhubani Painting', 'Embroidery']
+FILTERS = {'state': 'Uttar Pradesh', 'craft_type': 'Handloom Weaving', 'age_min': 30, 'age_max': 60}
+PAGE = 20
+
+
+def synthetic_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ids = np.arange(rows)
+    frame = pd.DataFrame({
+        'artisan_id': [f'ART{i:07d}' for i in ids],
+        'name': [f'Artisan {i}' for i in ids],
+        'gender': rng.choice(['Male', 'Female'], rows),
+        'age': rng.integers(18, 90, rows).astype(np.float64),
+        'craft_type': rng.choice(CRAFTS, rows),
+        'state': rng.choice(STATES, rows),
+        'district': [f'District {i}' for i in rng.integers(0, 300, rows)],
+        'village': [f'Village {i}' for i in rng.integers(0, 5000, rows)],
+        'languages_spoken': rng.choice(['Hindi', 'Hindi, English', 'Bengali', 'Tamil'], rows),
+        'contact_email': [f'artisan{i}@example.com' for i in ids],
+    })
+    return encode_categoricals(frame)
+
+
+def copy_pipeline(frame: pd.DataFrame, codes: CategoryCodes) -> pd.DataFrame:
+    """The previous approach: copy the frame, then narrow it filter by filter."""
+    df = frame.copy()
+    for column in ['state', 'craft_type']:
+        df = df[codes.equals_mask(df, column, FILTERS[column])]
+    df = df[df['age'] >= FILTERS['age_min']]
+    df = df[df['age'] <= FILTERS['age_max']]
+    return df.head(PAGE)
+
+
+def mask_pipeline(frame: pd.DataFrame, codes: CategoryCodes) -> pd.DataFrame:
+    mask = filter_mask(frame, codes, equals={c: FILTERS[c] for c in ['state', 'craft_type']},
+                       ranges={'age': (FILTERS['age_min'], FILTERS['age_max'])})
+    return take(frame, mask, PAGE)
+
+
+def peak_bytes(func, *args) -> int:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'copy peak':>12} {'mask peak':>12} {'mask B/row':>11}")
+    for rows in sizes:
+        frame = synthetic_frame(rows)
+        codes = CategoryCodes(frame)
+        assert copy_pipeline(frame, codes)['artisan_id'].tolist() == \
+            mask_pipeline(frame, codes)['artisan_id'].tolist()
+        copy_peak = peak_bytes(copy_pipeline, frame, codes)
+        mask_peak = peak_bytes(mask_pipeline, frame, codes)
+        print(f"{rows:>10} {copy_peak / 1e6:>10.2f}MB {mask_peak / 1e6:>10.2f}MB {mask_peak / rows:>11.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,93 @@
+"""
+Per-worker memory of the merged backend with and without a preloaded master.
+
+Forks ``workers`` processes the way a pre-forking server does and has each
+serve the same mix of search, chat and stats requests, then reads their
+memory from ``/proc/<pid>/smaps_rollup`` (Linux only):
+
+* ``private``: every worker imports ``app`` itself after the fork, so each
+  holds its own frame, indexes and stats (the old gunicorn setup);
+* ``shared``: the master imports ``app`` and freezes the heap before
+  forking (``gunicorn.conf.py``), so workers only add what requests touch.
+
+``private MB`` is memory only that worker holds; ``total MB`` adds the
+master's.  Run from the ``flask-server`` directory with the CSV to load::
+
+    CSV_PATH=public/Artisans.csv python -m benchmarks.prefork_memory [workers]
+"""
+
+import gc
+import importlib
+import json
+import logging
+import os
+import signal
+import sys
+
+from backend import prefork
+
+DEFAULT_WORKERS = 4
+ROUNDS = 20
+QUERIES = ['pottery', 'weaving bihar', 'kerala wood carving', 'madhubani']
+
+
+def serve_requests():
+    app = importlib.import_module('app').app
+    client = app.test_client()
+    for _ in range(ROUNDS):
+        for query in QUERIES:
+            client.post('/search', json={'query': query, 'limit': 20})
+            client.post('/search', json={'state': 'Bihar', 'sort_by': 'name', 'limit': 20})
+            client.post('/chat', json={'message': f'show me {query} artisans'})
+            client.get('/stats')
+    gc.collect()
+
+
+def run_workers(workers: int):
+    """Fork ``workers`` children that serve requests; return their memory usage."""
+    children = []
+    for _ in range(workers):
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            serve_requests()
+            os.write(write_end, json.dumps(prefork.memory_usage()).encode() + b'\n')
+            # Stay alive until every worker is measured, so shared pages stay shared
+            while True:
+                signal.pause()
+        os.close(write_end)
+        children.append((pid, read_end))
+    usages = []
+    for _, read_end in children:
+        with os.fdopen(read_end) as f:
+            usages.append(json.loads(f.readline()))
+    for pid, _ in children:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+    return usages
+
+
+def report(mode: str, workers: int, usages, master):
+    private = sum(u['private'] for u in usages) / len(usages)
+    pss = sum(u['pss'] for u in usages) / len(usages)
+    total = sum(u['private'] for u in usages) + (master['private'] if master else 0.0)
+    print(f"{mode:>8} {workers:>8} {private:>11.1f} {pss:>7.1f} {total:>9.1f}")
+
+
+def main(workers: int):
+    if prefork.memory_usage() is None:
+        sys.exit("Needs /proc/<pid>/smaps_rollup (Linux)")
+    logging.disable(logging.WARNING)
+    print(f"{'mode':>8} {'workers':>8} {'private MB':>11} {'PSS MB':>7} {'total MB':>9}")
+    # Workers load the app themselves: the master must not have imported it yet
+    report('private', workers, run_workers(workers), None)
+
+    importlib.import_module('app')
+    prefork.mark_master()
+    prefork.freeze_heap()
+    report('shared', workers, run_workers(workers), prefork.memory_usage())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_WORKERS)
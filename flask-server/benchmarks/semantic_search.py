@@ -0,0 +1,89 @@
+"""
+Recall and latency of the semantic artisan search as the dataset grows.
+
+Builds synthetic artisan frames, embeds them into the artisan vector store
+of :class:`backend.rag_nlp_model.MultilingualRAGModel` and queries it with
+a paraphrase of each sampled artisan's craft and location.  Reports:
+
+* ``recall@k``: share of queries whose artisan is among the top ``k``;
+* ``ann@k``: overlap of the HNSW results with exact search (FAISS only);
+* single-query p50/p95 and batched per-query latency;
+* save time and the time to load the saved store (memory-mapped).
+
+Run from the ``flask-server`` directory::
+
+    python -m benchmarks.semantic_search [rows ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from backend.rag_nlp_model import ARTISAN_STORE, MultilingualRAGModel
+from benchmarks.filter_memory import synthetic_frame
+
+DEFAULT_SIZES = [20_000, 100_000]
+QUERIES = 200
+BATCH = 64
+K = 10
+
+
+def percentile_ms(samples, q) -> float:
+    return float(np.percentile(samples, q) * 1e3)
+
+
+def main(sizes):
+    print(f"{'rows':>8} {'build s':>8} {'recall@k':>9} {'ann@k':>6} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'batch ms/q':>10} {'save s':>7} {'load ms':>8}")
+    for rows in sizes:
+        frame = synthetic_frame(rows)
+        model = MultilingualRAGModel()
+        started = time.perf_counter()
+        model.build_artisan_store(frame)
+        build = time.perf_counter() - started
+        store = model.stores[ARTISAN_STORE]
+
+        sample = np.random.default_rng(1).choice(rows, QUERIES, replace=False)
+        queries = [f"{frame['craft_type'].iloc[i]} artisans from {frame['village'].iloc[i]}, {frame['district'].iloc[i]}"
+                   for i in sample]
+        expected = [frame['artisan_id'].iloc[i] for i in sample]
+
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            model.semantic_search(query, 'en', K)
+            timings.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        results = []
+        for start in range(0, QUERIES, BATCH):
+            results.extend(model.semantic_search_batch(queries[start:start + BATCH], 'en', K))
+        batched = (time.perf_counter() - started) / QUERIES
+        recall = np.mean([want in {doc['artisan_id'] for doc in hits} for want, hits in zip(expected, results)])
+
+        ann = 'n/a'
+        if store.ann is not None:
+            vectors = model.embedder.encode(queries)
+            _, approx = store.search(vectors, K)
+            _, exact = store.search(vectors, K, exact=True)
+            ann = f"{np.mean([len(set(a) & set(e)) / K for a, e in zip(approx, exact)]):.3f}"
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model')
+            started = time.perf_counter()
+            model.save_model(path)
+            save = time.perf_counter() - started
+            loaded = MultilingualRAGModel()
+            started = time.perf_counter()
+            loaded.load_model(path)
+            load = time.perf_counter() - started
+            assert loaded.semantic_search(queries[0], 'en', K) == model.semantic_search(queries[0], 'en', K)
+
+        print(f"{rows:>8} {build:>8.2f} {recall:>9.3f} {ann:>6} {percentile_ms(timings, 50):>7.2f} "
+              f"{percentile_ms(timings, 95):>7.2f} {batched * 1e3:>10.3f} {save:>7.2f} {load * 1e3:>8.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,52 @@
+"""
+Build time, size and lookup latency of the precomputed similar-artisan table.
+
+Encodes synthetic artisan frames as :class:`backend.similar_index.ArtisanFeatures`,
+builds the :class:`~backend.similar_index.NeighbourTable` (every same-craft
+pair scored in blocks, top ``k`` kept per artisan) and times lookups through
+:class:`~backend.similar_index.SimilarIndex` with and without the table.
+
+Run from the ``flask-server`` directory::
+
+    python -m benchmarks.similar_neighbours [rows ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from backend.similar_index import ArtisanFeatures, NeighbourTable, SimilarIndex
+from benchmarks.filter_memory import synthetic_frame
+
+DEFAULT_SIZES = [20_000, 50_000, 100_000]
+LOOKUPS = 2000
+LIMIT = 10
+
+
+def lookup_us(index, rows, neighbours=None) -> float:
+    started = time.perf_counter()
+    for row in rows:
+        index.similar(row, LIMIT, neighbours)
+    return (time.perf_counter() - started) / len(rows) * 1e6
+
+
+def main(sizes):
+    print(f"{'rows':>8} {'features s':>10} {'table s':>8} {'table MB':>9} {'table us':>9} {'ranges us':>10}")
+    for rows in sizes:
+        frame = synthetic_frame(rows)
+        started = time.perf_counter()
+        features = ArtisanFeatures.from_frame(frame)
+        encode = time.perf_counter() - started
+        started = time.perf_counter()
+        table = NeighbourTable.build(features)
+        build = time.perf_counter() - started
+        index = SimilarIndex.from_frame(frame)
+        sample = np.random.default_rng(0).choice(rows, LOOKUPS)
+        size = (table.neighbours.nbytes + table.scores.nbytes) / 1e6
+        print(f"{rows:>8} {encode:>10.2f} {build:>8.2f} {size:>9.1f} {lookup_us(index, sample, table):>9.1f} "
+              f"{lookup_us(index, sample):>10.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,45 @@
+"""
+Gunicorn settings for serving any of the Flask backends from pre-forked workers.
+
+Run from the ``flask-server`` directory::
+
+    gunicorn -c gunicorn.conf.py app:app            # merged backend
+    gunicorn -c gunicorn.conf.py backend.app:app    # Gemini backend
+    gunicorn -c gunicorn.conf.py backend_app:app    # helpers backend
+
+The app is preloaded, so the master loads the dataset and builds its
+indexes and stats once and every worker shares them copy-on-write (see
+``backend/prefork.py``).  Adding workers adds request capacity, not copies
+of the data.  To pick up a changed ``Artisans.csv`` send the master
+``SIGHUP`` (``POST /admin/reload`` and the ``DATASET_WATCH_INTERVAL``
+watcher do the same): it rebuilds the data and replaces the workers.
+"""
+
+import os
+
+from backend import prefork
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", 4))
+# Threads keep SSE and export streams from tying up a whole worker
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+preload_app = True
+
+
+def when_ready(server):
+    prefork.mark_master()
+
+
+def pre_fork(server, worker):
+    # Keep the collector from touching (and so copying) the preloaded heap in the workers
+    prefork.freeze_heap()
+
+
+def on_reload(server):
+    # SIGHUP: rebuild the datasets here, then gunicorn forks fresh workers from this state
+    from backend.hot_reload import reload_all
+
+    prefork.unfreeze_heap()
+    reload_all()
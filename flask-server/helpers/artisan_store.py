@@ -0,0 +1,196 @@
+"""
+Column store for the helpers backend's artists.
+
+Every field is a column instead of a per-artisan object.
+
+* Ages and the phone flag are typed arrays.
+* Repeated strings (gender, craft, places, language lists, cluster codes)
+  are kept once per distinct value, and each row holds an int32 code into
+  that list.
+* Only the strings that differ per row (id, name, contact details,
+  government id) are Python lists.
+
+Filters and counts run on the code arrays for all rows at once. The nested
+dict the API returns is built by :meth:`ArtisanStore.record` only for the
+rows that are sent.
+"""
+
+import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.categorical import normalize_category
+
+# Columns with a different string on (almost) every row
+TEXT_COLUMNS = ("id", "name", "email", "phone", "government_id")
+# Columns with few distinct values, stored as codes into ``ArtisanStore.categories``
+CATEGORY_COLUMNS = ("gender", "craft_type", "state", "district", "village", "languages", "cluster_code")
+# Ages are int16; larger values are not real ages and load as unknown (0) like unparsable ones
+MAX_AGE = np.iinfo(np.int16).max
+
+
+def _languages(value: str) -> Tuple[str, ...]:
+    return tuple(lang.strip() for lang in value.split(",")) if value else ()
+
+
+class ArtisanStoreBuilder:
+    """Appends artist rows one at a time into growable typed arrays."""
+
+    def __init__(self):
+        self._text = {name: [] for name in TEXT_COLUMNS}
+        self._categories = {name: [] for name in CATEGORY_COLUMNS}
+        self._lookup = {name: {} for name in CATEGORY_COLUMNS}
+        self._codes = {name: array.array("i") for name in CATEGORY_COLUMNS}
+        self._ages = array.array("h")
+        self._phone_available = array.array("b")
+
+    def _code(self, column: str, value: str) -> int:
+        lookup = self._lookup[column]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self._categories[column])
+            self._categories[column].append(value)
+        return code
+
+    def append(self, values: Sequence[str]):
+        """Add one row given as the loader's column strings (``data_loader.SNAPSHOT_COLUMNS`` order)."""
+        (artisan_id, name, gender, age, craft_type, state, district, village, languages,
+         email, phone, phone_available, government_id, cluster_code) = values
+        text = self._text
+        text["id"].append(artisan_id)
+        text["name"].append(name)
+        text["email"].append(email)
+        text["phone"].append(phone)
+        text["government_id"].append(government_id)
+        for column, value in (("gender", gender), ("craft_type", craft_type), ("state", state),
+                              ("district", district), ("village", village), ("languages", languages),
+                              ("cluster_code", cluster_code)):
+            self._codes[column].append(self._code(column, value))
+        age = int(age) if age.isdigit() else 0
+        self._ages.append(age if age <= MAX_AGE else 0)
+        self._phone_available.append(phone_available.lower() == "yes")
+
+    def build(self) -> "ArtisanStore":
+        return ArtisanStore(
+            self._text,
+            {name: np.frombuffer(codes, dtype=np.intc).astype(np.int32, copy=False)
+             for name, codes in self._codes.items()},
+            self._categories,
+            np.frombuffer(self._ages, dtype=np.int16),
+            np.frombuffer(self._phone_available, dtype=np.int8).view(bool),
+        )
+
+
+class ArtisanStore:
+    """Artists as parallel columns, with bulk filters and counts over the code arrays."""
+
+    def __init__(self, text: Dict[str, List[str]], codes: Dict[str, np.ndarray], categories: Dict[str, List[str]],
+                 ages: np.ndarray, phone_available: np.ndarray):
+        self.text = text
+        self.codes = codes
+        self.categories = categories
+        self.ages = ages
+        self.phone_available = phone_available
+        self.language_lists = [_languages(value) for value in categories["languages"]]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[str]]) -> "ArtisanStore":
+        builder = ArtisanStoreBuilder()
+        for values in rows:
+            builder.append(values)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.ages)
+
+    # -- columns -------------------------------------------------------------
+
+    def column(self, name: str) -> List:
+        """One value per row, e.g. to build an index over the column."""
+        if name in self.text:
+            return self.text[name]
+        if name == "age":
+            return self.ages.tolist()
+        if name == "phone_available":
+            return self.phone_available.tolist()
+        if name == "languages":
+            return [self.language_lists[code] for code in self.codes[name].tolist()]
+        return np.asarray(self.categories[name], dtype=object)[self.codes[name]].tolist()
+
+    # -- filters -------------------------------------------------------------
+
+    def _codes_mask(self, column: str, codes: List[int]) -> np.ndarray:
+        row_codes = self.codes[column]
+        if len(codes) == 1:
+            return row_codes == codes[0]
+        return np.isin(row_codes, codes)
+
+    def equals_mask(self, column: str, value) -> np.ndarray:
+        """Rows whose ``column`` equals ``value``, ignoring case and surrounding spaces."""
+        wanted = normalize_category(value)
+        return self._codes_mask(column, [code for code, category in enumerate(self.categories[column])
+                                         if normalize_category(category) == wanted])
+
+    def contains_mask(self, column: str, text: str) -> np.ndarray:
+        """Rows whose ``column`` contains ``text`` (case-insensitive); tested once per distinct value."""
+        text = text.lower()
+        return self._codes_mask(column, [code for code, category in enumerate(self.categories[column])
+                                         if text in category.lower()])
+
+    def age_mask(self, age_min: Optional[int] = None, age_max: Optional[int] = None) -> np.ndarray:
+        """Rows with a known age in ``[age_min, age_max]``."""
+        mask = self.ages > 0
+        if age_min is not None:
+            mask &= self.ages >= age_min
+        if age_max is not None:
+            mask &= self.ages <= age_max
+        return mask
+
+    # -- aggregates ----------------------------------------------------------
+
+    def _counts(self, column: str, mask: Optional[np.ndarray]) -> np.ndarray:
+        codes = self.codes[column] if mask is None else self.codes[column][mask]
+        return np.bincount(codes, minlength=len(self.categories[column]))
+
+    def value_counts(self, column: str, mask: Optional[np.ndarray] = None, top: Optional[int] = None) -> Dict[str, int]:
+        """Rows per value of ``column`` in descending order, like ``Series.value_counts``."""
+        counts = self._counts(column, mask)
+        order = np.argsort(-counts, kind="stable")[:top]
+        categories = self.categories[column]
+        return {categories[code]: int(counts[code]) for code in order.tolist() if counts[code]}
+
+    def nunique(self, column: str, mask: Optional[np.ndarray] = None) -> int:
+        return int(np.count_nonzero(self._counts(column, mask)))
+
+    def count(self, mask: Optional[np.ndarray] = None) -> int:
+        return len(self) if mask is None else int(np.count_nonzero(mask))
+
+    # -- records -------------------------------------------------------------
+
+    def record(self, row: int) -> Dict:
+        """Row ``row`` in the shape the API returns."""
+        text, codes, categories = self.text, self.codes, self.categories
+        return {
+            "id": text["id"][row],
+            "name": text["name"][row],
+            "gender": categories["gender"][codes["gender"][row]],
+            "age": int(self.ages[row]),
+            "craft_type": categories["craft_type"][codes["craft_type"][row]],
+            "location": {
+                "state": categories["state"][codes["state"][row]],
+                "district": categories["district"][codes["district"][row]],
+                "village": categories["village"][codes["village"][row]],
+            },
+            "languages": list(self.language_lists[codes["languages"][row]]),
+            "contact": {
+                "email": text["email"][row],
+                "phone": text["phone"][row],
+                "phone_available": bool(self.phone_available[row]),
+            },
+            "government_id": text["government_id"][row],
+            "cluster_code": categories["cluster_code"][codes["cluster_code"][row]],
+        }
+
+    def records(self, rows: Iterable[int]) -> List[Dict]:
+        return [self.record(row) for row in rows]
@@ -6,7 +6,8 @@ def is_hindi(text):
 def handle_chat(body):
     message = body.get("message", "")
     conversation_history = body.get("conversation_history", [])
-    artists = load_artists_data()[:5]  # sample
+    store = load_artists_data()
+    artists = store.records(range(min(5, len(store))))  # sample
     response = {
         "intent": "general",
         "message": "This is where Hindi/English logic will go.",
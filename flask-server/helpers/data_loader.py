@@ -1,40 +1,177 @@
+"""
+Loading the artists of the helpers backend.
+
+Rows come from the columnar snapshot when a fresh one exists, otherwise from
+``Artisans.csv`` through ``csv.reader`` one row at a time, so quoted fields
+such as ``"Hindi, Bengali"`` stay whole and the file is never held in memory.
+Rows are appended straight into an :class:`~helpers.artisan_store.ArtisanStore`,
+which keeps them as typed columns rather than one object per artisan.
+Phone numbers are cleaned the way the snapshot's ``prepare_artisan_frame``
+cleans them, so both sources give the same records.
+"""
+
 import csv
+import logging
 import os
+import threading
+import time
+from typing import NamedTuple, Optional, Tuple
 
-_artists_cache = None
+import numpy as np
+import pandas as pd
 
-def load_artists_data():
-    global _artists_cache
-    if _artists_cache is not None:
-        return _artists_cache
+from backend.dataset import SNAPSHOT_SCHEMA, clean_phone_numbers, dataset_version
+from backend.hot_reload import SnapshotPublisher
+from backend.snapshot import load_columns
+from helpers.artisan_store import ArtisanStore, ArtisanStoreBuilder
+
+logger = logging.getLogger(__name__)
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), "..", "public", "Artisans.csv")
+
+SNAPSHOT_COLUMNS = [
+    "artisan_id", "name", "gender", "age", "craft_type", "state", "district", "village",
+    "languages_spoken", "contact_email", "contact_phone", "contact_phone_boolean",
+    "govt_artisan_id", "artisan_cluster_code",
+]
+# Older exports end before these; missing values load as ""
+OPTIONAL_COLUMNS = {"govt_artisan_id", "artisan_cluster_code"}
+
+
+class LoadReport(NamedTuple):
+    """How a load went: where the rows came from, how many were kept or skipped, and how fast."""
+    source: str
+    rows: int
+    skipped: int
+    seconds: float
+    bytes: int
 
-    csv_path = os.path.join(os.path.dirname(__file__), "..", "public", "Artisans.csv")
-    artists_data = []
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
 
+    def as_dict(self):
+        return {**self._asdict(), "seconds": round(self.seconds, 3),
+                "rows_per_second": round(self.rows_per_second)}
+
+    def log(self, csv_path):
+        # Skipped rows are data loss, so they are reported above the default INFO threshold
+        level = logging.WARNING if self.skipped else logging.INFO
+        logger.log(level, f"Loaded {self.rows} artists from {self.source} of {csv_path} in {self.seconds:.2f}s "
+                    f"({self.rows_per_second:,.0f} rows/s, {self.bytes / 1e6 / (self.seconds or 1):.1f} MB/s), "
+                    f"skipped {self.skipped} malformed rows")
+
+
+def _column_strings(column):
+    """Render a memory-mapped snapshot column as the strings the CSV would hold."""
+    if isinstance(column, tuple):
+        codes, categories = column
+        lookup = [str(c) for c in categories] + [""]
+        return [lookup[code] for code in codes.tolist()]
+    return ["" if v != v else str(int(v)) if float(v).is_integer() else str(v) for v in column.tolist()]
+
+
+def _phone_strings(values):
+    """
+    Phones as the snapshot stores them: ``clean_phone_numbers`` over the column
+    ``pd.read_csv`` would parse, numeric when every non-empty value is a number.
+    """
+    column = pd.Series(values, dtype=object).replace("", np.nan)
     try:
-        with open(csv_path, "r", encoding="utf-8") as f:
-            lines = f.read().splitlines()
-        headers = lines[0].split(",")
+        column = pd.to_numeric(column)
+    except (ValueError, TypeError):
+        pass
+    return clean_phone_numbers(column).tolist()
+
+
+def _load_from_snapshot(csv_path) -> Optional[ArtisanStore]:
+    """Build the artist store from a fresh columnar snapshot, or None if there is none."""
+    columns = load_columns(csv_path, SNAPSHOT_SCHEMA)
+    if columns is None or any(name not in columns for name in SNAPSHOT_COLUMNS):
+        return None
+    return ArtisanStore.from_rows(zip(*(_column_strings(columns[name]) for name in SNAPSHOT_COLUMNS)))
+
 
-        for line in lines[1:]:
-            values = line.split(",")
-            if len(values) < len(headers):
+def _parse_csv(csv_path) -> Tuple[ArtisanStore, int]:
+    """Stream ``csv_path`` into an artist store in one pass; returns it and the number of rows skipped."""
+    skipped = 0
+    builder = ArtisanStoreBuilder()
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader, [])]
+        missing = [name for name in SNAPSHOT_COLUMNS if name not in header and name not in OPTIONAL_COLUMNS]
+        if missing:
+            raise ValueError(f"missing columns {', '.join(missing)}")
+        positions = [header.index(name) if name in header else None for name in SNAPSHOT_COLUMNS]
+        required = max(p for name, p in zip(SNAPSHOT_COLUMNS, positions) if name not in OPTIONAL_COLUMNS) + 1
+
+        for row in reader:
+            if len(row) < required:
+                # Blank lines are not rows; anything else this short is a broken record
+                if any(row):
+                    skipped += 1
                 continue
-            artist = {
-                "id": values[0],
-                "name": values[1],
-                "gender": values[2],
-                "age": int(values[3]) if values[3].isdigit() else 0,
-                "craft_type": values[4],
-                "location": {"state": values[5], "district": values[6], "village": values[7]},
-                "languages": [lang.strip() for lang in values[8].split(",")] if values[8] else [],
-                "contact": {"email": values[9], "phone": values[10], "phone_available": values[11].lower() == "yes"},
-                "government_id": values[12] if len(values) > 12 else "",
-                "cluster_code": values[13] if len(values) > 13 else ""
-            }
-            artists_data.append(artist)
+            width = len(row)
+            builder.append([row[p] if p is not None and p < width else "" for p in positions])
+    artists = builder.build()
+    # Same strings whether the rows come from here or from a snapshot another backend wrote
+    artists.text["phone"] = _phone_strings(artists.text["phone"])
+    return artists, skipped
+
+
+def _read_artists(csv_path) -> Tuple[ArtisanStore, LoadReport]:
+    started = time.perf_counter()
+    try:
+        snapshot_data = _load_from_snapshot(csv_path)
     except Exception as e:
-        print(f"Error loading CSV: {e}")
+        logger.warning(f"Ignoring unreadable snapshot: {e}")
+        snapshot_data = None
+    if snapshot_data is not None:
+        return snapshot_data, LoadReport("snapshot", len(snapshot_data), 0, time.perf_counter() - started, 0)
+
+    artists_data, skipped = ArtisanStore.from_rows([]), 0
+    try:
+        artists_data, skipped = _parse_csv(csv_path)
+    except Exception as e:
+        logger.error(f"Error loading CSV: {e}")
+    size = os.path.getsize(csv_path) if os.path.exists(csv_path) else 0
+    return artists_data, LoadReport("csv", len(artists_data), skipped, time.perf_counter() - started, size)
+
 
-    _artists_cache = artists_data
-    return _artists_cache
+def _build_artists_snapshot():
+    # The index builders live next to the handlers, which import this module
+    from helpers.search_utils import build_bm25_index, build_sort_index
+    from helpers.similar_utils import build_neighbours, build_similar_index
+
+    artists, report = _read_artists(CSV_PATH)
+    report.log(CSV_PATH)
+    # Indexes are built here rather than on first use, so a pre-fork master builds them
+    # once and every worker shares them
+    return {
+        "artists": artists,
+        "load_report": report,
+        "sort_index": build_sort_index(artists, dataset_version(CSV_PATH) if os.path.exists(CSV_PATH) else ""),
+        "bm25_index": build_bm25_index(artists),
+        "similar_index": build_similar_index(artists),
+        "neighbours": build_neighbours(artists),
+    }
+
+
+# Artists and their indexes live in one snapshot; a reload builds the next one
+# and swaps it in while requests finish on the old one
+artists_dataset = SnapshotPublisher(_build_artists_snapshot, CSV_PATH, name="artists",
+                                    describe=lambda snapshot: {"load_report": snapshot.load_report.as_dict()})
+_load_lock = threading.Lock()
+
+
+def artists_snapshot():
+    """The artists snapshot of the current request, loaded on first use."""
+    if artists_dataset.current is None:
+        with _load_lock:
+            if artists_dataset.current is None:
+                artists_dataset.load()
+    return artists_dataset.view()
+
+
+def load_artists_data():
+    return artists_snapshot().artists
@@ -1,14 +1,56 @@
-from helpers.data_loader import load_artists_data
+from backend.bm25 import BM25Index
+from backend.pagination import SortIndex, paginate
+from backend.search_index import FIELD_WEIGHTS
+from helpers.data_loader import artists_snapshot
+
+def build_sort_index(store, version=""):
+    """Sort permutations over the store's artists (built with each snapshot); ``version`` pins its cursors."""
+    return SortIndex.from_columns({
+        "name": store.column("name"),
+        "age": store.ages,
+        "state": store.column("state"),
+        "craft": store.column("craft_type"),
+    }, len(store), version)
+
+
+def build_bm25_index(store):
+    """BM25 weights over the store artists' text fields (built with each snapshot)."""
+    weights = {group: weight for group, _, weight in FIELD_WEIGHTS}
+    places = zip(store.column("state"), store.column("district"), store.column("village"))
+    return BM25Index.from_fields([
+        (store.column("name"), weights["name"]),
+        (store.column("craft_type"), weights["craft"]),
+        ([" ".join(place) for place in places], weights["location"]),
+        ([" ".join(languages) for languages in store.column("languages")], weights["language"]),
+    ], len(store))
+
 
 def apply_filters(filters):
-    df = load_artists_data()
-    results = df
+    snapshot = artists_snapshot()
+    store = snapshot.artists
+    mask = None
 
-    # Example: filter by craft_type
+    # Example: filter by craft_type (matched once per distinct craft, then on the code array)
     craft = filters.get("craft_type")
     if craft:
-        results = [a for a in results if craft.lower() in a["craft_type"].lower()]
+        mask = store.contains_mask("craft_type", craft)
+
+    # Free-text query: keep matching rows, ranked by BM25 unless another sort is asked for
+    ranked = None
+    if filters.get("query"):
+        ranked = snapshot.bm25_index.ranked([str(filters["query"])], mask)
+        mask = ranked.mask
 
-    # Limit results
-    limit = filters.get("limit", 20)
-    return {"artists": results[:limit], "total": len(results)}
+    # Page through the precomputed sort order (limit/offset or cursor)
+    try:
+        page = paginate(snapshot.sort_index, mask, filters, ranked=ranked)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return {
+        "artists": store.records(page["rows"]),
+        "total": page["total"],
+        "limit": page["limit"],
+        "offset": page["offset"],
+        "has_more": page["has_more"],
+        "next_cursor": page["next_cursor"],
+    }
@@ -1,17 +1,44 @@
-from helpers.data_loader import load_artists_data
+from backend.similar_index import MATCH_LEVELS, ArtisanFeatures, NeighbourTable, SimilarIndex
+from helpers.data_loader import artists_snapshot
+
+
+def build_similar_index(store):
+    """Id and (craft, state, district) indexes over the store's artists (built with each snapshot)."""
+    return SimilarIndex(
+        store.column("id"),
+        store.column("craft_type"),
+        store.column("state"),
+        store.column("district"),
+    )
+
+
+def build_neighbours(store):
+    """Top-k feature-vector neighbours of every artist (None when disabled), built with each snapshot."""
+    return NeighbourTable.from_env(ArtisanFeatures.from_columns(
+        store.column("craft_type"),
+        store.column("state"),
+        store.column("district"),
+        store.ages,
+        store.column("languages"),
+        store.column("cluster_code"),
+    ))
+
 
 def find_similar(args):
     artist_id = args.get("artistId")
     limit = int(args.get("limit", 5))
-    data = load_artists_data()
-
-    target = None
-    for a in data:
-        if str(a["id"]) == str(artist_id):
-            target = a
-            break
-    if not target:
+    snapshot = artists_snapshot()
+    store = snapshot.artists
+    index = snapshot.similar_index
+
+    row = index.row(artist_id)
+    if row is None:
         return {"error": "Artist not found"}, 404
 
-    similar = [a for a in data if a["craft_type"] == target["craft_type"] and a["id"] != target["id"]]
-    return {"similar_artists": similar[:limit], "total_found": len(similar), "target_artist": target}
+    # Same craft as before, ranked by the precomputed feature-vector neighbours
+    similar = index.similar(row, limit, snapshot.neighbours)
+    similar_artists = [
+        {**store.record(i), "match_level": MATCH_LEVELS[level][0], "similarity_score": score}
+        for i, level, score in zip(similar.rows.tolist(), similar.levels.tolist(), similar.scores.tolist())
+    ]
+    return {"similar_artists": similar_artists, "total_found": similar.total, "target_artist": store.record(row)}
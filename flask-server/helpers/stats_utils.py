@@ -1,15 +1,12 @@
-from helpers.data_loader import load_artists_data
+from helpers.data_loader import artists_snapshot
 
 def get_stats():
-    data = load_artists_data()
-    total = len(data)
-    crafts = len(set(a["craft_type"] for a in data))
-    states = len(set(a["location"]["state"] for a in data))
-    districts = len(set(a["location"]["district"] for a in data))
+    # Counted over the store's code arrays; nothing to precompute per snapshot
+    store = artists_snapshot().artists
     return {
-        "total_artists": total,
-        "unique_crafts": crafts,
-        "unique_states": states,
-        "unique_districts": districts,
+        "total_artists": store.count(),
+        "unique_crafts": store.nunique("craft_type"),
+        "unique_states": store.nunique("state"),
+        "unique_districts": store.nunique("district"),
         "status": "online"
     }
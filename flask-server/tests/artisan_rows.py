@@ -0,0 +1,23 @@
+"""A small artisan table shared by the endpoint tests."""
+
+import pandas as pd
+
+COLUMNS = ['artisan_id', 'name', 'gender', 'age', 'craft_type', 'state', 'district', 'village',
+           'languages_spoken', 'contact_email', 'contact_phone', 'contact_phone_boolean',
+           'govt_artisan_id', 'artisan_cluster_code']
+# Phones are written as numbers with gaps, so pandas reads them back as floats ('9000000001.0')
+ROWS = [
+    ['ART1', 'Asha Devi', 'Female', 34, 'Pottery', 'Bihar', 'Patna', 'Village1', 'Hindi', 'a@x.in', 9000000001, 'Yes', 'G1', 'CL-PAT1'],
+    ['ART2', 'Ravi Kumar', 'Male', 51, 'Pottery', 'Bihar', 'Gaya', 'Village2', 'Hindi, Maithili', 'r@x.in', None, 'No', 'G2', 'CL-GAY1'],
+    ['ART3', 'Meena Nair', 'Female', 29, 'Weaving', 'Kerala', 'Kochi', 'Village3', 'Malayalam', 'm@x.in', 9000000003, 'Yes', 'G3', 'CL-KOC1'],
+    ['ART4', 'Sunil Das', 'Male', 44, 'Madhubani Painting', 'Bihar', 'Madhubani', 'Village4', 'Maithili', 's@x.in', None, 'No', 'G4', 'CL-MAD1'],
+]
+
+
+def artisan_frame() -> pd.DataFrame:
+    return pd.DataFrame(ROWS, columns=COLUMNS)
+
+
+def write_artisans_csv(path) -> str:
+    artisan_frame().to_csv(path, index=False)
+    return str(path)
@@ -0,0 +1,42 @@
+import importlib
+import os
+
+import pytest
+
+from backend.stub_llm import serve_in_background
+from tests.artisan_rows import write_artisans_csv
+
+
+def stop(server):
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope='session')
+def llm_stub():
+    stub = serve_in_background()
+    yield stub
+    stop(stub)
+
+
+@pytest.fixture(scope='session')
+def backend_app(tmp_path_factory, llm_stub):
+    """backend.app serving the shared artisan rows, with its LLM calls going to a local stub."""
+    root = tmp_path_factory.mktemp('backend')
+    os.makedirs(root / 'public')
+    write_artisans_csv(root / 'public' / 'Artisans.csv')
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(root)
+        mp.setenv('LLM_STUB_URL', f"http://127.0.0.1:{llm_stub.server_port}")
+        mp.delenv('GOOGLE_API_KEY', raising=False)
+        yield importlib.import_module('backend.app')
+
+
+@pytest.fixture(scope='session')
+def merged_app(tmp_path_factory):
+    """The merged app.py backend serving the shared artisan rows."""
+    root = tmp_path_factory.mktemp('merged')
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(root)
+        mp.setenv('CSV_PATH', write_artisans_csv(root / 'Artisans.csv'))
+        yield importlib.import_module('app')
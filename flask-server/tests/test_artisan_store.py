@@ -0,0 +1,97 @@
+from collections import Counter
+
+import pytest
+
+from helpers import data_loader
+
+HEADER = ('artisan_id,name,gender,age,craft_type,state,district,village,languages_spoken,'
+          'contact_email,contact_phone,contact_phone_boolean,govt_artisan_id,artisan_cluster_code')
+STATES = {'Bihar': ['Patna', 'Gaya'], 'Kerala': ['Kochi'], 'Uttar Pradesh': ['Varanasi', 'Lucknow']}
+CRAFTS = ['Pottery', 'Handloom Weaving', 'Madhubani Painting']
+LANGUAGES = ['Hindi', 'Malayalam', 'Maithili', '']
+AGES = ['34', '', '51', 'unknown', '29', '99999', '44']
+
+
+def rows(n=300):
+    lines = []
+    for i in range(n):
+        state = list(STATES)[i % len(STATES)]
+        district = STATES[state][i % len(STATES[state])]
+        lines.append(','.join([
+            f"ART{i:04d}", f"Artisan {i}", ['Male', 'Female'][i % 2], AGES[i % len(AGES)],
+            CRAFTS[i % len(CRAFTS)], state, district, f"Village{i % 11}", LANGUAGES[i % len(LANGUAGES)],
+            f"a{i}@x.in", f"9{i:09d}" if i % 3 else '', 'Yes' if i % 3 else 'No', f"GOV{i:04d}", f"CL-{i % 5}",
+        ]))
+    return lines
+
+
+def legacy_load(path):
+    """The dict loader the helpers backend started from (no quoted fields)."""
+    artists = []
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    headers = lines[0].split(',')
+    for line in lines[1:]:
+        values = line.split(',')
+        if len(values) < len(headers):
+            continue
+        artists.append({
+            'id': values[0],
+            'name': values[1],
+            'gender': values[2],
+            'age': int(values[3]) if values[3].isdigit() else 0,
+            'craft_type': values[4],
+            'location': {'state': values[5], 'district': values[6], 'village': values[7]},
+            'languages': [lang.strip() for lang in values[8].split(',')] if values[8] else [],
+            'contact': {'email': values[9], 'phone': values[10], 'phone_available': values[11].lower() == 'yes'},
+            'government_id': values[12] if len(values) > 12 else '',
+            'cluster_code': values[13] if len(values) > 13 else '',
+        })
+    return artists
+
+
+@pytest.fixture(scope='module')
+def loaded(tmp_path_factory):
+    path = tmp_path_factory.mktemp('store') / 'Artisans.csv'
+    path.write_text('\n'.join([HEADER] + rows() + ['ART9999,short row']) + '\n', encoding='utf-8')
+    store, skipped = data_loader._parse_csv(str(path))
+    return store, skipped, legacy_load(str(path))
+
+
+def test_records_match_the_legacy_loader(loaded):
+    store, skipped, legacy = loaded
+    # The store keeps ages as int16; larger values are not real ages and load as unknown (0)
+    legacy = [dict(artist, age=artist['age'] if artist['age'] <= 32767 else 0) for artist in legacy]
+    assert skipped == 1 and len(store) == len(legacy)
+    assert store.records(range(len(store))) == legacy
+
+
+def test_filters_match_list_comprehensions(loaded):
+    store, _, legacy = loaded
+    rows_of = lambda mask: mask.nonzero()[0].tolist()
+    assert rows_of(store.equals_mask('state', ' bihar ')) == [
+        i for i, a in enumerate(legacy) if a['location']['state'].lower() == 'bihar']
+    assert rows_of(store.contains_mask('craft_type', 'WEAV')) == [
+        i for i, a in enumerate(legacy) if 'weav' in a['craft_type'].lower()]
+    assert rows_of(store.age_mask(30, 50)) == [i for i, a in enumerate(legacy) if 30 <= a['age'] <= 50]
+
+
+def test_counts_match_counters(loaded):
+    store, _, legacy = loaded
+    crafts = Counter(a['craft_type'] for a in legacy)
+    assert store.value_counts('craft_type') == dict(crafts.most_common())
+    assert store.value_counts('state', top=1) == dict(Counter(a['location']['state'] for a in legacy).most_common(1))
+    assert store.nunique('district') == len({a['location']['district'] for a in legacy})
+    bihar = store.equals_mask('state', 'Bihar')
+    assert store.count(bihar) == sum(a['location']['state'] == 'Bihar' for a in legacy)
+    assert store.value_counts('gender', bihar) == dict(
+        Counter(a['gender'] for a in legacy if a['location']['state'] == 'Bihar').most_common())
+
+
+def test_quoted_languages_stay_whole(tmp_path):
+    path = tmp_path / 'Artisans.csv'
+    path.write_text(HEADER + '\nART1,Asha,Female,34,Pottery,Bihar,Patna,V1,"Hindi, Maithili",a@x.in,,No,G1,CL1\n',
+                    encoding='utf-8')
+    store, _ = data_loader._parse_csv(str(path))
+    assert store.record(0)['languages'] == ['Hindi', 'Maithili']
+    assert store.record(0)['location']['village'] == 'V1'
@@ -0,0 +1,78 @@
+import json
+import time
+
+from backend.dataset import prepare_artisan_frame
+from backend.llm_dispatch import LLMDispatcher
+from backend.model_clients import ModelClientManager, stub_factory
+from backend.rag_app import ArtisanRAG
+from backend.response_cache import ResponseCache
+from backend.sse import answer_events
+from backend.stub_llm import serve_in_background
+from tests.artisan_rows import artisan_frame
+
+
+def sse_events(body: str):
+    """``(event, data)`` pairs of an SSE body."""
+    events = []
+    for frame in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in frame.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def stop(server):
+    server.shutdown()
+    server.server_close()
+
+
+def rag_with(stub, deadline=5.0):
+    manager = ModelClientManager(['gemini-pro'], stub_factory(f"http://127.0.0.1:{stub.server_port}"))
+    frame = prepare_artisan_frame(artisan_frame())
+    return ArtisanRAG(None, artisan_df=frame, model_clients=manager, dispatcher=LLMDispatcher(deadline=deadline),
+                      response_cache=ResponseCache(max_entries=8))
+
+
+def test_stream_sends_retrieved_context_then_tokens(backend_app, llm_stub):
+    module, stub = backend_app, llm_stub
+    query = 'pottery artisans in Bihar'
+    calls = stub.calls
+    response = module.app.test_client().post('/api/chat/stream', json={'message': query})
+    assert response.mimetype == 'text/event-stream'
+    events = sse_events(response.get_data(as_text=True))
+
+    names = [event for event, _ in events]
+    assert names[0] == 'meta' and names[-1] == 'done'
+    assert set(names[1:-1]) == {'token'} and len(names) > 2
+    # The artisans shown first are the context the model answered from
+    context = module.dataset.view().rag.retrieve_context(query)['search_results']
+    assert events[0][1]['artists'] == context
+    assert events[-1][1]['text'] == ''.join(data['text'] for event, data in events if event == 'token')
+    assert events[-1][1]['text'].startswith('[')
+    assert stub.calls == calls + 1
+
+
+def test_failing_model_falls_back_to_database_answer():
+    stub = serve_in_background(failing=['gemini-pro'])
+    try:
+        rag = rag_with(stub)
+        text = ''.join(rag.stream_response('pottery in Bihar'))
+    finally:
+        stop(stub)
+    assert 'Asha Devi' in text and 'Ravi Kumar' in text
+
+
+def test_stalled_model_falls_back_at_the_deadline():
+    stub = serve_in_background(latency=2.0)
+    try:
+        rag = rag_with(stub, deadline=0.2)
+        query = 'pottery in Bihar'
+        retrieved = rag.retrieve_context(query)
+        started = time.monotonic()
+        events = sse_events(''.join(answer_events({'artists': retrieved['search_results']},
+                                                  rag.stream_response(query, retrieved=retrieved))))
+        elapsed = time.monotonic() - started
+    finally:
+        stop(stub)
+    assert elapsed < 1.5
+    assert [event for event, _ in events] == ['meta', 'token', 'done']
+    assert 'Asha Devi' in events[-1][1]['text']
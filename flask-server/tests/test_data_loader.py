@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from backend.dataset import load_artisan_frame
+from backend.snapshot import snapshot_path
+from helpers import data_loader
+
+HEADER = ('artisan_id,name,gender,age,craft_type,state,district,village,languages_spoken,'
+          'contact_email,contact_phone,contact_phone_boolean,govt_artisan_id,artisan_cluster_code')
+NUMERIC_PHONES = [
+    'A1,Asha Devi,Female,34,Pottery,Bihar,Patna,Village1,"Hindi, Maithili",a@x.in,9.10700E+11,Yes,G1,CL-PAT1',
+    'A2,Ravi Kumar,Male,,Pottery,Bihar,Gaya,Village2,Hindi,r@x.in,,No,G2,CL-GAY1',
+    'A3,Meena Nair,Female,29,Weaving,Kerala,Kochi,Village3,Malayalam,m@x.in,9000000001,Yes,G3,',
+]
+MIXED_PHONES = NUMERIC_PHONES + [
+    'A4,Sunil Das,Male,44,Madhubani Painting,Bihar,Madhubani,Village4,Maithili,s@x.in,not given,No,G4,CL-MAD1',
+]
+
+
+def write_csv(tmp_path, lines):
+    path = tmp_path / 'Artisans.csv'
+    path.write_text('\n'.join([HEADER] + lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('lines', [NUMERIC_PHONES, MIXED_PHONES], ids=['numeric', 'mixed'])
+def test_csv_and_snapshot_give_the_same_records(tmp_path, lines):
+    csv_path = write_csv(tmp_path, lines)
+    from_csv, skipped = data_loader._parse_csv(csv_path)
+    load_artisan_frame(csv_path)  # writes the snapshot, as another backend would
+    from_snapshot = data_loader._load_from_snapshot(csv_path)
+
+    assert skipped == 0 and from_snapshot is not None
+    assert from_csv.records(range(len(from_csv))) == from_snapshot.records(range(len(from_snapshot)))
+
+
+def test_phones_are_cleaned_to_digits(tmp_path):
+    artists, _ = data_loader._parse_csv(write_csv(tmp_path, MIXED_PHONES))
+    assert artists.column('phone') == ['', '', '9000000001', '']
+    artists, _ = data_loader._parse_csv(write_csv(tmp_path, NUMERIC_PHONES))
+    assert artists.column('phone') == ['910700000000', '', '9000000001']
+
+
+def test_broken_rows_are_skipped_and_reported(tmp_path):
+    _, report = data_loader._read_artists(write_csv(tmp_path, NUMERIC_PHONES + ['A9,broken row']))
+    assert (report.source, report.rows, report.skipped) == ('csv', 3, 1)
+
+
+def test_fresh_snapshot_is_preferred(tmp_path):
+    csv_path = write_csv(tmp_path, NUMERIC_PHONES)
+    load_artisan_frame(csv_path)
+    assert os.path.isdir(snapshot_path(csv_path))
+    _, report = data_loader._read_artists(csv_path)
+    assert (report.source, report.rows, report.skipped) == ('snapshot', 3, 0)
@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+
+from backend.model_clients import ModelClientManager, StubLLMClient, stub_factory
+from backend.stub_llm import serve_in_background
+
+
+@pytest.fixture
+def stub():
+    server = serve_in_background(failing=['broken'])
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server):
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def counting_factory(base_url):
+    created = []
+
+    def create(model_name):
+        created.append(model_name)
+        return StubLLMClient(base_url, model_name)
+
+    return create, created
+
+
+def test_clients_are_created_lazily_and_reused(stub):
+    factory, created = counting_factory(url(stub))
+    manager = ModelClientManager(['fast'], factory, pool_size=2)
+    assert created == [] and stub.calls == 0
+
+    for _ in range(5):
+        assert manager.generate_content("hi").text.startswith("[fast]")
+    assert created == ['fast']
+    assert stub.calls == 5
+
+
+def test_pool_bounds_concurrent_clients(stub):
+    factory, created = counting_factory(url(stub))
+    manager = ModelClientManager(['fast'], factory, pool_size=2)
+    leased = threading.Barrier(3)  # both holders and this thread
+    release = threading.Event()
+
+    def hold():
+        with manager.lease('fast'):
+            leased.wait()
+            release.wait()
+
+    holders = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in holders:
+        thread.start()
+    leased.wait()
+    # Both slots are taken, so a third lease times out instead of creating a client
+    manager.acquire_timeout = 0.05
+    with pytest.raises(TimeoutError):
+        with manager.lease('fast'):
+            pass
+    release.set()
+    for thread in holders:
+        thread.join()
+    assert created == ['fast', 'fast']
+
+
+def test_falls_back_and_ranks_failing_model_last(stub):
+    manager = ModelClientManager(['broken', 'fast'], stub_factory(url(stub)))
+    assert manager.generate_content("hi").text.startswith("[fast]")
+
+    assert manager.ranked_models() == ['fast', 'broken']
+    stats = manager.stats()['models']
+    assert stats['broken']['failures'] == 1 and stats['broken']['last_error']
+    assert stats['fast']['successes'] == 1
+
+
+def test_ranks_by_latency():
+    slow = serve_in_background(latency=0.2)
+    fast = serve_in_background()
+    try:
+        servers = {'slow': slow, 'fast': fast}
+        manager = ModelClientManager(['slow', 'fast'],
+                                     lambda name: StubLLMClient(url(servers[name]), name))
+        manager.call('slow', "hi")
+        manager.call('fast', "hi")
+        assert manager.ranked_models() == ['fast', 'slow']
+    finally:
+        for server in (slow, fast):
+            server.shutdown()
+            server.server_close()
+
+
+def test_all_models_failing_raises(stub):
+    manager = ModelClientManager(['broken'], stub_factory(url(stub)))
+    with pytest.raises(RuntimeError, match="All models failed"):
+        manager.generate_content("hi")
+
+
+def test_stream_falls_back_before_first_chunk(stub):
+    manager = ModelClientManager(['broken', 'fast'], stub_factory(url(stub)))
+    text = ''.join(manager.stream_text("hi"))
+    assert text.startswith("[fast]")
+    assert manager.ranked_models()[0] == 'fast'
+
+
+def test_probe_is_off_by_default(stub, monkeypatch):
+    monkeypatch.delenv('LLM_PROBE_INTERVAL', raising=False)
+    monkeypatch.setenv('LLM_STUB_URL', url(stub))
+    manager = ModelClientManager.from_env()
+    manager.start_health_probe()
+    assert manager.probe_interval == 0
+    assert manager._probe_thread is None
+    assert stub.calls == 0
+
+
+def test_probe_is_not_restarted_after_fork(stub):
+    manager = ModelClientManager(['fast'], stub_factory(url(stub)), probe_interval=60)
+    manager._after_fork()
+    manager.start_health_probe()
+    assert manager._probe_thread is None
+    assert stub.calls == 0
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from backend.pagination import MAX_LIMIT, SortIndex, decode_cursor, encode_cursor, filters_fingerprint, paginate
+
+N = 500
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(3)
+    names = [f"name{i:03d}" for i in rng.integers(0, 120, N)]
+    ages = rng.integers(18, 90, N).astype(float)
+    ages[rng.random(N) < 0.1] = np.nan
+    return {'name': names, 'age': ages}
+
+
+def sort_index(data, version='v1'):
+    return SortIndex.from_columns(data, N, version)
+
+
+def walk(index, mask, params, ranked=None):
+    """Every row of every page, following next_cursor."""
+    rows, page = [], paginate(index, mask, params, ranked=ranked)
+    while True:
+        rows += page['rows'].tolist()
+        if not page['next_cursor']:
+            return rows, page['total']
+        page = paginate(index, mask, {**params, 'cursor': page['next_cursor']}, ranked=ranked)
+
+
+@pytest.mark.parametrize('sort_by,order', [('name', 'asc'), ('age', 'desc'), (None, 'asc')])
+@pytest.mark.parametrize('filtered', [False, True])
+def test_cursor_walk_visits_every_match_once_in_order(data, sort_by, order, filtered):
+    index = sort_index(data)
+    mask = (np.arange(N) % 3 == 0) if filtered else None
+    params = {'state': 'x' if filtered else None, 'sort_by': sort_by, 'sort_order': order, 'limit': 7}
+    rows, total = walk(index, mask, params)
+
+    expected = [row for row in index.permutation(sort_by, order).tolist() if mask is None or mask[row]]
+    assert rows == expected and total == len(expected)
+
+
+def test_offset_pages_match_the_cursor_walk(data):
+    index = sort_index(data)
+    mask = np.arange(N) % 2 == 0
+    params = {'state': 'even', 'sort_by': 'name', 'limit': 10}
+    rows, _ = walk(index, mask, params)
+    for offset in (0, 10, 35, 240, 260):
+        page = paginate(index, mask, {**params, 'offset': offset})
+        assert page['rows'].tolist() == rows[offset:offset + 10]
+        assert page['has_more'] == (offset + 10 < len(rows))
+
+
+def test_cursor_is_rejected_for_other_filters_or_data(data):
+    index = sort_index(data)
+    cursor = paginate(index, None, {'sort_by': 'age', 'limit': 5})['next_cursor']
+    with pytest.raises(ValueError):
+        paginate(index, np.ones(N, dtype=bool), {'state': 'Bihar', 'cursor': cursor})
+    # Same number of rows, different data: the version differs, so the cursor is stale
+    with pytest.raises(ValueError):
+        paginate(sort_index(data, version='v2'), None, {'cursor': cursor})
+    with pytest.raises(ValueError):
+        paginate(index, None, {'cursor': 'not-a-cursor'})
+
+
+def test_cursor_round_trip():
+    fingerprint = filters_fingerprint({'state': 'Bihar', 'limit': 5})
+    token = encode_cursor('name', 'desc', 42, fingerprint, 'v1')
+    assert decode_cursor(token, fingerprint, 'v1') == {'sort_by': 'name', 'sort_order': 'desc', 'position': 42}
+
+
+def test_limit_is_capped(data):
+    big = {key: list(values) * 5 for key, values in data.items()}
+    index = SortIndex.from_columns(big, 5 * N)
+    page = paginate(index, None, {'limit': 10 * N})
+    assert page['limit'] == MAX_LIMIT and len(page['rows']) == MAX_LIMIT and page['has_more']
+
+
+class Ranked:
+    """Relevance-ordered matches, as ``BM25Index.ranked`` returns them."""
+
+    def __init__(self, rows):
+        self.rows = np.asarray(rows, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def head(self, n):
+        return self.rows[:n]
+
+
+def test_relevance_pages_follow_the_ranking(data):
+    ranked = Ranked([42, 7, 300, 5, 99])
+    mask = np.isin(np.arange(N), ranked.rows)
+    rows, total = walk(sort_index(data), mask, {'query': 'pottery', 'limit': 2}, ranked)
+    assert rows == [42, 7, 300, 5, 99] and total == 5
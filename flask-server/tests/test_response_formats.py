@@ -0,0 +1,27 @@
+"""
+Response formats that changed when every backend started loading through
+``prepare_artisan_frame``: phones are digit strings ('' when missing) and
+``contact_phone_boolean`` keeps its Yes/No value.
+"""
+
+from backend.dataset import prepare_artisan_frame
+from tests.artisan_rows import artisan_frame
+
+
+def test_prepare_cleans_phones_and_keeps_phone_flags():
+    frame = prepare_artisan_frame(artisan_frame().astype({'contact_phone': float}))
+    assert frame['contact_phone'].tolist() == ['9000000001', '', '9000000003', '']
+    assert frame['contact_phone_boolean'].astype(str).tolist() == ['Yes', 'No', 'Yes', 'No']
+
+
+def test_backend_search_reports_phone_flags(backend_app):
+    response = backend_app.app.test_client().post('/api/search', json={'query': 'pottery'})
+    artists = {artist['artisan_id']: artist for artist in response.get_json()['artists']}
+    assert (artists['ART1']['phone'], artists['ART1']['phone_available']) == ('9000000001', 'Yes')
+    assert (artists['ART2']['phone'], artists['ART2']['phone_available']) == ('', 'No')
+
+
+def test_merged_search_returns_clean_phone_strings(merged_app):
+    response = merged_app.app.test_client().post('/search', json={'sort_by': 'name'})
+    phones = {artist['artisan_id']: artist['contact_phone'] for artist in response.get_json()['artists']}
+    assert phones == {'ART1': '9000000001', 'ART2': '', 'ART3': '9000000003', 'ART4': ''}
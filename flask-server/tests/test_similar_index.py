@@ -0,0 +1,35 @@
+import numpy as np
+
+from backend.similar_index import ArtisanFeatures, NeighbourTable, SimilarIndex
+
+CRAFTS = ['Pottery'] * 9 + ['Weaving']
+STATES = ['Bihar'] * 6 + ['Kerala'] * 3 + ['Bihar']
+DISTRICTS = ['Patna', 'Patna', 'Gaya', 'Gaya', 'Patna', 'Gaya', 'Kochi', 'Kochi', 'Kochi', 'Patna']
+AGES = [34, 51, 29, 44, 38, 60, 25, 47, 33, 40]
+LANGUAGES = [('Hindi',)] * 6 + [('Malayalam',)] * 3 + [('Hindi',)]
+CLUSTERS = ['CL1', 'CL1', 'CL2', 'CL2', 'CL1', 'CL2', 'CL3', 'CL3', 'CL3', 'CL1']
+
+
+def build(k):
+    index = SimilarIndex([f"A{i}" for i in range(len(CRAFTS))], CRAFTS, STATES, DISTRICTS)
+    table = NeighbourTable.build(ArtisanFeatures.from_columns(CRAFTS, STATES, DISTRICTS, AGES, LANGUAGES, CLUSTERS), k)
+    return index, table
+
+
+def test_limit_past_k_continues_with_locality_ranges():
+    index, table = build(k=2)
+    similar = index.similar(0, 50, table)
+    rows = similar.rows.tolist()
+
+    assert similar.total == 8
+    assert len(rows) == 8 and len(set(rows)) == 8 and 0 not in rows
+    assert rows[:2] == index.similar(0, 2, table).rows.tolist()
+    # Past the table: the rest of the district, then the state, then the craft
+    assert similar.levels.tolist()[2:] == sorted(similar.levels.tolist()[2:])
+    assert np.all(np.diff(similar.scores) <= 0)
+
+
+def test_limit_within_k_is_served_from_the_table():
+    index, table = build(k=4)
+    similar = index.similar(0, 3, table)
+    assert similar.rows.tolist() == table.neighbours[0, :3].tolist()
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+from backend.categorical import CATEGORICAL_COLUMNS
+from backend.dataset import SNAPSHOT_SCHEMA, load_artisan_frame, prepare_artisan_frame
+from backend.snapshot import is_fresh, read_manifest, read_snapshot, snapshot_path, write_snapshot
+from tests.artisan_rows import artisan_frame, write_artisans_csv
+
+
+def frame_with_text():
+    """The shared rows plus non-ASCII, empty and long free text."""
+    frame = artisan_frame()
+    frame.loc[0, 'name'] = 'आशा देवी'
+    frame.loc[1, 'village'] = None
+    frame.loc[2, 'languages_spoken'] = ', '.join(['Malayalam'] * 200)
+    return frame
+
+
+def memory_owner(array):
+    while array.base is not None and not isinstance(array, np.memmap):
+        array = array.base
+    return array
+
+
+def test_round_trip_matches_the_prepared_frame(tmp_path):
+    csv_path = str(tmp_path / 'Artisans.csv')
+    frame_with_text().to_csv(csv_path, index=False)
+    prepared = prepare_artisan_frame(pd.read_csv(csv_path))
+    write_snapshot(prepared, csv_path, SNAPSHOT_SCHEMA)
+
+    loaded = read_snapshot(csv_path, SNAPSHOT_SCHEMA, categorical=CATEGORICAL_COLUMNS)
+    pdt.assert_frame_equal(loaded, prepared, check_dtype=False, check_categorical=False)
+    for column in CATEGORICAL_COLUMNS:
+        assert isinstance(loaded[column].dtype, pd.CategoricalDtype)
+    assert loaded.loc[0, 'name'] == 'आशा देवी' and pd.isna(loaded.loc[1, 'village'])
+    # Numeric columns stay on the memory-mapped files
+    assert isinstance(memory_owner(loaded['age'].to_numpy()), np.memmap)
+
+
+def test_load_writes_then_reuses_the_snapshot(tmp_path):
+    csv_path = write_artisans_csv(tmp_path / 'Artisans.csv')
+    first = load_artisan_frame(csv_path)
+    assert is_fresh(read_manifest(csv_path), csv_path, SNAPSHOT_SCHEMA)
+    pdt.assert_frame_equal(load_artisan_frame(csv_path), first, check_dtype=False, check_categorical=False)
+
+
+def test_changed_csv_or_schema_makes_the_snapshot_stale(tmp_path):
+    csv_path = write_artisans_csv(tmp_path / 'Artisans.csv')
+    load_artisan_frame(csv_path)
+    assert read_snapshot(csv_path, 'other-schema') is None
+
+    with open(csv_path, 'a', encoding='utf-8') as f:
+        f.write('ART5,Lata Bai,Female,61,Pottery,Bihar,Patna,Village5,Hindi,l@x.in,,No,G5,CL-PAT1\n')
+    assert read_snapshot(csv_path, SNAPSHOT_SCHEMA) is None
+    assert len(load_artisan_frame(csv_path)) == 5
+
+
+def test_touched_but_unchanged_csv_stays_fresh(tmp_path):
+    csv_path = write_artisans_csv(tmp_path / 'Artisans.csv')
+    load_artisan_frame(csv_path)
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert is_fresh(read_manifest(csv_path), csv_path, SNAPSHOT_SCHEMA)
+
+
+def test_unreadable_snapshot_falls_back_to_the_csv(tmp_path):
+    csv_path = write_artisans_csv(tmp_path / 'Artisans.csv')
+    expected = load_artisan_frame(csv_path)
+    for name in os.listdir(snapshot_path(csv_path)):
+        if name.endswith('.strings.npy'):
+            with open(os.path.join(snapshot_path(csv_path), name), 'wb') as f:
+                f.write(b'garbage')
+    pdt.assert_frame_equal(load_artisan_frame(csv_path), expected, check_dtype=False, check_categorical=False)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.stats_cube import StatsCube
+
+STATES = ['Bihar', 'Kerala', 'Rajasthan', None]
+DISTRICTS = {'Bihar': ['Patna', 'Gaya'], 'Kerala': ['Kochi'], 'Rajasthan': ['Jaipur', 'Jodhpur'], None: [None]}
+CRAFTS = ['Pottery', 'Weaving', 'Madhubani Painting']
+
+
+@pytest.fixture(scope='module')
+def frame():
+    rng = np.random.default_rng(7)
+    n = 2000
+    states = rng.choice(np.array(STATES, dtype=object), n)
+    ages = rng.integers(18, 90, n).astype(float)
+    ages[rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame({
+        'state': states,
+        'district': [DISTRICTS[s][i % len(DISTRICTS[s])] for i, s in enumerate(states)],
+        'craft_type': rng.choice(CRAFTS, n),
+        'gender': rng.choice(['Male', 'Female'], n),
+        'contact_phone_boolean': rng.choice(['Yes', 'No'], n),
+        'age': ages,
+    })
+
+
+def test_counts_match_value_counts(frame):
+    summary = StatsCube.from_frame(frame).summary()
+    assert summary.total == len(frame)
+    for dim, column in (('state', 'state'), ('craft_type', 'craft_type'), ('gender', 'gender')):
+        assert summary.value_counts(dim) == frame[column].value_counts().to_dict()
+    assert summary.value_counts('craft_type', top=2) == frame['craft_type'].value_counts().head(2).to_dict()
+    assert summary.nunique('district') == frame['district'].nunique()
+
+
+def test_filtered_age_statistics_match_pandas(frame):
+    summary = StatsCube.from_frame(frame).summary(state='bihar ', district=['GAYA'])
+    rows = frame[(frame['state'] == 'Bihar') & (frame['district'] == 'Gaya')]
+    ages = rows['age'].dropna()
+    assert summary.total == len(rows)
+    assert summary.age_statistics() == {
+        'average_age': round(ages.mean(), 1),
+        'median_age': ages.median(),
+        'min_age': int(ages.min()),
+        'max_age': int(ages.max()),
+    }
+
+
+def test_incremental_adds_and_removes_match_a_full_build(frame):
+    cube = StatsCube()
+    for start in range(0, len(frame), 7):
+        cube.add(frame.iloc[start:start + 7])
+    cube.remove(frame.iloc[:500])
+    expected = StatsCube.from_frame(frame.iloc[500:]).summary()
+    summary = cube.summary()
+    assert summary.total == expected.total
+    assert summary.value_counts('district') == expected.value_counts('district')
+    assert summary.age_statistics() == expected.age_statistics()
+
+
+def test_removing_unknown_records_is_an_error(frame):
+    cube = StatsCube.from_frame(frame.iloc[:10])
+    with pytest.raises(ValueError):
+        cube.remove(frame.iloc[10:20].assign(state='Atlantis'))
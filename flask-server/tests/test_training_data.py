@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from backend.training_data import iter_training_records
+
+RECORDS = [
+    {'language': 'hi', 'question': 'मधुबनी चित्रकला क्या है?', 'answer': 'बिहार की लोक कला।'},
+    {'language': 'en', 'question': 'Pottery?', 'answer': 'Clay', 'score': 12345, 'ratio': -0.125e3},
+    {'language': 'bn', 'question': 'মৃৎশিল্প', 'answer': None, 'verified': True, 'archived': False},
+    {'language': 'en', 'question': 'Nested', 'answer': {'text': 'a ] b , c', 'tags': ['x', [1, 2]]}},
+]
+
+
+def write(tmp_path, name, text, encoding='utf-8'):
+    path = tmp_path / name
+    path.write_bytes(text.encode(encoding))
+    return str(path)
+
+
+@pytest.mark.parametrize('chunk_bytes', [1, 2, 3, 5, 7, 64, 1 << 20])
+def test_json_array_matches_json_loads_at_any_chunk_size(tmp_path, chunk_bytes):
+    # Chunk boundaries then fall inside numbers, literals, escapes and multi-byte characters
+    text = '﻿ [\n' + ',\n'.join(json.dumps(r, ensure_ascii=False) for r in RECORDS) + '\n]\n'
+    path = write(tmp_path, 'training.json', text)
+    assert list(iter_training_records(path, chunk_bytes=chunk_bytes)) == RECORDS
+
+
+@pytest.mark.parametrize('chunk_bytes', [1, 4, 1 << 20])
+def test_top_level_literals_cut_at_a_chunk_boundary(tmp_path, chunk_bytes):
+    path = write(tmp_path, 'training.json', '[12345, true, false, null, -0.5e-3, "x"]')
+    assert list(iter_training_records(path, chunk_bytes=chunk_bytes)) == [12345, True, False, None, -0.5e-3, 'x']
+
+
+def test_empty_array(tmp_path):
+    assert list(iter_training_records(write(tmp_path, 'training.json', '  [ ]  '))) == []
+
+
+def test_json_lines(tmp_path):
+    text = '\n'.join(json.dumps(r, ensure_ascii=False) for r in RECORDS[:2]) + '\n\n' + json.dumps(RECORDS[2]) + '\n'
+    assert list(iter_training_records(write(tmp_path, 'training.jsonl', text))) == RECORDS[:3]
+    # Without the extension, anything that does not start with '[' is read as JSON Lines
+    assert list(iter_training_records(write(tmp_path, 'training.json', text))) == RECORDS[:3]
+
+
+@pytest.mark.parametrize('text', ['[{"language": "en"}, nope]', '[{"language": "en"}, {"language": ', '[1, 2'])
+def test_invalid_or_truncated_array_raises_after_the_valid_elements(tmp_path, text):
+    records = iter_training_records(write(tmp_path, 'training.json', text), chunk_bytes=4)
+    assert next(records) in ({'language': 'en'}, 1)
+    with pytest.raises(ValueError):
+        list(records)
+
+
+def test_invalid_json_line_names_the_line(tmp_path):
+    path = write(tmp_path, 'training.jsonl', '{"language": "en"}\n{broken\n')
+    with pytest.raises(ValueError, match='line 2'):
+        list(iter_training_records(path))
+
+
+def test_progress_reaches_the_file_size(tmp_path):
+    path = write(tmp_path, 'training.json', json.dumps(RECORDS))
+    calls = []
+    list(iter_training_records(path, progress=lambda *call: calls.append(call), chunk_bytes=16))
+    assert calls[-1][0] == 'reading' and calls[-1][1] == calls[-1][2] > 0
+    assert [done for _, done, _ in calls] == sorted(done for _, done, _ in calls)